@@ -0,0 +1,62 @@
+"""
+Benchmark: dashboard cold start – how long until the first page is drawn.
+
+Runs the dashboard script headlessly with Streamlit's AppTest, each time in a
+fresh Python process (so nothing is imported or cached yet, like after a server
+restart), and prints the time of that first run, plus the time of a second run
+in the same process (a warm rerun). Caches on disk (.cache/) are left as they
+are, so run it once first if you want to leave one-time builds out of it.
+
+Pass --script to time another version of the dashboard, e.g. one checked out
+from an older commit into the repository root.
+
+Usage:
+    python benchmarks/bench_dashboard_cold_start.py [--script eda-streamlit-dashboard.py] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=3600)
+app.run()
+cold = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+warm = time.perf_counter() - start
+print(json.dumps({"cold": cold, "warm": warm, "errors": [str(e.message) for e in app.exception]}))
+"""
+
+
+def run_once(script):
+    """(cold seconds, warm seconds, errors) for one fresh process."""
+    output = subprocess.run([sys.executable, "-c", RUNNER, script], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["cold"], result["warm"], result["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--script", default="eda-streamlit-dashboard.py")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [run_once(args.script) for _ in range(args.repeat)]
+    errors = [error for _, _, run_errors in runs for error in run_errors]
+    print(f"{args.script}: best of {args.repeat} fresh processes")
+    print(f"{'cold start':>12} {min(cold for cold, _, _ in runs):>9.3f}s")
+    print(f"{'rerun':>12} {min(warm for _, warm, _ in runs):>9.3f}s")
+    if errors:
+        print(f"{len(errors)} exception(s) in the script, first: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: chained pd.merge vs multiway_join as the number of sources grows.
+
+Generates synthetic (Country, Year) sources shaped like ours – a few float32
+measures each, with ~10% of the country-years missing at random – joins them
+both ways, checks the results agree, and prints the timings.
+
+Usage:
+    python benchmarks/bench_multiway_join.py [--countries 250] [--years 120] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from multiway_join import multiway_join  # noqa: E402
+
+SOURCE_COUNTS = (2, 4, 8, 16, 32)
+
+
+def make_sources(n_sources, n_countries, n_years, seed=42):
+    """Build `n_sources` long-format frames with random gaps in their country-years."""
+    rng = np.random.default_rng(seed)
+    countries = pd.Categorical([f"Country {i:04d}" for i in range(n_countries)])
+    country = np.repeat(countries, n_years)
+    year = np.tile(np.arange(2023 - n_years + 1, 2024, dtype=np.int16), n_countries)
+
+    sources = {}
+    for s in range(n_sources):
+        keep = rng.random(len(year)) > 0.1
+        frame = {"Country": country[keep], "Year": year[keep]}
+        for m in range(3):
+            frame[f"source{s}_measure{m}"] = rng.random(keep.sum(), dtype=np.float32)
+        # Shuffle so neither approach benefits from pre-sorted input.
+        sources[f"source{s}"] = pd.DataFrame(frame).sample(frac=1.0, random_state=s).reset_index(drop=True)
+    return sources
+
+
+def chained_merge(sources):
+    """The old way: one pd.merge per source."""
+    frames = list(sources.values())
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = pd.merge(merged, frame, on=["Country", "Year"], how="inner")
+    return merged
+
+
+def best_of(func, repeat):
+    """Best wall time over `repeat` runs, plus the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--years", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.countries} countries x {args.years} years per source (~10% gaps), best of {args.repeat}")
+    print(f"{'sources':>8} {'rows out':>9} {'pd.merge':>10} {'multiway':>10} {'speedup':>8}")
+    for n_sources in SOURCE_COUNTS:
+        sources = make_sources(n_sources, args.countries, args.years)
+        chained_time, expected = best_of(lambda: chained_merge(sources), args.repeat)
+        multiway_time, actual = best_of(lambda: multiway_join(sources), args.repeat)
+
+        pd.testing.assert_frame_equal(
+            expected.astype({"Country": str}), actual.astype({"Country": str}), check_dtype=False
+        )
+        print(f"{n_sources:>8} {len(actual):>9,} {chained_time:>9.3f}s {multiway_time:>9.3f}s "
+              f"{chained_time / multiway_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
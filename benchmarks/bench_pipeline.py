@@ -0,0 +1,332 @@
+"""
+Benchmark: the whole pipeline, stage by stage, on synthetic sources at 1x/10x/100x.
+
+Generates (once, under .cache/synthetic) raw sources in the exact layout of data/
+with synthetic_sources.py, points main-script.py at them and times every stage
+of the build and of what the dashboard does with the result:
+
+  load_data, each process_* step, the join, the engineered features (what
+  feature_engineering_script.py computes), and the dashboard's cleaning,
+  correlation cube + query and model fit.
+
+For every stage it records the best wall time over --repeat runs and, in one
+extra run under tracemalloc (too slow to time with it on), the peak memory the
+stage allocated on top of what was already there (Python and numpy/pandas
+allocations; memory allocated natively, e.g. inside xgboost, isn't seen). Each
+run is appended to a JSON-lines results file together with the git commit it
+ran on, so runs can be compared across commits:
+
+    python benchmarks/bench_pipeline.py                     # 1x and 10x
+    git worktree add ../before <other commit>
+    python benchmarks/bench_pipeline.py --tree ../before    # that commit's code, same benchmark
+    python benchmarks/bench_pipeline.py --compare           # last run vs the one before, per stage
+
+--tree benchmarks another checkout with this benchmark, so it works for commits
+that predate it. Stages a commit doesn't have yet are replaced by what it did
+instead (a build without per-source steps is timed as one "build" stage, the
+correlations without the cube are DataFrame.corr(), the model without the model
+store is a plain fit) or skipped (the engineered features, the cleaning).
+
+--compare exits with status 1 if any stage got slower (or hungrier) than
+--threshold times the baseline, so it can gate a merge.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scales 1x 10x 100x] [--repeat 3] [--results FILE]
+    python benchmarks/bench_pipeline.py --compare [BASELINE [CANDIDATE]] [--threshold 1.25]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_sources import ROOT, SCALES, load_main_script, write_sources  # noqa: E402
+
+SYNTHETIC_DIR = os.path.join(ROOT, ".cache", "synthetic")
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "pipeline.jsonl")
+TARGET = "Life Ladder"
+# The dashboard's model: same features and parameters as eda-streamlit-dashboard.py.
+MODEL_FEATURES = [
+    'Log GDP per capita', 'Social support', 'Healthy life expectancy at birth',
+    'Freedom to make life choices', 'Generosity', 'Perceptions of corruption',
+    'Positive affect', 'Negative affect', 'Democracy_Index', 'Total_Emissions',
+    'Human Development Index', 'Rule_of_Law_Index', 'Median Age', 'Urban Population (%)', 'Tax_Revenue'
+]
+MODEL_PARAMS = {"n_estimators": 100, "learning_rate": 0.1, "random_state": 42}
+MB = 1024 * 1024
+
+
+def use_tree(tree):
+    """Import the pipeline's modules from `tree` from here on, not from this checkout."""
+    for name, module in list(sys.modules.items()):
+        if os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "")) == ROOT:
+            del sys.modules[name]  # synthetic_sources keeps what it already imported; nothing else may.
+    sys.path[:] = [tree] + [path for path in sys.path if os.path.abspath(path or ".") != ROOT]
+
+
+def optional(module, attribute):
+    """`module.attribute`, or None at a commit that doesn't have it yet."""
+    try:
+        return getattr(importlib.import_module(module), attribute)
+    except (ImportError, AttributeError):
+        return None
+
+
+def git_commit(tree=ROOT):
+    """(commit hash, whether the tree has uncommitted changes) – or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tree, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=tree,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(dirty)
+
+
+def rows_of(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(frame) for frame in result.values())
+    return None
+
+
+class Stages:
+    """Runs stages one after another, recording the wall time (and optionally traced peak memory) of each."""
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.records = {}
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        record = {"seconds": time.perf_counter() - start, "rows": rows_of(result)}
+        if self.trace:
+            record["peak_mb"] = (tracemalloc.get_traced_memory()[1] - before) / MB
+        self.records[name] = record
+        return result
+
+
+def run_pipeline(main_script, stages, model_dir, use_processes=False):
+    """One pass through every stage, build and dashboard, on whatever FILE_PATHS points at."""
+    if hasattr(main_script, "PROCESSORS") and hasattr(main_script, "join_sources"):
+        data = stages.run("load_data", main_script.load_data, use_processes=use_processes, verbose=False)
+        processed = {
+            name: stages.run(f"process:{name}", process, data[name])
+            for name, process in main_script.PROCESSORS.items()
+        }
+        merged = stages.run("join", main_script.join_sources, processed)
+    else:
+        merged = stages.run("build", main_script.main)
+
+    compute_features = optional("feature_registry", "compute_features")
+    if compute_features is not None:
+        stages.run("features", compute_features, merged)
+
+    clean_dataset = optional("shared_data", "clean_dataset")
+    if clean_dataset is not None:
+        cleaned = stages.run("dashboard:clean", clean_dataset, merged)
+    else:
+        cleaned = merged.dropna().reset_index(drop=True)
+    numeric_columns = list(cleaned.select_dtypes(include="number").columns)
+    StatsCube = optional("stats_cube", "StatsCube")
+    if StatsCube is not None:
+        cube = stages.run("dashboard:correlation_cube", StatsCube, cleaned, numeric_columns, [TARGET])
+        stages.run("dashboard:correlation_query", cube.corr)
+    else:
+        stages.run("dashboard:correlation_query", lambda: cleaned[numeric_columns].corr()[[TARGET]])
+
+    # xgboost only when it's there, like the dashboard's model chapter.
+    ModelStore = optional("model_store", "ModelStore")
+    if ModelStore is not None:
+        store = ModelStore(model_dir)
+        stages.run("dashboard:model", lambda: store.get_or_train(cleaned, MODEL_FEATURES, TARGET, MODEL_PARAMS,
+                                                                 retrain=True).X_train)
+        return
+    try:
+        from sklearn.model_selection import train_test_split
+        from xgboost import XGBRegressor
+    except ImportError:
+        return
+    X_train, _, y_train, _ = train_test_split(cleaned[MODEL_FEATURES], cleaned[TARGET], test_size=0.2,
+                                              random_state=42)
+
+    def fit():
+        XGBRegressor(**MODEL_PARAMS).fit(X_train, y_train)
+        return X_train
+
+    stages.run("dashboard:model", fit)
+
+
+def bench_scale(scale, repeat, use_processes, seed, tree=ROOT):
+    """Best-of-`repeat` seconds and traced peak memory for every stage at one scale."""
+    dims = SCALES[scale]
+    directory = os.path.join(SYNTHETIC_DIR, f"{dims.label}-seed{seed}")
+    start = time.perf_counter()
+    main_script = load_main_script(tree)
+    main_script.FILE_PATHS = write_sources(directory, dims, main_script.FILE_PATHS, seed=seed)
+    setup = time.perf_counter() - start
+    input_mb = sum(os.path.getsize(path) for path in main_script.FILE_PATHS.values()) / MB
+
+    best = {}
+    with tempfile.TemporaryDirectory() as model_dir:
+        for _ in range(repeat):
+            stages = Stages()
+            run_pipeline(main_script, stages, model_dir, use_processes)
+            for name, record in stages.records.items():
+                if name not in best or record["seconds"] < best[name]["seconds"]:
+                    best[name] = record
+
+        # Memory on a separate run: tracemalloc slows allocation-heavy code down too much to time it.
+        # (Worker processes allocate outside of it, so use the thread pool here regardless.)
+        traced = Stages(trace=True)
+        tracemalloc.start()
+        try:
+            run_pipeline(main_script, traced, model_dir)
+        finally:
+            tracemalloc.stop()
+    for name, record in traced.records.items():
+        best[name]["peak_mb"] = record["peak_mb"]
+    return {"dims": asdict(dims), "input_mb": input_mb, "setup_seconds": setup, "stages": best}
+
+
+def print_scale(scale, result):
+    dims = result["dims"]
+    print(f"\n{scale}: {dims['countries']:,} countries x {dims['years']} years x{dims['column_factor']} columns, "
+          f"{result['input_mb']:.1f} MB of sources")
+    print(f"  {'stage':<32} {'seconds':>9} {'peak MB':>9} {'rows':>11}")
+    for name, record in result["stages"].items():
+        rows = f"{record['rows']:,}" if record["rows"] is not None else "-"
+        print(f"  {name:<32} {record['seconds']:>9.3f} {record.get('peak_mb', float('nan')):>9.1f} {rows:>11}")
+    total = sum(record["seconds"] for record in result["stages"].values())
+    print(f"  {'total':<32} {total:>9.3f}")
+
+
+def load_runs(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def find_run(runs, ref, before=None):
+    """The latest run whose commit starts with `ref` (or the latest run at all), optionally older than `before`."""
+    candidates = runs if before is None else runs[:runs.index(before)]
+    for run in reversed(candidates):
+        if ref is None or (run.get("commit") or "").startswith(ref):
+            return run
+    return None
+
+
+def describe(run):
+    commit = (run.get("commit") or "no-git")[:10] + ("+dirty" if run.get("dirty") else "")
+    return f"{commit} at {run['started']}"
+
+
+def compare(runs, baseline_ref, candidate_ref, threshold):
+    """Print candidate/baseline ratios per scale and stage; return True if anything regressed past `threshold`."""
+    candidate = find_run(runs, candidate_ref)
+    if candidate is None:
+        raise SystemExit("No run to compare: run the benchmark first.")
+    if baseline_ref is not None:
+        baseline = find_run(runs, baseline_ref)
+    else:
+        # The run before the candidate on another commit, if there is one; otherwise simply the one before.
+        older = runs[:runs.index(candidate)]
+        baseline = next((run for run in reversed(older) if run.get("commit") != candidate.get("commit")), None)
+        baseline = baseline or find_run(runs, None, before=candidate)
+    if baseline is None:
+        raise SystemExit("Only one run recorded: nothing to compare it with yet.")
+
+    print(f"baseline:  {describe(baseline)}\ncandidate: {describe(candidate)}")
+    regressed = []
+    for scale, result in candidate["scales"].items():
+        if scale not in baseline["scales"]:
+            continue
+        print(f"\n{scale}\n  {'stage':<32} {'seconds':>18} {'ratio':>7} {'peak MB':>18} {'ratio':>7}")
+        old_stages = baseline["scales"][scale]["stages"]
+        for name, new in result["stages"].items():
+            old = old_stages.get(name)
+            if old is None:
+                print(f"  {name:<32} {'(new stage)':>18}")
+                continue
+            cells, flag = [], ""
+            for metric in ("seconds", "peak_mb"):
+                before, after = old.get(metric), new.get(metric)
+                if not before or after is None:
+                    cells.append(f"{'-':>18} {'-':>7}")
+                    continue
+                ratio = after / before
+                cells.append(f"{before:>8.3f}->{after:<8.3f} {ratio:>6.2f}x")
+                # Tiny stages are all noise; only flag what's worth a few milliseconds (or a megabyte).
+                if ratio > threshold and after - before > (0.005 if metric == "seconds" else 1.0):
+                    flag = "  <-- regression"
+                    regressed.append((scale, name, metric, ratio))
+            print(f"  {name:<32} {' '.join(cells)}{flag}")
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) over {threshold:.2f}x.")
+    return bool(regressed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["1x", "10x"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processes", action="store_true", help="Time load_data on a process pool.")
+    parser.add_argument("--tree", default=ROOT,
+                        help="Checkout whose code to benchmark, e.g. a git worktree of an older commit "
+                             "(default: this one).")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSON-lines file the runs are appended to.")
+    parser.add_argument("--compare", nargs="*", metavar="COMMIT", default=None,
+                        help="Compare recorded runs instead: [BASELINE [CANDIDATE]] commit prefixes "
+                             "(default: the latest run against the previous one on another commit).")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="With --compare, the slowdown ratio that counts as a regression.")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        refs = (args.compare + [None, None])[:2]
+        sys.exit(1 if compare(load_runs(args.results), refs[0], refs[1], args.threshold) else 0)
+
+    tree = os.path.abspath(args.tree)
+    if tree != ROOT:
+        use_tree(tree)
+    commit, dirty = git_commit(tree)
+    run = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "dirty": dirty,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "processes": args.processes,
+        "host": {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+                 "cpus": os.cpu_count()},
+        "scales": {},
+    }
+    for scale in args.scales:
+        run["scales"][scale] = bench_scale(scale, args.repeat, args.processes, args.seed, tree)
+        print_scale(scale, run["scales"][scale])
+
+    os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(run) + "\n")
+    print(f"\nAppended to {args.results}; compare runs with --compare.")
+
+
+if __name__ == "__main__":
+    main()
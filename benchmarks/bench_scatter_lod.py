@@ -0,0 +1,98 @@
+"""
+Benchmark: rendering the money-vs-happiness scatter with every row vs with lod_points().
+
+Generates a synthetic panel of countries with a few decades of (GDP, happiness)
+points each, with Country as a Categorical over the whole country registry (plus
+the synthetic names), as the dashboard gets it from the Feather dataset. Draws it
+to PNG through lod_scatter(), the dashboard's seaborn scatter coloured by country,
+once with every row and once with the point budget, and prints the rendering
+times alongside how many points were drawn.
+
+It also draws --legend-countries countries and checks that the legend lists
+exactly those, not every category the registry has.
+
+Usage:
+    python benchmarks/bench_scatter_lod.py [--countries 1000] [--years 40] [--max-points 2000] [--repeat 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from country_registry import load_registry  # noqa: E402
+from figure_cache import lod_scatter  # noqa: E402
+
+X, Y = "Log GDP per capita", "Life Ladder"
+
+
+def make_panel(n_countries, n_years, seed=42):
+    """Per-country clouds of (GDP, happiness) points drifting upwards over the years."""
+    rng = np.random.default_rng(seed)
+    names = [f"Country {i:04d}" for i in range(n_countries)]
+    base_gdp = np.repeat(rng.uniform(7, 11, n_countries), n_years)
+    base_happiness = np.repeat(rng.uniform(3, 7.5, n_countries), n_years)
+    drift = np.tile(np.linspace(0, 0.8, n_years), n_countries)
+    return pd.DataFrame({
+        "Country": pd.Categorical(np.repeat(names, n_years), categories=load_registry().names + names),
+        X: base_gdp + drift + rng.normal(0, 0.05, n_countries * n_years),
+        Y: base_happiness + drift / 2 + rng.normal(0, 0.2, n_countries * n_years),
+    })
+
+
+def render(panel, max_points):
+    """PNG bytes of the dashboard's scatter of `panel`."""
+    fig, _, _ = lod_scatter(panel, X, Y, "Country", max_points)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+
+def check_legend(panel, n_countries, max_points):
+    """The legend of a few countries' scatter names exactly those countries."""
+    selected = panel["Country"].cat.categories[-n_countries:]  # The synthetic ones, after the registry's.
+    _, ax, _ = lod_scatter(panel[panel["Country"].isin(selected)], X, Y, "Country", max_points)
+    categories = set(panel["Country"].cat.categories)
+    entries = [text.get_text() for text in ax.get_legend().get_texts() if text.get_text() in categories]
+    assert sorted(entries) == sorted(selected), f"legend lists {len(entries)} countries, {n_countries} selected"
+    return len(entries)
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--countries", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=40)
+    parser.add_argument("--max-points", type=int, default=2000)
+    parser.add_argument("--legend-countries", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    panel = make_panel(args.countries, args.years)
+    n_categories = len(panel["Country"].cat.categories)
+    print(f"{len(panel):,} rows, {args.countries} countries ({n_categories:,} categories); best of {args.repeat}")
+    entries = check_legend(panel, args.legend_countries, args.max_points)
+    print(f"legend of {args.legend_countries} selected countries: {entries} entries")
+
+    _, _, points = lod_scatter(panel, X, Y, "Country", args.max_points)
+    full_time = best_of(lambda: render(panel, len(panel)), args.repeat)
+    lod_time = best_of(lambda: render(panel, args.max_points), args.repeat)
+    print(f"{'every row':>10} {full_time:>9.3f}s  {len(panel):>9,} points")
+    print(f"{'lod':>10} {lod_time:>9.3f}s  {len(points):>9,} points")
+    print(f"{'speedup':>10} {full_time / lod_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
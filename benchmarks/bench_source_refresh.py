@@ -0,0 +1,157 @@
+"""
+Benchmark: refreshing the raw sources against a local stand-in for the upstream servers.
+
+Serves a copy of the sources in data/ (FILE_PATHS) from a local HTTP server that behaves like the real ones
+(ETag, Last-Modified, 304s, byte ranges) with some added latency, then runs
+source_fetcher through the cases that matter:
+
+  1. cold      – nothing local yet: every file is downloaded,
+  2. warm      – nothing changed upstream: one 304 per file,
+  3. one edit  – one file changed upstream: one download, the rest 304s,
+  4. broken    – a changed file whose transfer breaks off halfway: the retry resumes it (206),
+  5. no 304s   – a server that ignores conditional headers: full downloads, but no file is touched.
+
+and prints the time, what the fetcher reported and what the server answered.
+
+Usage:
+    python benchmarks/bench_source_refresh.py [--latency 0.05] [--concurrency 4]
+"""
+import argparse
+import email.utils
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_sources import ROOT, load_main_script  # noqa: E402
+
+sys.path.insert(0, ROOT)
+from source_fetcher import refresh_sources  # noqa: E402
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Static files with ETag/Last-Modified validators, conditional GETs, byte ranges and knobs for misbehaving."""
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, status):
+        with self.server.lock:
+            self.server.statuses[status] += 1
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self._answer(404)
+            return self.send_error(404)
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        validators = {} if self.server.ignore_validators else {"ETag": etag, "Last-Modified": last_modified}
+
+        if validators and (self.headers.get("If-None-Match") == etag
+                           or (self.headers.get("If-None-Match") is None
+                               and self.headers.get("If-Modified-Since") == last_modified)):
+            self._answer(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            return self.end_headers()
+
+        start = 0
+        requested = self.headers.get("Range", "")
+        if validators and requested.startswith("bytes=") and self.headers.get("If-Range") in (etag, last_modified):
+            start = int(requested[len("bytes="):].split("-")[0])
+        with open(path, "rb") as handle:
+            handle.seek(start)
+            body = handle.read()
+
+        status = 206 if start else 200
+        self._answer(status)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{stat.st_size - 1}/{stat.st_size}")
+        for name, value in validators.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        cut = self.server.break_once.pop(os.path.basename(path), None)
+        if cut is not None:  # Promise the whole body, send part of it, hang up.
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def serve(directory, latency):
+    """Start the stand-in server on a free port; returns (server, base URL)."""
+    handler = lambda *args, **kwargs: StandInHandler(*args, directory=directory, **kwargs)  # noqa: E731
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.latency, server.ignore_validators, server.break_once = latency, False, {}
+    server.statuses, server.lock = Counter(), threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    # The files the build fetches (FILE_PATHS), not everything in data/: the country registry is ours, not upstream's.
+    sources = {name: os.path.join(ROOT, path) for name, path in load_main_script().FILE_PATHS.items()}
+    with tempfile.TemporaryDirectory() as upstream, tempfile.TemporaryDirectory() as local:
+        for source in sources.values():
+            shutil.copy2(source, upstream)
+        paths = {name: os.path.join(local, os.path.basename(source)) for name, source in sources.items()}
+        state_path = os.path.join(local, ".sources.json")
+        server, base_url = serve(upstream, args.latency)
+        print(f"{len(paths)} sources, {sum(os.path.getsize(s) for s in sources.values()) / 1e6:.1f} MB, "
+              f"{args.latency * 1000:.0f} ms latency, {args.concurrency} at a time")
+        print(f"{'case':>10} {'seconds':>8}  {'fetcher':<36} server")
+
+        def edit(name):
+            with open(os.path.join(upstream, os.path.basename(paths[name])), "ab") as handle:
+                handle.write(b"\n")
+
+        def run(case):
+            server.statuses.clear()
+            start = time.perf_counter()
+            results = refresh_sources(paths, base_url=base_url, state_path=state_path,
+                                      max_concurrency=args.concurrency)
+            seconds = time.perf_counter() - start
+            fetcher = Counter(result.status for result in results)
+            resumed = sum(1 for result in results if result.resumed_from)
+            summary = ", ".join(f"{count} {status}" for status, count in sorted(fetcher.items()))
+            summary += f", {resumed} resumed" if resumed else ""
+            served = ", ".join(f"{count}x{status}" for status, count in sorted(server.statuses.items()))
+            print(f"{case:>10} {seconds:>8.3f}  {summary:<36} {served}")
+
+        run("cold")
+        run("warm")
+        names = sorted(paths, key=lambda name: os.path.getsize(paths[name]))
+        edit(names[-1])
+        run("one edit")
+        edit(names[-2])
+        server.break_once[os.path.basename(paths[names[-2]])] = os.path.getsize(paths[names[-2]]) // 2
+        run("broken")
+        server.ignore_validators = True
+        run("no 304s")
+        server.shutdown()
+
+        for name, path in paths.items():
+            with open(path, "rb") as mine, open(os.path.join(upstream, os.path.basename(path)), "rb") as theirs:
+                assert mine.read() == theirs.read(), f"{name} differs from upstream"
+        print("Local copies match upstream.")
+
+
+if __name__ == "__main__":
+    main()
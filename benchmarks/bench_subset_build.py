@@ -0,0 +1,112 @@
+"""
+Benchmark: a subset build (--countries/--years/--columns) vs the full build.
+
+Times main-script.py's main() for the full dataset and for a few countries over
+a few years and columns, with and without the source cache:
+
+  cold   no cache: every source is parsed from its raw file (the subset only
+         parses the columns it needs and drops the other rows while reading),
+  warm   a primed SourceCache (in a temporary directory): every source comes
+         from its Parquet copy (the subset reads only its columns and filters
+         the rows before converting them to pandas).
+
+Checks that each subset equals the full build filtered afterwards and prints the
+best-of-`--repeat` seconds and the subset's share of the full build's time.
+"real" is data/ as it is; the other scales are synthetic_sources.py's, written
+once under .cache/synthetic. Both kinds of build hash every raw file for the
+cache key, so that cost is the same on both sides of a warm comparison. Cold
+builds are mostly the Excel parse, which reads every cell whatever the subset.
+
+Usage:
+    python benchmarks/bench_subset_build.py [--scales real 1x 10x 100x] [--countries 3] [--years 5] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_sources import ROOT, SCALES, load_main_script, write_sources  # noqa: E402
+
+sys.path.insert(0, ROOT)
+from source_cache import SourceCache  # noqa: E402
+from subset_plan import Subset  # noqa: E402
+
+SYNTHETIC_DIR = os.path.join(ROOT, ".cache", "synthetic")
+COLUMNS = ["Life Ladder", "Democracy_Index", "Tax_Revenue"]
+
+
+def quiet(func, **kwargs):
+    """`func(**kwargs)` without its progress prints and pandas' warnings."""
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return func(**kwargs)
+
+
+def best_of(func, repeat, **kwargs):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = quiet(func, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def pick_subset(full, n_countries, n_years):
+    """Every `len // n`-th country of the full build and its last `n_years` years, plus COLUMNS."""
+    countries = sorted(full["Country"].unique())
+    step = max(len(countries) // n_countries, 1)
+    last = int(full["Year"].max())
+    return {"countries": countries[::step][:n_countries], "years": (last - n_years + 1, last), "columns": COLUMNS}
+
+
+def bench_scale(scale, n_countries, n_years, repeat, seed):
+    main_script = load_main_script()
+    if scale != "real":
+        dims = SCALES[scale]
+        directory = os.path.join(SYNTHETIC_DIR, f"{dims.label}-seed{seed}")
+        main_script.FILE_PATHS = write_sources(directory, dims, main_script.FILE_PATHS, seed=seed)
+    full = quiet(main_script.main)
+    request = pick_subset(full, n_countries, n_years)
+    expected = Subset.from_request(main_script.COUNTRIES, main_script.SOURCE_SCHEMAS, **request).apply(full)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label, cache in (("cold", None), ("warm", SourceCache(cache_dir))):
+            if cache is not None:
+                quiet(main_script.main, cache=cache)  # Prime it: warm means every source is already in Parquet.
+            full_time, _ = best_of(main_script.main, repeat, cache=cache)
+            subset_time, subset = best_of(main_script.main, repeat, cache=cache, **request)
+            pd.testing.assert_frame_equal(subset, expected)
+            results[label] = (full_time, subset_time)
+
+    print(f"\n{scale}: full build {full.shape[0]:,} rows x {full.shape[1]} columns; subset "
+          f"{len(request['countries'])} countries, {request['years'][0]}-{request['years'][1]}, "
+          f"{len(COLUMNS)} columns = {expected.shape[0]:,} rows")
+    print(f"  {'':<6} {'full s':>9} {'subset s':>9} {'share':>7}")
+    for label, (full_time, subset_time) in results.items():
+        print(f"  {label:<6} {full_time:>9.3f} {subset_time:>9.3f} {subset_time / full_time:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", nargs="+", choices=["real"] + sorted(SCALES), default=["real", "1x"])
+    parser.add_argument("--countries", type=int, default=3)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Best of {args.repeat}")
+    for scale in args.scales:
+        bench_scale(scale, args.countries, args.years, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
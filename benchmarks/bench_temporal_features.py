@@ -0,0 +1,121 @@
+"""
+Benchmark: pandas groupby shift/diff/rolling vs the temporal_features kernels.
+
+Generates a synthetic shuffled (Country, Year) panel with ~10% of the
+country-years missing, computes lags, diffs and 3/5/10-year rolling mean, slope
+and volatility over every indicator both ways, checks they agree and prints
+the timings.
+
+The baseline is the careful pandas version: each country is first reindexed
+onto its full year range (so gaps are NaN rows instead of silently shortening
+the window), then grouped shift/diff/rolling run column by column. Slope comes
+from rolling sums of t, x, t*x and t^2.
+
+Usage:
+    python benchmarks/bench_temporal_features.py [--countries 250] [--years 60] [--indicators 30] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from temporal_features import temporal_features  # noqa: E402
+
+LAGS = (1, 2)
+DIFFS = (1,)
+WINDOWS = (3, 5, 10)
+
+
+def make_panel(n_countries, n_years, n_indicators, seed=42):
+    """A shuffled long-format panel of random walks with random gaps."""
+    rng = np.random.default_rng(seed)
+    country = np.repeat(pd.Categorical([f"Country {i:04d}" for i in range(n_countries)]), n_years)
+    year = np.tile(np.arange(2023 - n_years + 1, 2024, dtype=np.int16), n_countries)
+    frame = {"Country": country, "Year": year}
+    for i in range(n_indicators):
+        walk = rng.normal(size=(n_countries, n_years)).cumsum(axis=1) * 10 ** (i % 6)
+        frame[f"indicator{i}"] = walk.ravel().astype(np.float32)
+    panel = pd.DataFrame(frame)
+    panel = panel[rng.random(len(panel)) > 0.1]
+    return panel.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def groupby_baseline(panel, columns):
+    """The pandas way, with gaps made explicit so windows are in calendar years."""
+    first, last = int(panel["Year"].min()), int(panel["Year"].max())
+    full_index = pd.MultiIndex.from_product(
+        [panel["Country"].cat.categories, range(first, last + 1)], names=["Country", "Year"]
+    )
+    full = panel.set_index(["Country", "Year"])[columns].astype(np.float64).reindex(full_index)
+    grouped = full.groupby(level="Country", sort=False)
+    t = pd.Series(full_index.get_level_values("Year").to_numpy(np.float64), index=full_index)
+
+    out = {}
+    for k in LAGS:
+        out.update({f"{c}_lag{k}": grouped[c].shift(k) for c in columns})
+    for k in DIFFS:
+        out.update({f"{c}_diff{k}": grouped[c].diff(k) for c in columns})
+    for w in WINDOWS:
+        for c in columns:
+            x = full[c]
+            tv = t.where(x.notna())
+            sums = pd.DataFrame({"n": x.notna().astype(float), "x": x, "t": tv, "tx": tv * x, "tt": tv * tv})
+            rolled = sums.groupby(level="Country", sort=False).rolling(w, min_periods=1).sum()
+            rolled.index = rolled.index.droplevel(0)
+            n = rolled["n"]
+            denominator = n * rolled["tt"] - rolled["t"] ** 2
+            rolling = grouped[c].rolling(w, min_periods=1)
+            mean = rolling.mean()
+            mean.index = mean.index.droplevel(0)
+            std = rolling.std()
+            std.index = std.index.droplevel(0)
+            out[f"{c}_mean{w}y"] = mean
+            out[f"{c}_slope{w}y"] = ((n * rolled["tx"] - rolled["t"] * rolled["x"]) / denominator).where(
+                (n >= 2) & (denominator > 0))
+            out[f"{c}_vol{w}y"] = std
+    result = pd.DataFrame(out, index=full_index)
+    # Back to the panel's own rows and order.
+    return result.reindex(pd.MultiIndex.from_arrays([panel["Country"], panel["Year"].astype(int)]))
+
+
+def best_of(func, repeat):
+    """Best wall time over `repeat` runs, plus the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--years", type=int, default=60)
+    parser.add_argument("--indicators", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    panel = make_panel(args.countries, args.years, args.indicators)
+    columns = [c for c in panel.columns if c.startswith("indicator")]
+    print(f"{len(panel):,} rows x {len(columns)} indicators; lags {LAGS}, diffs {DIFFS}, windows {WINDOWS}; "
+          f"best of {args.repeat}")
+
+    baseline_time, expected = best_of(lambda: groupby_baseline(panel, columns), args.repeat)
+    kernel_time, actual = best_of(
+        lambda: temporal_features(panel, columns, lags=LAGS, diffs=DIFFS, windows=WINDOWS), args.repeat
+    )
+
+    expected = expected[actual.columns].reset_index(drop=True)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-6, atol=1e-6, equal_nan=True)
+    print(f"{'groupby':>10} {baseline_time:>9.3f}s")
+    print(f"{'kernels':>10} {kernel_time:>9.3f}s")
+    print(f"{'speedup':>10} {baseline_time / kernel_time:>9.1f}x  ({actual.shape[1]} feature columns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Load test: query_service.py under concurrent clients – latency percentiles and throughput.
+
+Starts the query service in its own process (or uses --url), then fires a mix of
+requests at it from --concurrency clients over pooled aiohttp connections:
+
+  rows         one to three countries over a year window, a few columns,
+  where        a value range on one indicator (the per-indicator index),
+  aggregate    per-year or per-country statistics of a few columns,
+  correlation  the dashboard's correlations for a country/year selection,
+  predict      --predict-rows dataset rows through the model in one request.
+
+The same set of distinct queries is sent twice: the cold pass computes every
+response, the warm pass should be answered from the response cache. For each
+pass it prints p50/p99 latency per endpoint and overall, and requests/second.
+
+Usage:
+    python benchmarks/load_test_query_service.py [--requests 2000] [--concurrency 32] [--queries 400]
+    python benchmarks/load_test_query_service.py --url http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import aiohttp
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("rows", "where", "aggregate", "correlation", "predict")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(session, url, timeout=120):
+    """The service's /status once it answers (it indexes the dataset before it does)."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with session.get(f"{url}/status") as response:
+                return await response.json()
+        except aiohttp.ClientConnectionError:
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"No query service answering at {url} after {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+def make_queries(status, n_queries, predict_rows, seed):
+    """`n_queries` distinct (endpoint, params) requests, spread evenly over the endpoints."""
+    rng = np.random.default_rng(seed)
+    countries = status["countries"]
+    columns = [column for column in status["columns"] if column not in ("Country", "Year", "Regime type")]
+    first_year, last_year = status["years"]
+
+    def window():
+        start = int(rng.integers(first_year, last_year + 1))
+        return f"{start}-{int(rng.integers(start, last_year + 1))}"
+
+    def pick(items, k):
+        return [str(item) for item in rng.choice(items, size=min(k, len(items)), replace=False)]
+
+    queries = set()
+    while len(queries) < n_queries:
+        endpoint = ENDPOINTS[len(queries) % len(ENDPOINTS)]
+        if endpoint == "rows":
+            params = tuple(("country", c) for c in pick(countries, int(rng.integers(1, 4)))) + (
+                ("years", window()), ("columns", ",".join(pick(columns, 3))))
+        elif endpoint == "where":
+            column = pick(columns, 1)[0]
+            params = (("where", f"{column}:{rng.normal():.1f}:"), ("columns", column), ("limit", "50"))
+        elif endpoint == "aggregate":
+            params = (("columns", ",".join(pick(columns, 3))), ("by", str(rng.choice(["Country", "Year"]))),
+                      ("stats", "mean,min,max"), ("years", window()))
+        elif endpoint == "correlation":
+            params = tuple(("country", c) for c in pick(countries, 5)) + (("years", window()),)
+        else:
+            params = tuple((c, int(rng.integers(first_year, last_year + 1))) for c in pick(countries, predict_rows))
+        queries.add((endpoint, params))
+    return sorted(queries)
+
+
+async def send(session, url, query):
+    """One request; returns (endpoint, seconds, status, cache header)."""
+    endpoint, params = query
+    start = time.perf_counter()
+    if endpoint == "predict":
+        body = {"keys": [{"country": country, "year": year} for country, year in params]}
+        request = session.post(f"{url}/predict", json=body)
+    else:
+        request = session.get(f"{url}/{'rows' if endpoint == 'where' else endpoint}", params=list(params))
+    async with request as response:
+        await response.read()
+        return endpoint, time.perf_counter() - start, response.status, response.headers.get("X-Cache")
+
+
+async def run_pass(session, url, queries, n_requests, concurrency):
+    """Send `n_requests` requests cycling through `queries` from `concurrency` clients; (seconds, results)."""
+    pending = iter(range(n_requests))
+    results = []
+
+    async def client():
+        for i in pending:
+            results.append(await send(session, url, queries[i % len(queries)]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, results
+
+
+def report(name, seconds, results):
+    by_endpoint = defaultdict(list)
+    for endpoint, latency, status, cache in results:
+        by_endpoint[endpoint].append((latency, status, cache))
+    print(f"\n{name}: {len(results):,} requests in {seconds:.2f}s = {len(results) / seconds:,.0f} req/s")
+    print(f"  {'endpoint':<12} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'cache hits':>11} {'errors':>7}")
+    rows = sorted(by_endpoint.items()) + [("all", [item for items in by_endpoint.values() for item in items])]
+    for endpoint, items in rows:
+        latencies = np.array([latency for latency, _, _ in items]) * 1000
+        hits = sum(cache == "hit" for _, _, cache in items)
+        errors = sum(status >= 400 for _, status, _ in items)
+        print(f"  {endpoint:<12} {len(items):>9,} {np.percentile(latencies, 50):>9.2f} "
+              f"{np.percentile(latencies, 99):>9.2f} {latencies.max():>9.2f} {hits:>11,} {errors:>7,}")
+
+
+async def load_test(url, n_requests, concurrency, n_queries, predict_rows, seed):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        status = await wait_until_up(session, url)
+        print(f"Query service at {url}: dataset {status['version']}, {status['rows']:,} rows")
+        queries = make_queries(status, n_queries, predict_rows, seed)
+        # The model is loaded (or trained) on the first predict; that's a one-off, not a latency to report.
+        await send(session, url, next(query for query in queries if query[0] == "predict"))
+
+        # Cold: every distinct query once, so (nearly) every response is computed.
+        report("cold (distinct queries, computed)", *await run_pass(session, url, queries, len(queries), concurrency))
+        report("warm (repeated queries, cached)", *await run_pass(session, url, queries, n_requests, concurrency))
+        async with session.get(f"{url}/status") as response:
+            status = await response.json()
+        batches = status["predict_batches"]
+        print(f"\nResponse cache: {status['cache']}; predict: {batches['requests']:,} requests "
+              f"in {batches['batches']:,} model calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=None, help="A running query service (default: start one).")
+    parser.add_argument("--path", default=None, help="Dataset for the service we start (default: its own default).")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests in the warm pass.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=400, help="Distinct queries (the cold pass sends each once).")
+    parser.add_argument("--predict-rows", type=int, default=8, help="Rows per predict request.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        command = [sys.executable, os.path.join(ROOT, "query_service.py"), "--port", str(port)]
+        server = subprocess.Popen(command + (["--path", args.path] if args.path else []), cwd=ROOT,
+                                  stdout=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(load_test(url.rstrip("/"), args.requests, args.concurrency, args.queries, args.predict_rows,
+                              args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
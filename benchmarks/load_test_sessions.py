@@ -0,0 +1,178 @@
+"""
+Load test: memory per dashboard session, per-session copies vs the shared dataset.
+
+Simulates N concurrent sessions (threads, like Streamlit's script runs) that each
+load the data, filter a few countries and ask for their correlations:
+
+  * copied – every session reads and cleans its own copy of the dataset and builds
+    its own filter index and correlation cube (what per-session caching gives you),
+  * shared – every session uses the one memory-mapped SharedDataset (shared_data.py).
+
+It prints resident memory (RSS) and proportional memory (PSS, which splits shared
+pages between the processes mapping them) once all sessions hold their state.
+With --processes P, the sessions are spread over P server processes and the PSS
+of all of them is summed – the number that matters when several workers serve
+the dashboard. The last column is PSS above that of idle processes, per session.
+--scale K tiles the dataset K times (as K x the countries) first.
+
+Linux only: memory comes from /proc/self/status and /proc/self/smaps_rollup.
+
+Usage:
+    python benchmarks/load_test_sessions.py [--sessions 8] [--processes 1] [--scale 1] [--model]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_store import default_path, read_dataset, write_dataset  # noqa: E402
+from filter_index import IndexedPanel  # noqa: E402
+from model_store import ModelStore  # noqa: E402
+from shared_data import SharedDataset, clean_dataset, shared_dataset  # noqa: E402
+from stats_cube import StatsCube  # noqa: E402
+
+FEATURES = ['Log GDP per capita', 'Social support', 'Healthy life expectancy at birth']
+MODEL_PARAMS = {"n_estimators": 50, "learning_rate": 0.1, "random_state": 42}
+
+
+def memory_mb():
+    """(RSS, PSS) of this process in MB."""
+    values = {}
+    for path, field in (("/proc/self/status", "VmRSS:"), ("/proc/self/smaps_rollup", "Pss:")):
+        with open(path) as handle:
+            line = next(line for line in handle if line.startswith(field))
+        values[field] = int(line.split()[1]) / 1024
+    return values["VmRSS:"], values["Pss:"]
+
+
+def scaled_source(k, directory):
+    """The dataset tiled `k` times, each tile's countries renamed, written as Feather under `directory`."""
+    data = read_dataset()
+    tiles = [data.assign(Country=data["Country"].astype(str) + ("" if i == 0 else f" #{i}")) for i in range(k)]
+    scaled = pd.concat(tiles, ignore_index=True)
+    scaled["Country"] = scaled["Country"].astype("category")
+    path = os.path.join(directory, f"scaled-{k}x.feather")
+    write_dataset(scaled, formats=("feather",), feather_path=path)
+    return path
+
+
+class CopiedSession:
+    """A session with its own cleaned frame, filter index and correlation cube."""
+
+    def __init__(self, source_path, shared_dir):
+        self.panel = IndexedPanel(clean_dataset(read_dataset(source_path)))
+        self.data = self.panel.data
+        self._cube = None
+
+    def cube(self, columns, with_columns):
+        if self._cube is None:
+            self._cube = StatsCube(self.data, columns, with_columns)
+        return self._cube
+
+    def model(self, features, target, params):
+        return ModelStore().get_or_train(self.data, features, target, params)
+
+
+class SharedSession:
+    """A session that only holds a reference to the process-wide shared dataset."""
+
+    def __init__(self, source_path, shared_dir):
+        self.shared = shared_dataset(source_path, shared_dir)
+        self.panel, self.data = self.shared.panel, self.shared.data
+
+    def cube(self, columns, with_columns):
+        return self.shared.cube(columns, with_columns)
+
+    def model(self, features, target, params):
+        return self.shared.model(features, target, params)
+
+
+def run_session(session_class, source_path, shared_dir, seed, with_model, held):
+    """One simulated script run: load, filter, correlate (and optionally predict). Keeps its state in `held`."""
+    session = session_class(source_path, shared_dir)
+    rng = np.random.default_rng(seed)
+    countries = list(rng.choice(session.panel.countries, size=min(5, len(session.panel.countries)), replace=False))
+    selection = session.panel.select(countries, (2010, 2020))
+    numeric_columns = list(session.data.select_dtypes(include='number').columns)
+    session.cube(numeric_columns, ['Life Ladder']).corr(countries, (2010, 2020))
+    if with_model:
+        session.model(FEATURES, 'Life Ladder', MODEL_PARAMS).model.predict(selection[FEATURES])
+    held.append((session, selection))
+
+
+def run_sessions(mode, source_path, shared_dir, sessions, with_model, seed=0):
+    """Run `sessions` concurrent sessions in this process; returns (seconds, held session state)."""
+    session_class = SharedSession if mode == "shared" else CopiedSession
+    held = []
+    threads = [threading.Thread(target=run_session,
+                                args=(session_class, source_path, shared_dir, seed + i, with_model, held))
+               for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, held
+
+
+def _worker(mode, source_path, shared_dir, sessions, with_model, seed, barrier, results):
+    seconds, held = run_sessions(mode, source_path, shared_dir, sessions, with_model, seed)
+    barrier.wait()  # Measure only once every process holds its sessions (and its share of the mapping).
+    results.put((seconds,) + memory_mb())
+    barrier.wait()
+
+
+def measure(mode, source_path, shared_dir, sessions, processes, with_model):
+    """Seconds and total (RSS, PSS) in MB over `processes` fresh processes running `sessions` sessions between them."""
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(processes), context.Queue()
+    per_process = [sessions // processes + (i < sessions % processes) for i in range(processes)]
+    workers = [context.Process(target=_worker,
+                               args=(mode, source_path, shared_dir, n, with_model, 1000 * i, barrier, results))
+               for i, n in enumerate(per_process)]
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return max(r[0] for r in reports), sum(r[1] for r in reports), sum(r[2] for r in reports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--scale", type=int, default=1, help="Tile the dataset this many times first.")
+    parser.add_argument("--model", action="store_true", help="Also load the model and predict in every session.")
+    args = parser.parse_args()
+
+    # The scaled source and its cleaned shared copy are scratch files: they go in a directory removed afterwards.
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = scaled_source(args.scale, directory) if args.scale > 1 else default_path()
+        shared_dir = os.path.join(directory, "shared")
+        # Build the shared file (and the model, if asked) up front, so neither mode pays for it in the timings.
+        shared = SharedDataset.open(source_path, shared_dir)
+        if args.model:
+            shared.model(FEATURES, 'Life Ladder', MODEL_PARAMS)
+        rows = len(shared.data)
+        del shared
+
+        print(f"{rows:,} cleaned rows; {args.sessions} sessions over {args.processes} process(es)"
+              f"{' with the model' if args.model else ''}")
+        # Idle processes (imports only) are the baseline; the per-session figure is what comes on top of it.
+        _, _, idle = measure("shared", source_path, shared_dir, 0, args.processes, False)
+        print(f"{'mode':>8} {'seconds':>9} {'RSS MB':>9} {'PSS MB':>9} {'MB/session':>11}")
+        for mode in ("copied", "shared"):
+            seconds, rss, pss = measure(mode, source_path, shared_dir, args.sessions, args.processes, args.model)
+            print(f"{mode:>8} {seconds:>9.3f} {rss:>9.1f} {pss:>9.1f} {(pss - idle) / args.sessions:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Synthetic raw sources: files shaped exactly like the ones in data/, at any size.
+
+Every source gets the raw layout the pipeline reads – the WHR sheet with its
+`Country name`/`year` columns, the wide TEDI sheet with one column per year, the
+OWID-style `Entity`/`Code`/`Year` CSVs, the `country`/`year` energy file – with
+the same column names, plus the columns we never read (filler), since skipping
+those is part of what's being measured.
+
+The size is set by Dimensions: countries x years x a column factor that widens
+every file by adding more filler. SCALES has the presets the pipeline benchmark
+runs: 1x is about the size of the real data (200 countries, 60 years), 10x and
+100x grow it from there.
+
+Values are plausible rather than real: each country gets a latent "development"
+level that drives most indicators (so correlations and the model have something
+to find), with a slow trend over the years and some noise. About 3% of the
+country-years are missing from each source at random, so the inner join drops a
+realistic share of rows.
+
+The one deliberate difference: pandas can no longer write .xls files, so the
+WHR sheet is written as .xlsx (same sheet, same columns; the pipeline reads
+either through pd.read_excel).
+
+Usage:
+    python benchmarks/synthetic_sources.py OUTPUT_DIR [--scale 10x] [--seed 42]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from source_schema import (  # noqa: E402
+    AIR_POLLUTANTS, ENERGY_KEPT, FOOD_MEASURES, NON_RENEWABLE_ELECTRICITY, RENEWABLE_ELECTRICITY,
+    SOURCE_SCHEMAS, WHR_MEASURES,
+)
+
+LAST_YEAR = 2023
+KEEP_ROW = 0.97  # Share of each source's country-years that are present.
+FILLER_MISSING = 0.3  # Share of empty cells in the columns nobody reads (the real energy file is mostly holes).
+EXCEL_MAX_ROWS = 1_048_575  # Below the header row.
+MANIFEST = "synthetic.json"
+LAYOUT = 2  # Bump whenever the generated files change, so cached sets are written again.
+
+# How many columns each real file has in total; whatever the schema doesn't read is made up with filler.
+REAL_WIDTHS = {
+    "whr": 11, "energy": 129, "food": 40, "deaths": 4, "air_pollution": 9, "hdi": 4,
+    "rule_of_law": 4, "median_age": 5, "urban_population": 5, "tax_revenue": 4,
+}
+
+# The real energy file's header. Its filler columns get these names, because commits
+# from before source_schema.py pick (and drop) energy columns by name.
+ENERGY_HEADER = [
+    'country', 'year', 'iso_code', 'population', 'gdp', 'biofuel_cons_change_pct', 'biofuel_cons_change_twh',
+    'biofuel_cons_per_capita', 'biofuel_consumption', 'biofuel_elec_per_capita', 'biofuel_electricity',
+    'biofuel_share_elec', 'biofuel_share_energy', 'carbon_intensity_elec', 'coal_cons_change_pct',
+    'coal_cons_change_twh', 'coal_cons_per_capita', 'coal_consumption', 'coal_elec_per_capita', 'coal_electricity',
+    'coal_prod_change_pct', 'coal_prod_change_twh', 'coal_prod_per_capita', 'coal_production', 'coal_share_elec',
+    'coal_share_energy', 'electricity_demand', 'electricity_generation', 'electricity_share_energy',
+    'energy_cons_change_pct', 'energy_cons_change_twh', 'energy_per_capita', 'energy_per_gdp',
+    'fossil_cons_change_pct', 'fossil_cons_change_twh', 'fossil_elec_per_capita', 'fossil_electricity',
+    'fossil_energy_per_capita', 'fossil_fuel_consumption', 'fossil_share_elec', 'fossil_share_energy',
+    'gas_cons_change_pct', 'gas_cons_change_twh', 'gas_consumption', 'gas_elec_per_capita', 'gas_electricity',
+    'gas_energy_per_capita', 'gas_prod_change_pct', 'gas_prod_change_twh', 'gas_prod_per_capita', 'gas_production',
+    'gas_share_elec', 'gas_share_energy', 'greenhouse_gas_emissions', 'hydro_cons_change_pct',
+    'hydro_cons_change_twh', 'hydro_consumption', 'hydro_elec_per_capita', 'hydro_electricity',
+    'hydro_energy_per_capita', 'hydro_share_elec', 'hydro_share_energy', 'low_carbon_cons_change_pct',
+    'low_carbon_cons_change_twh', 'low_carbon_consumption', 'low_carbon_elec_per_capita', 'low_carbon_electricity',
+    'low_carbon_energy_per_capita', 'low_carbon_share_elec', 'low_carbon_share_energy', 'net_elec_imports',
+    'net_elec_imports_share_demand', 'nuclear_cons_change_pct', 'nuclear_cons_change_twh', 'nuclear_consumption',
+    'nuclear_elec_per_capita', 'nuclear_electricity', 'nuclear_energy_per_capita', 'nuclear_share_elec',
+    'nuclear_share_energy', 'oil_cons_change_pct', 'oil_cons_change_twh', 'oil_consumption', 'oil_elec_per_capita',
+    'oil_electricity', 'oil_energy_per_capita', 'oil_prod_change_pct', 'oil_prod_change_twh', 'oil_prod_per_capita',
+    'oil_production', 'oil_share_elec', 'oil_share_energy', 'other_renewable_consumption',
+    'other_renewable_electricity', 'other_renewable_exc_biofuel_electricity', 'other_renewables_cons_change_pct',
+    'other_renewables_cons_change_twh', 'other_renewables_elec_per_capita',
+    'other_renewables_elec_per_capita_exc_biofuel', 'other_renewables_energy_per_capita',
+    'other_renewables_share_elec', 'other_renewables_share_elec_exc_biofuel', 'other_renewables_share_energy',
+    'per_capita_electricity', 'primary_energy_consumption', 'renewables_cons_change_pct',
+    'renewables_cons_change_twh', 'renewables_consumption', 'renewables_elec_per_capita', 'renewables_electricity',
+    'renewables_energy_per_capita', 'renewables_share_elec', 'renewables_share_energy', 'solar_cons_change_pct',
+    'solar_cons_change_twh', 'solar_consumption', 'solar_elec_per_capita', 'solar_electricity',
+    'solar_energy_per_capita', 'solar_share_elec', 'solar_share_energy', 'wind_cons_change_pct',
+    'wind_cons_change_twh', 'wind_consumption', 'wind_elec_per_capita', 'wind_electricity',
+    'wind_energy_per_capita', 'wind_share_elec', 'wind_share_energy',
+]
+
+# (low, high) of each measure, and whether it rises (+1) or falls (-1) with development.
+WHR_RANGES = {
+    "Life Ladder": (2.5, 8.0, 1), "Log GDP per capita": (6.5, 11.5, 1), "Social support": (0.4, 0.98, 1),
+    "Healthy life expectancy at birth": (40.0, 75.0, 1), "Freedom to make life choices": (0.3, 0.98, 1),
+    "Generosity": (-0.3, 0.5, 1), "Perceptions of corruption": (0.1, 0.95, -1),
+    "Positive affect": (0.3, 0.85, 1), "Negative affect": (0.1, 0.5, -1),
+}
+FOOD_RANGES = dict(zip(FOOD_MEASURES, [(1800.0, 3800.0, 1), (40.0, 120.0, 1), (20.0, 160.0, 1)]))
+OWID_RANGES = {
+    "hdi": (0.3, 0.95, 1),
+    "rule_of_law": (-2.0, 2.0, 1),
+    "median_age": (15.0, 45.0, 1),
+    "urban_population": (10.0, 100.0, 1),
+    "tax_revenue": (5.0, 45.0, 1),
+}
+
+
+@dataclass(frozen=True)
+class Dimensions:
+    """How big a synthetic dataset is: countries x years, and how much wider than the real files."""
+
+    countries: int
+    years: int
+    column_factor: int = 1
+
+    @property
+    def label(self):
+        return f"{self.countries}c-{self.years}y-{self.column_factor}w"
+
+
+SCALES = {
+    "1x": Dimensions(200, 60),
+    "10x": Dimensions(1_000, 120),
+    "100x": Dimensions(4_000, 150, column_factor=2),
+}
+
+
+def load_main_script(root=ROOT):
+    """`root`'s main-script.py as a module (its name has a dash, so no plain import). Each call gets a fresh copy."""
+    spec = importlib.util.spec_from_file_location("main_script", os.path.join(root, "main-script.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Panel:
+    """The country x year grid every source is cut from, plus the random state they share."""
+
+    def __init__(self, dims, seed):
+        self.dims = dims
+        self.rng = np.random.default_rng(seed)
+        self.names = np.array([f"Synthland {i:05d}" for i in range(dims.countries)], dtype=object)
+        self.codes = np.array([f"S{i:05d}" for i in range(dims.countries)], dtype=object)
+        self.years = np.arange(LAST_YEAR - dims.years + 1, LAST_YEAR + 1)
+        self.development = self.rng.random(dims.countries)
+
+    def rows(self):
+        """(country index, year) of a random ~KEEP_ROW share of the grid, in country-then-year order."""
+        country = np.repeat(np.arange(self.dims.countries), self.dims.years)
+        year = np.tile(self.years, self.dims.countries)
+        keep = self.rng.random(len(year)) < KEEP_ROW
+        return country[keep], year[keep]
+
+    def measure(self, country, year, low, high, direction=1):
+        """Values in [low, high], mostly set by development, drifting up over the years, plus noise."""
+        level = self.development[country] if direction > 0 else 1.0 - self.development[country]
+        trend = (year - self.years[0]) / max(len(self.years) - 1, 1)
+        noise = self.rng.random(len(country))
+        share = np.clip(0.65 * level + 0.15 * trend + 0.2 * noise, 0.0, 1.0)
+        return (low + (high - low) * share).round(4)
+
+    def filler(self, n_rows, columns, prefix):
+        """Columns nobody reads: random numbers with holes, as the real files have plenty of both."""
+        values = self.rng.random((n_rows, len(columns)), dtype=np.float32).round(3)
+        values[self.rng.random(values.shape, dtype=np.float32) < FILLER_MISSING] = np.nan
+        return pd.DataFrame(values, columns=[f"{prefix} {column}" for column in columns])
+
+    def n_filler(self, name, used):
+        return max(REAL_WIDTHS[name] * self.dims.column_factor - used, 0)
+
+
+def whr(panel):
+    country, year = panel.rows()
+    frame = pd.DataFrame({"Country name": panel.names[country], "year": year})
+    for measure in WHR_MEASURES:
+        frame[measure] = panel.measure(country, year, *WHR_RANGES[measure])
+    filler = panel.filler(len(frame), range(panel.n_filler("whr", frame.shape[1])), "Extra measure")
+    return pd.concat([frame, filler], axis=1)
+
+
+def tedi(panel):
+    """Wide: Country, Regime type, then one column per year, newest first. Every column is read, so no filler."""
+    country = np.arange(panel.dims.countries)
+    frame = pd.DataFrame({"Country": panel.names, "Regime type": ""})
+    for year in panel.years[::-1]:
+        frame[int(year)] = panel.measure(country, np.full(len(country), year), 1.0, 9.9).round(2)
+    frame["Regime type"] = pd.cut(frame[int(panel.years[-1])], [0, 4, 6, 8, 10],
+                                  labels=["Authoritarian", "Hybrid regime", "Flawed democracy", "Full democracy"])
+    return frame
+
+
+def energy(panel):
+    country, year = panel.rows()
+    frame = pd.DataFrame({
+        "country": panel.names[country], "year": year, "iso_code": panel.codes[country],
+        "population": panel.measure(country, year, 1e5, 1e9).round(),
+        "gdp": panel.measure(country, year, 1e9, 2e13).round(),
+    })
+    for column in RENEWABLE_ELECTRICITY + NON_RENEWABLE_ELECTRICITY + ENERGY_KEPT:
+        frame[column] = panel.measure(country, year, 0.0, 500.0)
+    filler = panel.filler(len(frame), range(panel.n_filler("energy", frame.shape[1])), "other_energy_metric")
+    named = [column for column in ENERGY_HEADER if column not in frame.columns][:filler.shape[1]]
+    filler.columns = named + list(filler.columns[len(named):])
+    return pd.concat([frame, filler], axis=1)
+
+
+def food(panel):
+    country, year = panel.rows()
+    frame = pd.DataFrame({"Product": "", "Country": panel.names[country], "Year": year})
+    for measure in FOOD_MEASURES:
+        frame[measure] = panel.measure(country, year, *FOOD_RANGES[measure])
+    filler = panel.filler(len(frame), range(panel.n_filler("food", frame.shape[1])), "Food metric")
+    return pd.concat([frame, filler], axis=1)
+
+
+def owid(panel, name, values):
+    """Entity, Code, Year, then `values` (column -> array for the kept rows), then filler."""
+    country, year = panel.rows()
+    frame = pd.DataFrame({"Entity": panel.names[country], "Code": panel.codes[country], "Year": year})
+    for column, make in values.items():
+        frame[column] = make(country, year)
+    filler = panel.filler(len(frame), range(panel.n_filler(name, frame.shape[1])), "Other indicator")
+    return pd.concat([frame, filler], axis=1)
+
+
+def raw_value_column(name):
+    """The raw column an Entity/Year/<value> source is read from."""
+    return next(raw for raw in SOURCE_SCHEMAS[name].columns if raw not in ("Entity", "Year"))
+
+
+def build_sources(panel):
+    """Every source as (name, DataFrame in its raw layout), one at a time so only one is ever in memory."""
+    yield "whr", whr(panel)
+    yield "tedi", tedi(panel)
+    yield "energy", energy(panel)
+    yield "food", food(panel)
+    yield "deaths", owid(panel, "deaths", {
+        raw_value_column("deaths"): lambda c, y: panel.rng.poisson(200 * (1 - panel.development[c]) ** 3),
+    })
+    yield "air_pollution", owid(panel, "air_pollution", {
+        pollutant: lambda c, y: panel.measure(c, y, 1e3, 5e6) for pollutant in AIR_POLLUTANTS
+    })
+    for name, (low, high, direction) in OWID_RANGES.items():
+        yield name, owid(panel, name, {
+            raw_value_column(name): lambda c, y: panel.measure(c, y, low, high, direction),
+        })
+
+
+def write_sources(directory, dims, file_paths, seed=42):
+    """
+    Write every source for `dims` into `directory`, named like the files in `file_paths` (FILE_PATHS).
+
+    Returns the {name: path} to point FILE_PATHS at. The files are deterministic for
+    (dims, seed), and a manifest records both: if the directory already holds that
+    exact set, nothing is written again.
+    """
+    paths = {}
+    for name, path in file_paths.items():
+        stem, extension = os.path.splitext(os.path.basename(path))
+        paths[name] = os.path.join(directory, stem + (".xlsx" if extension == ".xls" else extension))
+    manifest_path = os.path.join(directory, MANIFEST)
+    wanted = {"dims": asdict(dims), "seed": seed, "layout": LAYOUT,
+              "files": sorted(os.path.basename(p) for p in paths.values())}
+    if os.path.exists(manifest_path) and all(os.path.exists(path) for path in paths.values()):
+        with open(manifest_path, encoding="utf-8") as handle:
+            if json.load(handle) == wanted:
+                return paths
+
+    panel = Panel(dims, seed)
+    os.makedirs(directory, exist_ok=True)
+    for name, frame in build_sources(panel):
+        path = paths[name]
+        if path.endswith(".xlsx"):
+            if len(frame) > EXCEL_MAX_ROWS:
+                raise ValueError(f"{name}: {len(frame):,} rows don't fit in an Excel sheet; use fewer countries or years")
+            frame.to_excel(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+    with open(manifest_path, "w", encoding="utf-8") as handle:
+        json.dump(wanted, handle, indent=2)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output", help="Directory to write the sources to.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    dims = SCALES[args.scale]
+    paths = write_sources(args.output, dims, load_main_script().FILE_PATHS, seed=args.seed)
+    total = sum(os.path.getsize(path) for path in paths.values())
+    print(f"{args.scale} ({dims.label}): {len(paths)} sources, {total / 1e6:.1f} MB in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
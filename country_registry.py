@@ -0,0 +1,176 @@
+"""
+Canonical country registry: every raw spelling -> one stable integer country ID.
+
+Our sources can't agree on what to call anyone ("Türkiye" vs "Turkey", "Congo
+(Kinshasa)" vs "Democratic Republic of Congo", TEDI's non-breaking spaces...).
+The registry in data/country_registry.csv lists each country once, with its ID,
+its canonical name and its known aliases. IDs are append-only, so a country keeps
+its ID forever and new names simply get the next one.
+
+Encoded country columns are pandas Categoricals whose categories are the canonical
+names in ID order, so `.cat.codes` *are* the country IDs. Joins, groupbys and
+filters can then run on small integers instead of strings. Name normalization is
+memoized per distinct raw value, never computed per row.
+"""
+import csv
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_PATH = "data/country_registry.csv"
+ALIAS_SEPARATOR = "|"
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+@lru_cache(maxsize=None)
+def normalize_key(raw):
+    """Lookup key for a raw country spelling: no accents, punctuation, case or extra spaces."""
+    text = unicodedata.normalize("NFKD", str(raw))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", text).split()).casefold()
+
+
+def clean_display_name(raw):
+    """A presentable name for a spelling we have never seen: just tidy up the whitespace."""
+    return " ".join(str(raw).split())
+
+
+class CountryRegistry:
+    """Maps raw country spellings (and aliases) to stable integer IDs and back."""
+
+    def __init__(self, names=(), aliases=None):
+        self.names = []
+        self.aliases = {}  # country_id -> alternative spellings
+        self.added = []  # Names registered during this run that aren't on disk yet.
+        self._ids_by_key = {}
+        self._ids_by_raw = {}
+        self._dtype = None
+        for name in names:
+            self._register(name)
+        for alias, name in (aliases or {}).items():
+            self.add_alias(alias, self._ids_by_key[normalize_key(name)])
+
+    @classmethod
+    def from_csv(cls, path=REGISTRY_PATH):
+        """Load the registry file (country_id, country, aliases)."""
+        registry = cls()
+        with open(path, newline="", encoding="utf-8") as handle:
+            for expected_id, row in enumerate(csv.DictReader(handle)):
+                if int(row["country_id"]) != expected_id:
+                    raise ValueError(f"{path}: country IDs must be 0, 1, 2, ... in order (got {row['country_id']}).")
+                country_id = registry._register(row["country"])
+                for alias in filter(None, row["aliases"].split(ALIAS_SEPARATOR)):
+                    registry.add_alias(alias, country_id)
+        return registry
+
+    def save(self, path=REGISTRY_PATH):
+        """Write the registry back to disk (atomically), including any newly added countries."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["country_id", "country", "aliases"])
+            for country_id, name in enumerate(self.names):
+                writer.writerow([country_id, name, ALIAS_SEPARATOR.join(self.aliases.get(country_id, []))])
+        os.replace(tmp_path, path)
+        self.added = []
+
+    def add_alias(self, alias, country_id):
+        """Teach the registry another spelling of an existing country."""
+        key = normalize_key(alias)
+        if self._ids_by_key.get(key, country_id) != country_id:
+            raise ValueError(f"Alias '{alias}' already points at {self.names[self._ids_by_key[key]]}.")
+        self._ids_by_key[key] = country_id
+        self.aliases.setdefault(country_id, []).append(alias)
+
+    def _register(self, name):
+        key = normalize_key(name)
+        if key in self._ids_by_key:
+            return self._ids_by_key[key]
+        country_id = len(self.names)
+        self.names.append(name)
+        self._ids_by_key[key] = country_id
+        self._dtype = None
+        return country_id
+
+    def id_of(self, raw):
+        """The country ID for a raw spelling, registering it as a new country if we've never seen it."""
+        if raw in self._ids_by_raw:
+            return self._ids_by_raw[raw]
+        country_id = self._ids_by_key.get(normalize_key(raw))
+        if country_id is None:
+            country_id = self._register(clean_display_name(raw))
+            self.added.append(self.names[country_id])
+        self._ids_by_raw[raw] = country_id
+        return country_id
+
+    def find(self, raw):
+        """The country ID for a raw spelling, or None if we've never seen it (unlike id_of, this never registers)."""
+        if raw in self._ids_by_raw:
+            return self._ids_by_raw[raw]
+        return self._ids_by_key.get(normalize_key(raw))
+
+    def name_of(self, country_id):
+        """The canonical name for a country ID."""
+        return self.names[country_id]
+
+    @property
+    def dtype(self):
+        """The shared CategoricalDtype: canonical names in ID order, so codes == country IDs."""
+        if self._dtype is None or len(self._dtype.categories) != len(self.names):
+            self._dtype = pd.CategoricalDtype(self.names)
+        return self._dtype
+
+    def encode(self, countries):
+        """
+        Encode a Series of raw country spellings as a registry Categorical.
+
+        Only the distinct values are looked up (a categorical input only needs its
+        categories), then the rows are remapped with a single numpy take.
+        """
+        if isinstance(countries.dtype, pd.CategoricalDtype):
+            uniques, codes = countries.cat.categories, countries.cat.codes.to_numpy()
+            if len(codes) < len(uniques):
+                # A few rows left of a long category list (a filtered read): look up only the spellings in use.
+                used = np.unique(codes[codes >= 0])
+                uniques, codes = uniques[used], np.where(codes >= 0, np.searchsorted(used, codes), -1)
+        else:
+            codes, uniques = pd.factorize(countries)
+        unique_ids = np.array([self.id_of(raw) for raw in uniques] + [-1], dtype=np.int32)
+        ids = unique_ids[codes]  # codes == -1 (missing) picks up the trailing -1.
+        return pd.Series(pd.Categorical.from_codes(ids, dtype=self.dtype), index=countries.index, name=countries.name)
+
+    def check_unique_keys(self, raw, encoded, years):
+        """
+        Raise a ValueError naming the raw spellings behind any (country, year) that occurs twice.
+
+        The usual cause is an alias folding two spellings one source uses side by side
+        ("Turkey" and "Türkiye" in the same years) into one country, which the join can't
+        tell apart. Rows without a country are ignored.
+        """
+        codes = encoded.cat.codes.to_numpy().astype(np.int64)
+        keys = pd.Series(codes * 65536 + years.to_numpy().astype(np.int64))
+        duplicated = keys.duplicated(keep=False).to_numpy() & (codes >= 0)
+        if not duplicated.any():
+            return
+        clashes = pd.DataFrame({"id": codes[duplicated], "year": years.to_numpy()[duplicated],
+                                "raw": np.asarray(raw, dtype=object)[duplicated]})
+        lines = [f"{self.name_of(int(country_id))} {int(year)}: {', '.join(repr(r) for r in sorted(set(group['raw'])))}"
+                 for (country_id, year), group in clashes.groupby(["id", "year"], sort=True)]
+        more = f" (and {len(lines) - 5} more)" if len(lines) > 5 else ""
+        raise ValueError(
+            "Several rows map to the same (Country, Year) – "
+            + "; ".join(lines[:5]) + more
+            + f". Drop the duplicate rows or fix the aliases in {REGISTRY_PATH}."
+        )
+
+
+def load_registry(path=REGISTRY_PATH):
+    """Load the country registry, or start an empty one if the file doesn't exist yet."""
+    if os.path.exists(path):
+        return CountryRegistry.from_csv(path)
+    return CountryRegistry()
@@ -0,0 +1,185 @@
+"""
+Typed, columnar outputs for the consolidated dataset.
+
+Besides the CSV, the build writes:
+  * Money_vs_Happiness_dataset.feather – an uncompressed Arrow IPC file, so readers
+    can memory-map it and get the columns without parsing (or even copying) anything,
+  * Money_vs_Happiness_dataset.parquet/ – Parquet partitioned by year
+    (Year=2015/part-0.parquet, ...), so a reader that wants a few years only
+    opens those files, and only reads the columns it asks for.
+
+Both carry the Arrow schema (category countries, int16 years, float32 measures)
+plus a dataset version in their metadata: a hash of the data itself, readable
+without loading any rows. Missing measures are stored as NaN rather than Arrow
+nulls, which is what lets float columns come back zero-copy.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from source_schema import measure_values
+
+DATASET_FEATHER = "Money_vs_Happiness_dataset.feather"
+DATASET_PARQUET = "Money_vs_Happiness_dataset.parquet"
+DATASET_CSV = "Money_vs_Happiness_dataset.csv"
+FORMATS = ("feather", "parquet", "csv")
+
+_VERSION_KEY = b"cosgdd_version"
+
+
+def content_version(df):
+    """A short hash of the frame's columns and values – the same data always gets the same version."""
+    digest = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def to_arrow(df, version=None):
+    """Arrow table for `df`, with NaN kept as NaN in float columns and the version in the schema metadata."""
+    arrays = []
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind == "f":
+            # from_pandas=False: NaN stays a float value, no validity bitmap, so reads can be zero-copy.
+            arrays.append(pa.array(series.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.Array.from_pandas(series))
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+    return table.replace_schema_metadata({_VERSION_KEY: (version or content_version(df)).encode("utf-8")})
+
+
+def write_dataset(df, formats=FORMATS, feather_path=DATASET_FEATHER, parquet_path=DATASET_PARQUET,
+                  csv_path=DATASET_CSV, drop_stale=False):
+    """
+    Write the dataset in each of `formats` (atomically per format) and return its version.
+
+    With `drop_stale`, a Feather or Parquet output at these paths that isn't in
+    `formats` is removed: it holds an older build, and default_path() would still
+    pick it over the CSV just written.
+    """
+    version = content_version(df)
+    table = to_arrow(df, version)
+
+    if "feather" in formats:
+        tmp_path = f"{feather_path}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, feather_path)
+
+    if "parquet" in formats:
+        tmp_dir = f"{parquet_path}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        partitioning = ds.partitioning(pa.schema([table.schema.field("Year")]), flavor="hive")
+        ds.write_dataset(table, tmp_dir, format="parquet", partitioning=partitioning,
+                         basename_template="part-{i}.parquet")
+        # Partition files don't keep the table metadata, so the schema gets the usual _common_metadata file.
+        os.makedirs(tmp_dir, exist_ok=True)  # An empty table writes no partitions, hence no directory.
+        pq.write_metadata(table.schema, os.path.join(tmp_dir, "_common_metadata"))
+        old_dir = f"{parquet_path}.old"
+        if os.path.exists(parquet_path):
+            os.replace(parquet_path, old_dir)
+        os.replace(tmp_dir, parquet_path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    if "csv" in formats:
+        write_csv(df, csv_path)
+
+    if drop_stale:
+        for fmt, path in (("feather", feather_path), ("parquet", parquet_path)):
+            if fmt not in formats:
+                remove_output(path)
+    return version
+
+
+def remove_output(path):
+    """Delete a dataset output (a file, or Parquet's directory) if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def widen_measures(df):
+    """
+    `df` with its float32 measures widened to float64 at the decimals they were read from.
+
+    Printed as they are, float32 columns show their representation error (3.7235899
+    for 3.72359), in CSV and JSON alike.
+    """
+    widened = {column: measure_values(df[column].to_numpy()) for column in df.columns
+               if isinstance(df[column].dtype, np.dtype) and df[column].dtype == np.float32}
+    return df.assign(**widened) if widened else df
+
+
+def write_csv(df, path):
+    """
+    Write `df` as CSV (atomically), with float32 measures widened (see widen_measures), so the
+    published CSVs keep the precision they had before the measures were stored as float32.
+    """
+    tmp_path = f"{path}.tmp"
+    widen_measures(df).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _schema(path):
+    """The stored Arrow schema (with our metadata), without reading any data."""
+    if os.path.isdir(path):
+        return pq.read_schema(os.path.join(path, "_common_metadata"))
+    return feather.read_table(path, memory_map=True, columns=[]).schema
+
+
+def stored_version(path):
+    """The dataset version recorded when `path` (Feather or Parquet) was written."""
+    return (_schema(path).metadata or {}).get(_VERSION_KEY, b"").decode("utf-8") or None
+
+
+def default_path():
+    """The best dataset output on disk: Feather, then Parquet, then the CSV."""
+    return next((p for p in (DATASET_FEATHER, DATASET_PARQUET) if os.path.exists(p)), DATASET_CSV)
+
+
+def _year_filter(years):
+    if years is None:
+        return None
+    return (ds.field("Year") >= years[0]) & (ds.field("Year") <= years[1])
+
+
+def read_dataset(path=None, columns=None, years=None):
+    """
+    Read the dataset with only `columns` (default: all) and `years` ((first, last), inclusive).
+
+    Feather is memory-mapped, so untouched columns are never read and float columns
+    come back as views of the mapping. Parquet prunes whole year partitions before
+    reading anything (its rows come back grouped by year). Falls back to the CSV
+    when no columnar output exists.
+    """
+    path = path or default_path()
+    if path.endswith(".csv"):
+        usecols = None if columns is None else list(dict.fromkeys(list(columns) + ["Year"] * (years is not None)))
+        df = pd.read_csv(path, usecols=usecols)
+        if years is not None:
+            df = df[(df["Year"] >= years[0]) & (df["Year"] <= years[1])].reset_index(drop=True)
+        return df if columns is None else df[list(columns)]
+
+    schema = _schema(path)
+    wanted = list(columns) if columns is not None else schema.names
+    if os.path.isdir(path):
+        partitioning = ds.partitioning(pa.schema([schema.field("Year")]), flavor="hive")
+        # The stored schema, not one inferred from the files: an empty dataset has no files to infer from.
+        dataset = ds.dataset(path, schema=schema, format="parquet", partitioning=partitioning)
+        table = dataset.to_table(columns=wanted, filter=_year_filter(years))
+        # The partition column lands at the end; put everything back in the stored order.
+        table = table.select(wanted).cast(pa.schema([schema.field(name) for name in wanted]))
+    else:
+        read_columns = wanted if years is None or "Year" in wanted else wanted + ["Year"]
+        table = feather.read_table(path, columns=read_columns, memory_map=True)
+        if years is not None:
+            table = table.filter(_year_filter(years)).select(wanted)
+    return table.to_pandas(split_blocks=True, self_destruct=False)
@@ -0,0 +1,181 @@
+"""
+Declarative registry of the engineered features, plus the engine that computes them.
+
+Feature Engineering Context:
+So, this all started with a quick 10-minute call to my psych professor.
+Spoiler: it turned into an hour-long lecture on happiness, societal dynamics, and a bit of "you should do grad school!"
+The features below are inspired by that enlightening monologue (worth every minute, honestly).
+
+Each feature declares its formula (a DataFrame.eval expression) and what it depends on.
+compute_features() works out which inputs and helpers the requested features need,
+then evaluates all of them in one fused DataFrame.eval pass (numexpr-backed when
+numexpr is installed) over just those columns. Ask for two features, compute two features.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from source_schema import measure_values
+
+
+@dataclass(frozen=True)
+class Feature:
+    """An engineered column: a DataFrame.eval expression and the columns/helpers it reads."""
+
+    expression: str
+    depends_on: tuple
+    description: str = ""
+
+
+@dataclass(frozen=True)
+class Helper:
+    """An intermediate column that can't be written as an eval expression (e.g. a grouped diff)."""
+
+    compute: callable
+    depends_on: tuple
+
+
+def _gdp_change(dataset):
+    """Year-over-year change in Log GDP per capita within each country (in file order, like it always was)."""
+    return dataset.groupby("Country", observed=True)["Log GDP per capita"].diff()
+
+
+HELPERS = {
+    "gdp_change": Helper(_gdp_change, ("Country", "Log GDP per capita")),
+}
+
+FEATURES = {
+    # 1. Freedom Index: Blending financial freedom (GDP) with perceived life choice autonomy.
+    # The professor was adamant: happiness thrives when people feel in control of their lives. Makes sense!
+    "Freedom_Index": Feature(
+        "`Log GDP per capita` * `Freedom to make life choices`",
+        ("Log GDP per capita", "Freedom to make life choices"),
+        "Log GDP per capita × Freedom to make life choices",
+    ),
+    # 2. Generosity per Dollar: Normalizing generosity by GDP, because just tossing dollars isn’t impressive.
+    # Turns out, it’s not about how much you have, but how much you’re willing to give. Deep stuff, right?
+    "Generosity_Per_Dollar": Feature(
+        "`Generosity` / `Log GDP per capita`",
+        ("Generosity", "Log GDP per capita"),
+        "Generosity ÷ Log GDP per capita",
+    ),
+    # 3. Trust Factor: A blend of trust (or lack of corruption) and life satisfaction.
+    # The prof called this the "trust glue" of society. Without trust, happiness crumbles faster than my willpower during finals.
+    "Trust_Factor": Feature(
+        "(1 - `Perceptions of corruption`) * `Life Ladder`",
+        ("Perceptions of corruption", "Life Ladder"),
+        "(1 − Perceptions of corruption) × Life Ladder",
+    ),
+    # 4. Social Cushion Index: Social support meets happiness – it’s like having a group project partner
+    # who actually does their part. Life feels safer and better with strong connections.
+    "Social_Cushion_Index": Feature(
+        "`Social support` * `Life Ladder`",
+        ("Social support", "Life Ladder"),
+        "Social support × Life Ladder",
+    ),
+    # 5. Urban Stress Balance: Urban living and stress levels squared off here.
+    # The prof said cities bring more opportunities *and* more anxiety. This feature shows who’s thriving and who’s just surviving.
+    "Urban_Stress_Balance": Feature(
+        "`Urban Population (%)` * `Negative affect`",
+        ("Urban Population (%)", "Negative affect"),
+        "Urban Population (%) × Negative affect",
+    ),
+    # 6. Hedonic Growth Rate: GDP growth and happiness, year-over-year. Inspired by the "Hedonic Treadmill" idea:
+    # that shiny new GDP might not always make you happier. The prof compared this to chasing grades but never feeling satisfied. Ouch.
+    "Hedonic_Growth_Rate": Feature(
+        "gdp_change / `Life Ladder`",
+        ("gdp_change", "Life Ladder"),
+        "year-over-year change in Log GDP per capita ÷ Life Ladder",
+    ),
+    # 7. Environmental Bonus: Adjusting happiness for environmental damage.
+    # Because being happy while polluting the planet isn’t cool, no matter how rich you are.
+    "Environmental_Bonus": Feature(
+        "`Life Ladder` / (1 + `Total_Emissions`)",
+        ("Life Ladder", "Total_Emissions"),
+        "Life Ladder ÷ (1 + Total Emissions)",
+    ),
+    # 8. Positivity Ratio: The ultimate vibes metric – good affect divided by bad affect.
+    # Positivity should outweigh negativity, but the professor warned me about "toxic positivity." Balance is key.
+    # The 1e-6 is a safety net for zero negativity, rare but possible.
+    "Positivity_Ratio": Feature(
+        "`Positive affect` / (`Negative affect` + 1e-6)",
+        ("Positive affect", "Negative affect"),
+        "Positive affect ÷ (Negative affect + 1e-6)",
+    ),
+    # 9. Trade-Off Index: GDP per happiness – the "is it worth it?" metric.
+    # Prof’s words: "If you’re rich but miserable, what’s the point?" Wise, yet slightly unsettling.
+    "Trade_Off_Index": Feature(
+        "`Log GDP per capita` / `Life Ladder`",
+        ("Log GDP per capita", "Life Ladder"),
+        "Log GDP per capita ÷ Life Ladder",
+    ),
+}
+
+
+def _widen(column):
+    """
+    float32 -> float64 at the decimal the value was read from (see source_schema.measure_values).
+
+    A plain astype would carry float32's representation error into float64 (7.35 -> 7.349999904...),
+    and differences like the GDP diff below would amplify it.
+    """
+    if column.dtype != np.float32:
+        return column
+    return pd.Series(measure_values(column.to_numpy()), index=column.index, name=column.name)
+
+
+def resolve(names=None):
+    """
+    Work out what computing `names` (default: every feature) takes.
+
+    Returns (features, helpers, columns): the features to evaluate in dependency
+    order (including any feature another one builds on), the helpers they need,
+    and the dataset columns they read.
+    """
+    names = list(FEATURES) if names is None else list(names)
+    features, helpers, columns = [], [], []
+
+    def visit(name, trail=()):
+        if name in trail:
+            raise ValueError(f"Feature dependency cycle: {' -> '.join(trail + (name,))}")
+        if name in features or name in helpers or name in columns:
+            return
+        if name in FEATURES:
+            for dependency in FEATURES[name].depends_on:
+                visit(dependency, trail + (name,))
+            features.append(name)
+        elif name in HELPERS:
+            for dependency in HELPERS[name].depends_on:
+                visit(dependency, trail + (name,))
+            helpers.append(name)
+        else:
+            columns.append(name)
+
+    for name in names:
+        if name not in FEATURES:
+            raise KeyError(f"Unknown feature '{name}'. Known features: {', '.join(FEATURES)}")
+        visit(name)
+    return features, helpers, columns
+
+
+def compute_features(dataset, names=None):
+    """
+    Return `dataset` with the requested engineered features (default: all of them) appended.
+
+    Only the columns the features actually read are touched; everything requested is
+    evaluated in a single DataFrame.eval call. `dataset` itself is not modified.
+    """
+    features, helpers, columns = resolve(names)
+    missing = [column for column in columns if column not in dataset.columns]
+    if missing:
+        raise KeyError(f"The dataset is missing columns needed for these features: {missing}")
+
+    work = pd.DataFrame({column: _widen(dataset[column]) for column in columns}, index=dataset.index)
+    if helpers:
+        work = work.assign(**{name: HELPERS[name].compute(work) for name in helpers})
+    expression = "\n".join(f"{name} = {FEATURES[name].expression}" for name in features)
+    evaluated = work.eval(expression)
+
+    requested = features if names is None else [name for name in features if name in set(names)]
+    return pd.concat([dataset, evaluated[requested]], axis=1)
@@ -0,0 +1,124 @@
+"""
+Rendered-figure cache and level-of-detail scatter points for the dashboard.
+
+Drawing a matplotlib figure costs far more than the data behind it, and on every
+rerun the dashboard used to redraw all of its charts even when nothing they show
+had changed. FigureCache keeps the rendered PNG bytes of each chart under a key
+of (chart, filter state, dataset version), evicting the least recently used ones
+once it holds `max_entries`, so a rerun that doesn't change a chart just sends
+the same bytes again.
+
+The scatter plot is also slow for another reason: one marker per row. Above a
+point budget, lod_points() bins each group's points into a grid and draws one
+marker per occupied cell (at the mean of its points, sized by how many there
+are), coarsening the grid until the budget is met. Below it, every row is drawn.
+lod_scatter() draws those points the way the dashboard does, with seaborn.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+COUNT = "Points"
+
+
+class FigureCache:
+    """LRU cache of rendered figures (PNG bytes), safe to share between sessions."""
+
+    def __init__(self, max_entries=64, dpi=100):
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self.hits = self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def __contains__(self, key):
+        return key in self._figures
+
+    def get_or_render(self, key, render):
+        """PNG bytes for `key`, calling `render()` (which returns a matplotlib Figure) only on a miss."""
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                return self._figures[key]
+            self.misses += 1
+
+        # Render outside the lock: two sessions may draw the same chart at once, but nobody waits on a stranger's plot.
+        buffer = io.BytesIO()
+        render().savefig(buffer, format="png", dpi=self.dpi, bbox_inches="tight")
+        png = buffer.getvalue()
+
+        with self._lock:
+            self._figures[key] = png
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+def lod_points(data, x, y, hue, max_points):
+    """
+    At most `max_points` scatter points for `data`: every row if it fits, otherwise per-`hue` grid aggregates.
+
+    Returns a frame with `x`, `y`, `hue` and a COUNT column (rows behind each point).
+    Groups are never merged, so with more groups than `max_points` you get one point per group.
+    Rows missing x or y are dropped either way, as the scatter would skip them anyway.
+    """
+    points = data[[x, y, hue]].dropna(subset=[x, y])
+    if isinstance(points[hue].dtype, pd.CategoricalDtype):
+        # The registry's Country lists every country there is; seaborn would give each a legend entry and a colour.
+        points = points.assign(**{hue: points[hue].cat.remove_unused_categories()})
+    if len(points) <= max_points:
+        return points.assign(**{COUNT: 1}).reset_index(drop=True)
+
+    xs, ys = points[x].to_numpy(np.float64), points[y].to_numpy(np.float64)
+    x_span, y_span = np.ptp(xs) or 1.0, np.ptp(ys) or 1.0
+    groups = max(points[hue].nunique(), 1)
+    bins = max(int(np.sqrt(max_points / groups)), 1) * 2  # Start finer than the budget; coarsen until it fits.
+    while True:
+        cell_x = np.minimum(((xs - xs.min()) / x_span * bins).astype(np.int64), bins - 1)
+        cell_y = np.minimum(((ys - ys.min()) / y_span * bins).astype(np.int64), bins - 1)
+        cells = points.assign(_cell=cell_x * bins + cell_y)
+        aggregated = cells.groupby([hue, "_cell"], observed=True, sort=False).agg(
+            **{x: (x, "mean"), y: (y, "mean"), COUNT: (x, "size")}
+        )
+        if len(aggregated) <= max_points or bins == 1:
+            break
+        bins = max(bins // 2, 1)
+    return aggregated.reset_index(level=hue).reset_index(drop=True)[[x, y, hue, COUNT]]
+
+
+def lod_scatter(data, x, y, hue, max_points, max_legend=20):
+    """
+    The dashboard's scatter: lod_points() drawn with seaborn on a new Figure, one colour per `hue`.
+
+    Markers are sized by COUNT once points were aggregated; the legend is left out past
+    `max_legend` groups. Returns (figure, axes, points) for the caller to title.
+    """
+    import seaborn as sns  # Only once a chart actually gets drawn.
+    from matplotlib.figure import Figure
+
+    points = lod_points(data, x, y, hue, max_points)
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.scatterplot(
+        data=points, x=x, y=y, hue=hue, size=COUNT if len(points) < len(data) else None, alpha=0.7,
+        legend="auto" if points[hue].nunique() <= max_legend else False,  # A 150-line legend helps nobody.
+        ax=ax,
+    )
+    return fig, ax, points
+
+
+def state_key(*parts):
+    """A hashable cache key from filter state: lists become sorted tuples, so pick order doesn't matter."""
+    return tuple(tuple(sorted(part)) if isinstance(part, (list, set, pd.Index)) else part for part in parts)
@@ -0,0 +1,189 @@
+"""
+Cached, parallel LIME explanations (and the dashboard's LIME animation).
+
+Each explain_instance() perturbs its row a few thousand times and asks the model
+about every perturbation. Here:
+  * instances are explained in a process pool, each worker loading the booster
+    and building the explainer once (via the pool initializer),
+  * the model is queried through one batched inplace_predict on a contiguous
+    float32 matrix, skipping the DMatrix/DataFrame plumbing,
+  * every explanation is memoized on disk by (model key, instance hash), so an
+    instance we've explained before for this model is never recomputed,
+  * the rendered GIF is an artifact keyed on the model and the chosen instances,
+    rebuilt only when either changes.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # Rendering off-screen; there's no window to draw into.
+import matplotlib.pyplot as plt
+import numpy as np
+import xgboost
+from lime.lime_tabular import LimeTabularExplainer
+from matplotlib.animation import FuncAnimation
+
+DEFAULT_LIME_DIR = ".cache/lime"
+RANDOM_STATE = 42
+
+# Short labels for the animation's y axis.
+FEATURE_MAPPING = {
+    'Log GDP per capita': 'GDP',
+    'Social support': 'Social',
+    'Healthy life expectancy at birth': 'Life Exp.',
+    'Freedom to make life choices': 'Freedom',
+    'Generosity': 'Generosity',
+    'Perceptions of corruption': 'Corruption',
+    'Positive affect': 'Pos. Affect',
+    'Negative affect': 'Neg. Affect',
+    'Democracy_Index': 'Democracy',
+    'Total_Emissions': 'Emissions',
+    'Human Development Index': 'HDI',
+    'Rule_of_Law_Index': 'Rule of Law',
+    'Median Age': 'Median Age',
+    'Urban Population (%)': 'Urban Pop.',
+    'Tax_Revenue': 'Tax Revenue'
+}
+
+# Per-worker state, set up once by _init_worker.
+_BOOSTER = None
+_EXPLAINER = None
+
+
+def instance_hash(row):
+    """Hash of one instance's feature values."""
+    return hashlib.sha256(np.ascontiguousarray(row, dtype=np.float64).tobytes()).hexdigest()[:16]
+
+
+def batched_predict(booster):
+    """A predict_fn for LIME: the whole perturbation matrix in one inplace_predict call."""
+    def predict(batch):
+        return booster.inplace_predict(np.ascontiguousarray(batch, dtype=np.float32))
+    return predict
+
+
+def instance_seed(model_key, row):
+    """The random seed for explaining `row` under `model_key`: fixed per (model, instance), whoever explains it."""
+    return int(hashlib.sha256(f"{model_key}-{instance_hash(row)}".encode("utf-8")).hexdigest()[:8], 16)
+
+
+def make_explainer(training_data, features):
+    """The LIME explainer. Its RandomState is reseeded per instance (see _explain)."""
+    return LimeTabularExplainer(
+        training_data=np.asarray(training_data),
+        feature_names=features,
+        class_names=['Happiness'],
+        mode='regression',
+        random_state=RANDOM_STATE,
+    )
+
+
+def _init_worker(booster_path, training_data, features):
+    global _BOOSTER, _EXPLAINER
+    _BOOSTER = xgboost.Booster(model_file=booster_path)
+    _EXPLAINER = make_explainer(training_data, features)
+
+
+def _explain(model_key, row):
+    """Explain one row in a worker: its LIME contributions and the model's prediction."""
+    predict = batched_predict(_BOOSTER)
+    # The explainer's sampler and its regression share one RandomState. Reseeding it per instance makes
+    # each explanation independent of which worker explains which rows, and in what order.
+    _EXPLAINER.random_state.seed(instance_seed(model_key, row))
+    explanation = _EXPLAINER.explain_instance(np.asarray(row), predict)
+    return {"contributions": explanation.as_list(), "prediction": float(predict(np.asarray([row]))[0])}
+
+
+class LimeCache:
+    """LIME explanations memoized by (model key, instance), plus the cached animations."""
+
+    def __init__(self, directory=DEFAULT_LIME_DIR):
+        self.directory = directory
+
+    def _path(self, model_key, row):
+        return os.path.join(self.directory, "explanations", f"{model_key}-{instance_hash(row)}.json")
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _write(self, path, payload):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(f"{path}.tmp", path)
+
+    def explain(self, model_key, booster_path, training_data, features, rows, max_workers=None):
+        """
+        Explanations for `rows` (a 2-D array of instances), computing only the ones not seen before.
+
+        Returns one {"contributions": [(feature rule, weight), ...], "prediction": float} per row.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        paths = [self._path(model_key, row) for row in rows]
+        results = [self._read(path) if os.path.exists(path) else None for path in paths]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            init_args = (booster_path, np.asarray(training_data), list(features))
+            if max_workers == 1 or len(missing) == 1:
+                _init_worker(*init_args)
+                computed = [_explain(model_key, rows[i]) for i in missing]
+            else:
+                workers = min(len(missing), max_workers or os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+                    computed = list(pool.map(_explain, [model_key] * len(missing), [rows[i] for i in missing]))
+            for i, result in zip(missing, computed):
+                self._write(paths[i], result)
+                results[i] = result
+        return results
+
+    def animation_path(self, model_key, rows):
+        """Where the animation for these instances of this model lives."""
+        rows_hash = hashlib.sha256("".join(instance_hash(row) for row in np.asarray(rows)).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"animation-{model_key}-{rows_hash}.gif")
+
+    def animation(self, model_key, booster_path, training_data, features, rows, contexts, max_workers=None):
+        """The LIME animation GIF for `rows`, rendered only if this model/instance combination is new."""
+        path = self.animation_path(model_key, rows)
+        if not os.path.exists(path):
+            explanations = self.explain(model_key, booster_path, training_data, features, rows, max_workers)
+            os.makedirs(self.directory, exist_ok=True)
+            render_animation(explanations, contexts, f"{path}.tmp.gif")
+            os.replace(f"{path}.tmp.gif", path)
+        return path
+
+
+def render_animation(explanations, instance_contexts, filename, writer="imagemagick"):
+    """Render explanations as the bar-chart animation, one frame per instance."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Update function for the animation
+    def update(idx):
+        ax.clear()
+        contributions = explanations[idx]["contributions"]
+        contrib_features = [FEATURE_MAPPING.get(c[0], c[0]) for c in contributions]
+        contrib_values = [c[1] for c in contributions]
+
+        # Sort features by absolute contribution
+        sorted_indices = np.argsort(np.abs(contrib_values))[::-1]
+        contrib_features = [contrib_features[i] for i in sorted_indices]
+        contrib_values = [contrib_values[i] for i in sorted_indices]
+
+        # Positive and negative contributions
+        colors = ["green" if val > 0 else "red" for val in contrib_values]
+
+        ax.barh(contrib_features, contrib_values, color=colors, edgecolor="black")
+        ax.set_title(f"LIME Explanation for Instance {idx + 1}: {instance_contexts[idx]}\n"
+                     f"Predicted Happiness: {explanations[idx]['prediction']:.2f}",
+                     fontsize=16)
+        ax.set_xlabel("Contribution to Happiness Prediction", fontsize=12)
+        ax.set_ylabel("Feature", fontsize=2)
+        ax.grid(axis='x', linestyle='--', alpha=0.7)
+
+    # Create animation
+    ani = FuncAnimation(fig, update, frames=len(explanations), interval=3000, repeat=False)
+    ani.save(filename, writer=writer)
+    plt.close(fig)
@@ -1,16 +1,62 @@
 # pandas: The one library that's always there for you, even when your GPA isn't.
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-# requests: Because sometimes you just need to borrow data from the internet... politely.
-import requests
+# source_fetcher: Because sometimes you just need to borrow data from the internet... politely, and only what changed.
+from source_fetcher import refresh_sources, summarize
 
-# BeautifulSoup: Not food, but a tool to dig through messy HTML like it’s your dorm room.
-from bs4 import BeautifulSoup
+# argparse: For the grown-up switches (workers, cache) without editing the script every time.
+import argparse
+
+# time + concurrent.futures: Reading eleven files one after another is like queueing for one microwave at lunch.
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 # warnings: For all those times Python says, "Are you sure about this?" We're like, "Yes. Quiet, please."
 import warnings 
 warnings.filterwarnings('ignore')  # Like muting that one group chat during finals.
 
+# source_schema: Which columns we actually read from each source, what we rename them to, and how small we store them.
+from source_schema import (
+    SOURCE_SCHEMAS, RENEWABLE_ELECTRICITY, NON_RENEWABLE_ELECTRICITY, AIR_POLLUTANTS,
+)
+
+# country_registry: Every spelling of every country mapped to one stable integer ID. No more "Türkiye" vs "Turkey".
+from country_registry import load_registry
+
+# multiway_join: One join to rule them all, instead of ten pd.merge calls in a row.
+from multiway_join import multiway_join
+
+# source_cache: Parsed sources saved as Parquet, so warm rebuilds skip the slow readers entirely.
+from source_cache import SourceCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+# panel_store: Every source on one dense country x year grid, so a missing year can borrow from its neighbour.
+from panel_store import align_sources
+
+# dataset_store: The finished dataset as typed Feather (memory-mappable) and year-partitioned Parquet. The CSV is optional now.
+from dataset_store import remove_output, write_csv, write_dataset, DATASET_FEATHER, DATASET_PARQUET, FORMATS
+
+# feature_registry: The professor-approved engineered features, computed in one fused pass, no CSV round trip needed.
+from feature_registry import compute_features, resolve as resolve_features
+
+# subset_plan: Just Norway, 2015-2020, three columns? Then that's all we read, melt and join.
+from subset_plan import Subset, parse_years, raw_key_columns
+
+# stage_trace: Where did the time (and the rows) go? Opt-in, and free when you don't ask.
+from stage_trace import StageTrace, UNTRACED, total_rows
+
+# pipeline_dag: Change one file, rebuild only what depends on it. Like re-studying one chapter instead of the whole book.
+import inspect
+import multiway_join as multiway_join_module
+import panel_store as panel_store_module
+import dataset_store as dataset_store_module
+import feature_registry as feature_registry_module
+import source_schema as source_schema_module
+import country_registry as country_registry_module
+from country_registry import REGISTRY_PATH
+from pipeline_dag import Node, Pipeline
+
 
 # File paths: AKA the syllabus for this data project. Let's try to stay organized... for once.
 FILE_PATHS = {
@@ -27,37 +73,137 @@ FILE_PATHS = {
     "tax_revenue": "data/tax-revenues-as-a-share-of-gdp-unu-wider.csv",  # Paying taxes is inevitable. Knowing about them is optional.
 }
 
+# Where the finished products land.
+DATASET_PATH = "Money_vs_Happiness_dataset.csv"
+FEATURES_PATH = "Money_vs_Happiness_feature_engineered_dataset.csv"
+SUBSET_OUTPUT = "Money_vs_Happiness_subset"  # + .csv/.feather/.parquet, for --countries/--years/--columns builds.
+PIPELINE_DIR = ".cache/pipeline"
+
+# Streaming knobs. A parsed CSV cell costs roughly this many bytes while pandas is working on it
+# (parser buffers, the column itself, temporaries), which is how we turn a memory budget into a chunk size.
+PARSE_BYTES_PER_CELL = 64
+MIN_CHUNK_ROWS = 1_000
+
+# The country registry shared by every process_* step below.
+COUNTRIES = load_registry()
+
 # Function to load data. Think of it as assembling your study notes before a big exam (No ChatGPT, in our days, Chegg maybe!).
-def load_data():
-    """Load all datasets into a dictionary of DataFrames."""
-    data = {
-        "whr": pd.read_excel(FILE_PATHS["whr"]),  
-        "tedi": pd.read_excel(FILE_PATHS["tedi"]),  
-        "energy": pd.read_csv(FILE_PATHS["energy"]), 
-        "food": pd.read_csv(FILE_PATHS["food"]),  
-        "deaths": pd.read_csv(FILE_PATHS["deaths"]),
-        "air_pollution": pd.read_csv(FILE_PATHS["air_pollution"]), 
-        "hdi": pd.read_csv(FILE_PATHS["hdi"]), 
-        "rule_of_law": pd.read_csv(FILE_PATHS["rule_of_law"]),  
-        "median_age": pd.read_csv(FILE_PATHS["median_age"]), 
-        "urban_population": pd.read_csv(FILE_PATHS["urban_population"]),
-        "tax_revenue": pd.read_csv(FILE_PATHS["tax_revenue"]), 
-    }
-    return data  
+def parse_source(path, **read_options):
+    """Parse a raw source file. Excel files get the slow lane, everything else is a CSV."""
+    if path.endswith((".xls", ".xlsx")):
+        return pd.read_excel(path, **read_options)
+    return pd.read_csv(path, **read_options)
+
+def chunk_rows(n_columns, memory_budget):
+    """How many CSV rows we can parse at once and stay inside `memory_budget` bytes."""
+    return max(MIN_CHUNK_ROWS, memory_budget // (n_columns * PARSE_BYTES_PER_CELL))
+
+def stream_source(path, row_totals, memory_budget, **read_options):
+    """
+    Parse a CSV source in bounded chunks, applying its per-row totals to each chunk
+    and keeping only the projected result. Only one chunk of raw columns is ever in memory.
+    """
+    chunksize = chunk_rows(len(read_options.get("usecols") or [1]), memory_budget)
+    with pd.read_csv(path, chunksize=chunksize, **read_options) as reader:
+        chunks = [row_totals(chunk) for chunk in reader]
+    if not chunks:  # Header only – nothing to stream.
+        return row_totals(pd.read_csv(path, nrows=0, **read_options))
+
+    # Every chunk brings its own categories; pd.concat would fall back to plain strings,
+    # so glue the categoricals together properly and keep the output compact.
+    categorical = [column for column in chunks[0].columns if isinstance(chunks[0][column].dtype, pd.CategoricalDtype)]
+    combined = {column: union_categoricals([chunk[column] for chunk in chunks]) for column in categorical}
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for column, values in combined.items():
+        df[column] = values
+    return df[list(chunks[0].columns)]
+
+def read_source(name, cache=None, memory_budget=None, plan=None):
+    """
+    Read a single raw source by its FILE_PATHS key, timing how long it takes.
+
+    Column projection and dtypes come from the source's schema, so unused columns
+    are never parsed in the first place. With a `memory_budget` (bytes), sources that
+    only need per-row totals (see ROW_TOTALS) are streamed in chunks that fit the budget.
+    A SourcePlan (see subset_plan.py) narrows the read to a subset build's columns and rows.
+    """
+    path = FILE_PATHS[name]
+    read_options = SOURCE_SCHEMAS[name].read_options()
+    columns = plan.wants_column if plan is not None and plan.projects else None
+    if memory_budget and name in ROW_TOTALS and not path.endswith((".xls", ".xlsx")) and columns is None:
+        reader = partial(stream_source, row_totals=ROW_TOTALS[name], memory_budget=memory_budget, **read_options)
+        salt = repr((read_options, "streamed"))
+    else:
+        reader = partial(parse_source, **read_options)
+        salt = repr(read_options)
+    start = time.perf_counter()
+    if cache is None:
+        # Nothing cached to narrow down, so the parser itself only reads the planned columns.
+        if columns is not None:
+            reader = partial(parse_source, **dict(read_options, usecols=columns))
+        df, cached = reader(path), False
+    else:
+        # The cache keeps the whole parse; the plan's columns and rows are picked before conversion to pandas.
+        df, cached = cache.load(path, reader, salt=salt, columns=columns,
+                                rows=partial(plan.row_mask, registry=COUNTRIES) if plan is not None else None)
+    if plan is not None and (cache is None or not cache.enabled):
+        df = plan.filter_rows(df, COUNTRIES)
+    return name, df, time.perf_counter() - start, cached
+
+def report_load_timings(timings, wall_time):
+    """Print how long each source took, how many rows it produced and where it came from, slowest first."""
+    print(f"Loaded {len(timings)} sources in {wall_time:.2f}s wall time:")
+    for name, (seconds, rows, cached) in sorted(timings.items(), key=lambda item: item[1][0], reverse=True):
+        origin = "cache" if cached else "parsed"
+        print(f"  {name:<18} {seconds:7.2f}s  {rows:>8,} rows  ({origin})")
+
+def load_data(max_workers=None, use_processes=False, timings=None, verbose=True, cache=None, memory_budget=None,
+              plans=None):
+    """
+    Load all datasets concurrently into a dictionary of DataFrames.
+
+    Sources are read on a thread pool by default (pandas releases the GIL for most
+    of the CSV parsing); pass use_processes=True to parse on a process pool instead,
+    which helps with the pure-Python Excel readers. If a `timings` dict is given it is
+    filled with {name: (seconds, rows, cached)} for each source. With a SourceCache,
+    unchanged sources are read back from Parquet instead of being parsed again.
+    A `memory_budget` (bytes) streams the wide/long sources in ROW_TOTALS in chunks;
+    it is split evenly between them, since they may be streaming at the same time.
+    `plans` ({name: SourcePlan}) reads just what a subset build needs from each source.
+    """
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    timings = {} if timings is None else timings
+    loaded = {}
+
+    start = time.perf_counter()
+    with pool_class(max_workers=max_workers) as pool:
+        per_source_budget = memory_budget // len(ROW_TOTALS) if memory_budget else None
+        futures = [pool.submit(read_source, name, cache, per_source_budget, plans[name] if plans else None)
+                   for name in FILE_PATHS]
+        for future in as_completed(futures):
+            name, df, seconds, cached = future.result()
+            loaded[name] = df
+            timings[name] = (seconds, len(df), cached)
+    wall_time = time.perf_counter() - start
+
+    # Evict once everything is in, so workers never race each other on the cache directory.
+    if cache is not None:
+        cache.evict()
+
+    if verbose:
+        report_load_timings(timings, wall_time)
+
+    # Hand the sources back in FILE_PATHS order, same as the good old serial days.
+    return {name: loaded[name] for name in FILE_PATHS}
 
 def process_whr_dataset(whr):
     """Process the World Happiness Report dataset."""
+    schema = SOURCE_SCHEMAS["whr"]
     # Rename columns for consistency
-    whr.rename(columns={'Country name': 'Country', 'year': 'Year'}, inplace=True)
-    
-    # Remove non-alphanumeric characters from 'Country' column
-    whr['Country'] = whr['Country'].str.replace(r'[^\w\s]', '', regex=True)
+    whr = whr.rename(columns=schema.renames)
     
-    # Strip any leading/trailing spaces after cleaning
-    whr['Country'] = whr['Country'].str.strip()
-    
-    # Return the processed WHR DataFrame
-    return whr
+    # Map every country spelling to its registry ID and return the processed WHR DataFrame
+    return schema.finalize(whr, countries=COUNTRIES)
 
 def process_tedi_dataset(tedi):
     """Transform and clean the Economist Democracy Index dataset."""
@@ -68,219 +214,411 @@ def process_tedi_dataset(tedi):
     tedi_long["Year"] = tedi_long["Year"].astype(int)
     tedi_long = tedi_long[tedi_long["Year"] != 2006]  # 2006 didn’t make the cut.
 
-    # Clean up country names and get everything in order.
-    tedi_long['Country'] = tedi_long['Country'].str.replace(r'[^\w\s]', '', regex=True).str.strip()
-    tedi_long.sort_values(by=['Country', 'Year'], inplace=True)
-    return tedi_long  # Democracy, prepped for data justice.
+    # Encode country names (non-breaking spaces and all) and get everything in order.
+    tedi_long = SOURCE_SCHEMAS["tedi"].finalize(tedi_long, countries=COUNTRIES)
+    return tedi_long.sort_values(by=['Country', 'Year'])  # Democracy, prepped for data justice.
 
-def process_energy_dataset(energy_df):
+def add_energy_totals(energy_df):
     """
-    Process and clean the energy dataset by combining key metrics
-    and removing unnecessary columns. Let's make this dataset as
-    efficient as renewable energy should be.
+    Combine the electricity production metrics, row by row, and drop the inputs.
+    Works on the whole file or on one streamed chunk at a time.
     """
-    # Combine various energy consumption and production metrics.
     # Because who needs a hundred columns when you can just sum it up?
-    energy_df['renewables_consumption'] = (
-        energy_df['biofuel_consumption'] + energy_df['hydro_consumption'] +
-        energy_df['solar_consumption'] + energy_df['wind_consumption'] +
-        energy_df['other_renewable_consumption']
-    )
-    energy_df['non_renewables_consumption'] = (
-        energy_df['coal_consumption'] + energy_df['gas_consumption'] +
-        energy_df['oil_consumption'] + energy_df['nuclear_consumption']
-    )
-    energy_df['renewables_production'] = (
-        energy_df['biofuel_electricity'] + energy_df['hydro_electricity'] +
-        energy_df['solar_electricity'] + energy_df['wind_electricity'] +
-        energy_df['other_renewable_electricity']
-    )
-    energy_df['non_renewables_production'] = (
-        energy_df['coal_electricity'] + energy_df['gas_electricity'] +
-        energy_df['oil_electricity'] + energy_df['nuclear_electricity']
+    energy_df = energy_df.assign(
+        renewables_production=energy_df[RENEWABLE_ELECTRICITY].sum(axis=1, min_count=len(RENEWABLE_ELECTRICITY)),
+        non_renewables_production=energy_df[NON_RENEWABLE_ELECTRICITY].sum(axis=1, min_count=len(NON_RENEWABLE_ELECTRICITY)),
     )
 
-    # Add total consumption and production for good measure – more data, more fun.
-    energy_df['total_consumption'] = (
-        energy_df['renewables_consumption'] + energy_df['non_renewables_consumption']
-    )
+    # Add total production for good measure – more data, more fun.
     energy_df['total_production'] = (
         energy_df['renewables_production'] + energy_df['non_renewables_production']
     )
+    return energy_df.drop(columns=RENEWABLE_ELECTRICITY + NON_RENEWABLE_ELECTRICITY)
 
-   # Drop the original columns that have been combined, along with other unused columns
-    columns_to_drop = [
-        'biofuel_consumption', 'coal_consumption', 'gas_consumption', 'nuclear_consumption',
-        'oil_consumption', 'hydro_consumption', 'renewables_consumption', 'other_renewable_consumption',
-        'biofuel_electricity', 'coal_electricity', 'gas_electricity', 'nuclear_electricity',
-        'oil_electricity', 'hydro_electricity', 'renewables_electricity', 'other_renewable_electricity',
-        
-        'iso_code', 'population', 'gdp', 'biofuel_cons_change_pct', 'biofuel_cons_change_twh', 
-        'biofuel_cons_per_capita', 'biofuel_share_elec', 'biofuel_share_energy', 'carbon_intensity_elec',
-        'coal_cons_change_pct', 'coal_cons_change_twh', 'coal_cons_per_capita', 'coal_prod_change_pct', 
-        'coal_prod_change_twh', 'coal_prod_per_capita', 'coal_share_elec', 'coal_share_energy', 
-        'electricity_demand', 'electricity_generation', 'electricity_share_energy', 'energy_cons_change_pct',
-        'energy_cons_change_twh', 'energy_per_capita', 'energy_per_gdp', 'fossil_cons_change_pct', 
-        'fossil_cons_change_twh', 'fossil_elec_per_capita', 'fossil_electricity', 'fossil_energy_per_capita', 
-        'fossil_fuel_consumption', 'fossil_share_elec', 'fossil_share_energy', 'gas_cons_change_pct', 
-        'gas_cons_change_twh', 'gas_consumption', 'gas_elec_per_capita', 'gas_electricity', 
-        'gas_energy_per_capita', 'gas_prod_change_pct', 'gas_prod_change_twh', 'gas_prod_per_capita', 
-        'gas_share_elec', 'gas_share_energy', 'greenhouse_gas_emissions', 'hydro_cons_change_pct', 
-        'hydro_cons_change_twh', 'hydro_consumption', 'hydro_elec_per_capita', 'hydro_energy_per_capita', 
-        'hydro_share_elec', 'hydro_share_energy', 'low_carbon_cons_change_pct', 'low_carbon_cons_change_twh',
-        'low_carbon_consumption', 'low_carbon_elec_per_capita', 'low_carbon_energy_per_capita', 
-        'low_carbon_share_elec', 'low_carbon_share_energy', 'net_elec_imports', 'net_elec_imports_share_demand', 
-        'nuclear_cons_change_pct', 'nuclear_cons_change_twh', 'nuclear_consumption', 'nuclear_elec_per_capita',
-        'nuclear_energy_per_capita', 'nuclear_share_elec', 'nuclear_share_energy', 'oil_cons_change_pct', 
-        'oil_cons_change_twh', 'oil_consumption', 'oil_elec_per_capita', 'oil_energy_per_capita', 
-        'oil_prod_change_pct', 'oil_prod_change_twh', 'oil_prod_per_capita', 'oil_share_elec', 
-        'oil_share_energy', 'other_renewable_consumption', 'other_renewable_electricity', 
-        'other_renewable_exc_biofuel_electricity', 'other_renewables_cons_change_pct', 
-        'other_renewables_cons_change_twh', 'other_renewables_elec_per_capita', 
-        'other_renewables_share_elec', 'other_renewables_share_energy', 'per_capita_electricity', 
-        'primary_energy_consumption', 'renewables_cons_change_pct', 'renewables_cons_change_twh', 
-        'renewables_consumption', 'renewables_elec_per_capita', 'renewables_energy_per_capita', 
-        'renewables_share_elec', 'renewables_share_energy', 'solar_cons_change_pct', 'solar_cons_change_twh', 
-        'solar_consumption', 'solar_elec_per_capita', 'solar_energy_per_capita', 'solar_share_elec', 
-        'solar_share_energy', 'wind_cons_change_pct', 'wind_cons_change_twh', 'wind_consumption', 
-        'wind_elec_per_capita', 'wind_energy_per_capita', 'wind_share_elec', 'wind_share_energy', 'solar_electricity', 
-        'wind_electricity', 'non_renewables_consumption', 'total_consumption'
-    ]
+def add_air_pollution_totals(air_pollution):
+    """Add up all pollutants per row and drop the individual ones. Chunk-friendly, like the energy totals."""
+    air_pollution = air_pollution.assign(
+        Total_Emissions=air_pollution[AIR_POLLUTANTS].sum(axis=1, min_count=len(AIR_POLLUTANTS))
+    )
+    return air_pollution.drop(columns=AIR_POLLUTANTS)
 
-    # Dropping unnecessary columns because we don’t need extra baggage in life or datasets.
-    energy_df.drop(columns=columns_to_drop, inplace=True)
+# Sources whose heavy lifting is purely per-row, so they can be streamed chunk by chunk.
+ROW_TOTALS = {
+    "energy": add_energy_totals,
+    "air_pollution": add_air_pollution_totals,
+}
 
-    # Clean up country names and year column – no weird characters allowed.
-    energy_df['Country'] = energy_df['country'].str.replace(r'[^\w\s]', '', regex=True)
-    energy_df['Year'] = energy_df['year'].astype(int)
+def process_energy_dataset(energy_df):
+    """
+    Process and clean the energy dataset by combining key metrics.
+    The schema registry already made sure we only read the columns we need,
+    so this is as efficient as renewable energy should be.
+    """
+    schema = SOURCE_SCHEMAS["energy"]
 
-    # Drop redundant columns and get everything sorted for analysis.
-    energy_df.drop(columns=['country', 'year'], inplace=True)
-    energy_df.sort_values(by=['Country', 'Year'], inplace=True)
+    # Streamed sources arrive with their totals already added.
+    if "renewables_production" not in energy_df.columns:
+        energy_df = add_energy_totals(energy_df)
 
-    return energy_df  # Energy data, streamlined and ready to go!
+    # Keep only what the registry says survives, encode the countries, and get everything sorted for analysis.
+    energy_df = schema.finalize(energy_df.rename(columns=schema.renames), countries=COUNTRIES)
+    return energy_df.sort_values(by=['Country', 'Year'])  # Energy data, streamlined and ready to go!
 
 # Functions to process individual datasets. These are the "cleaning crew" 
 # making sure every dataset is neat, organized, and analysis-ready.
+# The schema registry does the column picking and renaming, the country registry
+# does the name wrangling; these just apply them.
 
 def process_food_dataset(food):
     """Select only relevant columns from the food dataset."""
-    return food[['Country', 'Year', 
-                 'Food supply (kcal per capita per day)',
-                 'Food supply (Protein g per capita per day)',
-                 'Food supply (Fat g per capita per day)']]
+    return SOURCE_SCHEMAS["food"].finalize(food, countries=COUNTRIES)
 
 def process_deaths_dataset(deaths):
     """Clean up and rename columns for the deaths dataset."""
-    deaths = deaths[['Entity', 'Year', 
-                     'Deaths in ongoing conflicts in a country (best estimate) - Conflict type: all']]
-    deaths.rename(columns={'Entity': 'Country', 
-                           'Deaths in ongoing conflicts in a country (best estimate) - Conflict type: all': 'Deaths'}, 
-                  inplace=True)
-    return deaths
+    schema = SOURCE_SCHEMAS["deaths"]
+    return schema.finalize(deaths.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_air_pollution_dataset(air_pollution):
     """Calculate total emissions and keep only the essentials."""
-    air_pollution['Total_Emissions'] = (
-        air_pollution['Nitrogen oxide (NOx)'] +
-        air_pollution['Sulphur dioxide (SO₂) emissions'] +
-        air_pollution['Carbon monoxide (CO) emissions'] +
-        air_pollution['Black carbon (BC) emissions'] +
-        air_pollution['Ammonia (NH₃) emissions'] +
-        air_pollution['Non-methane volatile organic compounds (NMVOC) emissions']
-    )
-    air_pollution = air_pollution[['Entity', 'Year', 'Total_Emissions']]
-    air_pollution.rename(columns={'Entity': 'Country'}, inplace=True)
-    return air_pollution
+    schema = SOURCE_SCHEMAS["air_pollution"]
+    if "Total_Emissions" not in air_pollution.columns:
+        air_pollution = add_air_pollution_totals(air_pollution)
+    return schema.finalize(air_pollution.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_hdi_dataset(hdi):
     """Simplify the Human Development Index dataset."""
-    hdi = hdi[['Entity', 'Year', 'Human Development Index']]
-    hdi.rename(columns={'Entity': 'Country'}, inplace=True)
-    return hdi
+    schema = SOURCE_SCHEMAS["hdi"]
+    return schema.finalize(hdi.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_rule_of_law_dataset(rule_of_law):
     """Clean and rename columns for the rule of law dataset."""
-    rule_of_law = rule_of_law[['Entity', 'Year', 
-                               'Rule of Law index (best estimate, aggregate: average)']]
-    rule_of_law.rename(columns={'Entity': 'Country', 
-                                'Rule of Law index (best estimate, aggregate: average)': 'Rule_of_Law_Index'}, 
-                       inplace=True)
-    return rule_of_law
+    schema = SOURCE_SCHEMAS["rule_of_law"]
+    return schema.finalize(rule_of_law.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_median_age_dataset(median_age):
     """Keep key columns from the median age dataset."""
-    median_age = median_age[['Entity', 'Year', 
-                             'Median age - Sex: all - Age: all - Variant: estimates']]
-    median_age.rename(columns={'Entity': 'Country', 
-                               'Median age - Sex: all - Age: all - Variant: estimates': 'Median Age'}, 
-                      inplace=True)
-    return median_age
+    schema = SOURCE_SCHEMAS["median_age"]
+    return schema.finalize(median_age.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_urban_population_dataset(urban_population):
     """Extract urban population percentages and clean column names."""
-    urban_population = urban_population[['Entity', 'Year', 
-                                         'Urban population (% of total population)']]
-    urban_population.rename(columns={'Entity': 'Country', 
-                                     'Urban population (% of total population)': 'Urban Population (%)'}, 
-                            inplace=True)
-    return urban_population
+    schema = SOURCE_SCHEMAS["urban_population"]
+    return schema.finalize(urban_population.rename(columns=schema.renames), countries=COUNTRIES)
 
 def process_tax_revenue_dataset(tax_revenue):
     """Clean tax revenue data by renaming and selecting the important stuff."""
-    tax_revenue = tax_revenue[['Entity', 'Year', 
-                               'Taxes including social contributions (as a share of GDP)']]
-    tax_revenue.rename(columns={'Entity': 'Country', 
-                                'Taxes including social contributions (as a share of GDP)': 'Tax_Revenue'}, 
-                       inplace=True)
-    return tax_revenue
+    schema = SOURCE_SCHEMAS["tax_revenue"]
+    return schema.finalize(tax_revenue.rename(columns=schema.renames), countries=COUNTRIES)
+
+# Which cleaning crew member handles which source.
+PROCESSORS = {
+    "whr": process_whr_dataset,
+    "tedi": process_tedi_dataset,
+    "energy": process_energy_dataset,
+    "food": process_food_dataset,
+    "deaths": process_deaths_dataset,
+    "air_pollution": process_air_pollution_dataset,
+    "hdi": process_hdi_dataset,
+    "rule_of_law": process_rule_of_law_dataset,
+    "median_age": process_median_age_dataset,
+    "urban_population": process_urban_population_dataset,
+    "tax_revenue": process_tax_revenue_dataset,
+}
+
+def process_keys(name, df):
+    """A source read keys-only for a subset build: just its (Country, Year), encoded like its process_* would."""
+    schema = SOURCE_SCHEMAS[name]
+    country, year = raw_key_columns(schema)
+    # Built straight from the two arrays: on a handful of rows, pandas' rename/assign/astype would be the whole cost.
+    return pd.DataFrame({
+        "Country": COUNTRIES.encode(df[country]).array,
+        "Year": df[year].to_numpy().astype(schema.dtypes["Year"], copy=False),
+    })
+
+def join_sources(processed, join_how="inner", year_tolerance=None, trace=UNTRACED):
+    """
+    Exact-year multi-way join, or nearest-year panel alignment when a tolerance is given.
+    Under a trace, the exact join also reports how many rows each source cost the result.
+    """
+    if year_tolerance is None:
+        report = {} if trace.enabled else None
+        merged = multiway_join(processed, how=join_how, report=report)
+        trace.record(rows_in=total_rows(processed), rows_out=len(merged), joins=report)
+        return merged
+    # Rows come out sorted by (country ID, year) rather than in WHR order.
+    merged = align_sources(processed, year_tolerance)
+    trace.record(rows_in=total_rows(processed), rows_out=len(merged))
+    return merged
 
 # Main script logic.
-def main():
+def main(max_workers=None, use_processes=False, cache=None, join_how="inner", memory_budget=None,
+         features=None, year_tolerance=None, trace=None, countries=None, years=None, columns=None):
     """
     Load, process, and merge all datasets into one comprehensive DataFrame.
-    This is where the magic happens.
+    This is where the magic happens. `join_how` is "inner", "left" or "outer",
+    or a dict picking one per source (see multiway_join). `memory_budget` (bytes)
+    streams the wide/long sources in bounded chunks (see load_data). `features`
+    appends engineered features in-process: a list of names, or "all".
+    `year_tolerance` aligns the sources on a dense panel instead, letting each
+    source fill a missing year from its nearest year within the tolerance
+    (WHR years are never filled; see panel_store.align_sources).
+    A StageTrace as `trace` records every stage's wall/CPU time, peak memory and
+    rows in and out, including the rows each source lost in the join (see stage_trace.py).
+    `countries` (names), `years` ((first, last) or "2010-2020") and `columns` build just
+    that subset, pushing the filters down into every reader (see subset_plan.py); the
+    result equals the full build filtered afterwards.
     """
-    data = load_data()  # Load all raw datasets.
+    trace = UNTRACED if trace is None else trace
+    subset = Subset.from_request(COUNTRIES, SOURCE_SCHEMAS, countries, years, columns)
+    plans = None
+    if subset is not None:
+        # Features read columns of their own, and year-over-year ones need the years before the window too.
+        feature_names = None if features in (None, "all") else features
+        _, helpers, feature_columns = resolve_features(feature_names) if features is not None else ((), (), ())
+        plans = subset.plan(SOURCE_SCHEMAS, needed=feature_columns, year_tolerance=year_tolerance,
+                            push_years=not helpers, keys_only=join_how == "inner")
+
+    timings = {}
+    with trace.stage("load_data", "load"):
+        data = load_data(max_workers=max_workers, use_processes=use_processes, timings=timings, cache=cache,
+                         memory_budget=memory_budget, plans=plans)  # Load all raw datasets.
+        if trace.enabled:
+            trace.record(rows_out=total_rows(data), sources={
+                name: {"seconds": round(seconds, 6), "rows": rows, "cached": cached}
+                for name, (seconds, rows, cached) in timings.items()
+            })
 
     # Process datasets one by one. It’s like assembling IKEA furniture but with data.
-    whr = process_whr_dataset(data["whr"])
-    tedi = process_tedi_dataset(data["tedi"])
-    energy = process_energy_dataset(data["energy"])
-    food = process_food_dataset(data["food"])
-    deaths = process_deaths_dataset(data["deaths"])
-    air_pollution = process_air_pollution_dataset(data["air_pollution"])
-    hdi = process_hdi_dataset(data["hdi"])
-    rule_of_law = process_rule_of_law_dataset(data["rule_of_law"])
-    median_age = process_median_age_dataset(data["median_age"])
-    urban_population = process_urban_population_dataset(data["urban_population"])
-    tax_revenue = process_tax_revenue_dataset(data["tax_revenue"])
-
-    # Merge all datasets sequentially – because teamwork makes the dataset dream work.
-    merged = pd.merge(whr, tedi, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, energy, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, food, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, deaths, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, air_pollution, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, hdi, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, rule_of_law, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, median_age, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, urban_population, on=["Country", "Year"], how="inner")
-    merged = pd.merge(merged, tax_revenue, on=["Country", "Year"], how="inner")
-
-    # Drop leftover unnecessary columns (if any).
-    merged.drop(columns=['other_renewables_elec_per_capita_exc_biofuel',
-                         'other_renewables_energy_per_capita',
-                         'other_renewables_share_elec_exc_biofuel'], 
-                inplace=True)
+    processed = {}
+    for name, process in PROCESSORS.items():
+        with trace.stage(f"process:{name}", "process"):
+            keys_only = plans is not None and plans[name].keys_only
+            processed[name] = process_keys(name, data[name]) if keys_only else process(data[name])
+            trace.record(rows_in=len(data[name]), rows_out=len(processed[name]))
+
+    # Merge all datasets in one go – because teamwork makes the dataset dream work.
+    # Each source's (Country, Year) is encoded once, the key sets are intersected,
+    # and every column is gathered a single time instead of ten rounds of pd.merge.
+    with trace.stage("join", "join"):
+        merged = join_sources(processed, join_how, year_tolerance, trace)
+    joined_columns = set(merged.columns)
+
+    if features is not None:
+        # Straight from memory into the feature engine – no detour through the dataset CSV.
+        with trace.stage("features", "features"):
+            rows_in = len(merged)
+            merged = compute_features(merged, None if features == "all" else features)
+            trace.record(rows_in=rows_in, rows_out=len(merged))
+
+    if subset is not None:
+        # Whatever couldn't be pushed down (or was widened for it) is trimmed here.
+        with trace.stage("subset", "subset"):
+            rows_in = len(merged)
+            # Features asked for are kept even when `columns` doesn't name them.
+            merged = subset.apply(merged, keep=[column for column in merged.columns if column not in joined_columns])
+            trace.record(rows_in=rows_in, rows_out=len(merged))
 
     return merged  # The final, all-star dataset.
 
+def build_pipeline(cache=None, join_how="inner", memory_budget=None, year_tolerance=None, formats=FORMATS,
+                   trace=UNTRACED):
+    """
+    The whole build as a dependency graph:
+    raw sources -> process_* -> join (the dataset Feather) -> export (Parquet/CSV) + engineered features CSV.
+
+    Each task is fingerprinted by its own code plus its inputs, so only the tasks
+    downstream of a changed file (or a changed process_* function) get rebuilt. A task's
+    code includes the modules it calls into (source_schema's finalize and measure_values,
+    the country registry, the ROW_TOTALS helpers), so editing those invalidates it too.
+    Pass the same `trace` to Pipeline.run to see the join's per-source row report.
+    """
+    def read(name):
+        return lambda node: read_source(name, cache, memory_budget)[1]
+
+    def process(name):
+        return lambda inputs: PROCESSORS[name](inputs[f"source:{name}"])
+
+    # What every process_* step runs besides its own function: the schema's finalize and the country encoding.
+    shared_code = inspect.getsource(source_schema_module) + inspect.getsource(country_registry_module)
+
+    nodes = [
+        Node("registry", path=REGISTRY_PATH),
+    ]
+    for name, path in FILE_PATHS.items():
+        nodes.append(Node(f"source:{name}", path=path, load=read(name)))
+        nodes.append(Node(
+            f"process:{name}",
+            inputs=(f"source:{name}", "registry"),
+            run=process(name),
+            artifact=f"{PIPELINE_DIR}/process_{name}.parquet",
+            code=(inspect.getsource(PROCESSORS[name]) + (inspect.getsource(ROW_TOTALS[name]) if name in ROW_TOTALS else "")
+                  + shared_code + repr(SOURCE_SCHEMAS[name])),
+        ))
+
+    nodes.append(Node(
+        "join",
+        inputs=tuple(f"process:{name}" for name in FILE_PATHS),
+        run=lambda inputs: join_sources(
+            {name: inputs[f"process:{name}"] for name in FILE_PATHS}, join_how, year_tolerance, trace
+        ),
+        artifact=DATASET_FEATHER,
+        code=(inspect.getsource(join_sources) + inspect.getsource(multiway_join_module)
+              + inspect.getsource(panel_store_module) + repr((join_how, year_tolerance))),
+    ))
+    exports = tuple(fmt for fmt in formats if fmt != "feather")
+    if exports:
+        nodes.append(Node(
+            "export",
+            inputs=("join",),
+            run=lambda inputs: write_dataset(inputs["join"], formats=exports) and None,
+            artifact=DATASET_PARQUET if "parquet" in exports else DATASET_PATH,
+            code=inspect.getsource(dataset_store_module) + inspect.getsource(source_schema_module) + repr(exports),
+        ))
+    # Features are computed in-process from the joined frame; editing the registry invalidates just this step.
+    nodes.append(Node(
+        "features",
+        inputs=("join",),
+        run=lambda inputs: compute_features(inputs["join"]),
+        artifact=FEATURES_PATH,
+        code=inspect.getsource(feature_registry_module) + inspect.getsource(source_schema_module),  # measure_values
+    ))
+    return Pipeline(nodes, state_path=f"{PIPELINE_DIR}/state.json")
+
 if __name__ == "__main__":
-    # Save the final dataset and admire your data wizardry.
-    final_dataset = main()
-    final_dataset.to_csv("Money_vs_Happiness_dataset.csv", index=False)
-    print("Final dataset saved to 'Money_vs_Happiness_dataset.csv'")
-    print(final_dataset)
+    parser = argparse.ArgumentParser(description="Build the Money vs Happiness dataset.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of workers used to load the raw sources (default: pool default).")
+    parser.add_argument("--processes", action="store_true",
+                        help="Load sources on a process pool instead of a thread pool.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the parsed-source cache and parse every file from scratch.")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="Empty the parsed-source cache before building.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Where parsed sources are cached (default: {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size cap of the parsed-source cache; least recently used entries go first.")
+    parser.add_argument("--memory-budget-mb", type=int, default=None,
+                        help="Stream the wide/long CSV sources (energy, air pollution) in chunks that fit this budget.")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help=f"Comma-separated outputs to write, from {', '.join(FORMATS)} (default: all of them).")
+    parser.add_argument("--year-tolerance", type=int, default=None, metavar="YEARS",
+                        help="Align sources on a dense panel, filling a missing year from the nearest one within YEARS.")
+    parser.add_argument("--features", nargs="*", default=None, metavar="FEATURE",
+                        help="Also write the feature-engineered CSV, computed in-process (no names = all features).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Rebuild only what changed, all the way through the feature-engineered CSV.")
+    parser.add_argument("--plan", action="store_true",
+                        help="Print what an incremental rebuild would recompute (and why), then stop.")
+    parser.add_argument("--force", action="store_true",
+                        help="With --incremental/--plan, treat every task as stale.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Download changed sources into data/ first (conditional GETs), then rebuild what they feed.")
+    parser.add_argument("--source-base-url", default=None, metavar="URL",
+                        help="With --refresh, fetch every source by file name from this URL (a mirror) instead.")
+    parser.add_argument("--fetch-concurrency", type=int, default=4,
+                        help="With --refresh, how many sources to download at once.")
+    parser.add_argument("--countries", nargs="+", default=None, metavar="NAME",
+                        help="Build just these countries (any spelling in data/country_registry.csv).")
+    parser.add_argument("--years", type=parse_years, default=None, metavar="FIRST-LAST",
+                        help="Build just these years: 2010-2020, 2015, 2010- or -1999.")
+    parser.add_argument("--columns", nargs="+", default=None, metavar="COLUMN",
+                        help="Build just these dataset columns (Country and Year are always kept).")
+    parser.add_argument("--subset-output", default=SUBSET_OUTPUT, metavar="NAME",
+                        help=f"File name (without extension) a subset build is written to (default: {SUBSET_OUTPUT}).")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="Trace every stage (wall/CPU time, peak memory, rows in/out and per join) to a JSON file.")
+    parser.add_argument("--chrome-trace", default=None, metavar="PATH",
+                        help="Also write the trace in Chrome trace-event format (chrome://tracing, Perfetto).")
+    parser.add_argument("--profile-dir", default=None, metavar="DIR",
+                        help="Run every stage under cProfile and write one .prof file per stage into DIR.")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="Trace without tracemalloc, which slows allocation-heavy stages down.")
+    args = parser.parse_args()
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"Unknown output format(s): {', '.join(sorted(unknown))}")
+
+    subset_build = args.countries is not None or args.years is not None or args.columns is not None
+    if subset_build and (args.plan or args.incremental or args.refresh):
+        parser.error("--countries/--years/--columns build a one-off subset; they don't combine with "
+                     "--incremental, --plan or --refresh.")
+
+    cache = SourceCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 * 1024)
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache = None
+
+    memory_budget = args.memory_budget_mb * 1024 * 1024 if args.memory_budget_mb else None
+    trace = UNTRACED
+    if args.trace or args.chrome_trace or args.profile_dir:
+        trace = StageTrace(memory=not args.no_trace_memory, profile_dir=args.profile_dir).start()
+    if args.refresh:
+        # Unchanged files cost a 304 each; the changed ones decide what the incremental build below redoes.
+        with trace.stage("refresh", "fetch"):
+            results = refresh_sources(FILE_PATHS, base_url=args.source_base_url, max_concurrency=args.fetch_concurrency)
+        print(summarize(results))
+        changed = [result.path for result in results if result.changed]
+        print(f"Rebuilding downstream of: {', '.join(changed)}" if changed else "No source changed upstream.")
+    if args.plan or args.incremental or args.refresh:
+        pipeline = build_pipeline(cache=cache, memory_budget=memory_budget, year_tolerance=args.year_tolerance,
+                                  formats=formats, trace=trace)
+        steps = pipeline.plan(force=args.force)
+        if args.plan:
+            pipeline.print_plan(steps)
+        else:
+            pipeline.run(steps, trace=trace)
+            if "parquet" not in formats:
+                # The join step always refreshes the Feather file; an old Parquet export is the one to drop.
+                remove_output(DATASET_PARQUET)
+    elif subset_build:
+        # A subset gets files of its own, so the full dataset (and its version) stays as it was.
+        features = None if args.features is None else (args.features or "all")
+        try:
+            subset_dataset = main(max_workers=args.workers, use_processes=args.processes, cache=cache,
+                                  memory_budget=memory_budget, year_tolerance=args.year_tolerance, trace=trace,
+                                  features=features, countries=args.countries, years=args.years,
+                                  columns=args.columns)
+        except ValueError as error:
+            parser.error(str(error))
+        name = args.subset_output
+        with trace.stage("export", "export"):
+            version = write_dataset(subset_dataset, formats=formats, feather_path=f"{name}.feather",
+                                    parquet_path=f"{name}.parquet", csv_path=f"{name}.csv", drop_stale=True)
+        print(f"Subset (version {version}, {len(subset_dataset):,} rows) saved as: "
+              f"{', '.join(f'{name}.{fmt}' for fmt in formats)}")
+        print(subset_dataset)
+    else:
+        # Save the final dataset and admire your data wizardry.
+        final_dataset = main(max_workers=args.workers, use_processes=args.processes, cache=cache,
+                             memory_budget=memory_budget, year_tolerance=args.year_tolerance, trace=trace)
+        with trace.stage("export", "export"):
+            version = write_dataset(final_dataset, formats=formats, drop_stale=True)
+        print(f"Final dataset (version {version}) saved as: {', '.join(formats)}")
+        print(final_dataset)
+        if args.features is not None:
+            with trace.stage("features", "features"):
+                engineered = compute_features(final_dataset, args.features or None)
+                trace.record(rows_in=len(final_dataset), rows_out=len(engineered))
+                write_csv(engineered, FEATURES_PATH)
+            print(f"Feature-engineered dataset saved to '{FEATURES_PATH}'")
+
+    if trace.enabled:
+        trace.stop()
+        print("Stages:")
+        print(trace.report())
+        if args.trace:
+            trace.write_json(args.trace)
+        if args.chrome_trace:
+            trace.write_chrome(args.chrome_trace)
+        if args.profile_dir:
+            print(f"Per-stage profiles in {args.profile_dir}/ (python -m pstats <file>)")
+
+    if COUNTRIES.added:
+        # New spellings get the next free IDs; persist them so they keep those IDs next time.
+        print(f"Registered {len(COUNTRIES.added)} new countries: {', '.join(COUNTRIES.added)}")
+        COUNTRIES.save()
 
 
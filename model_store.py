@@ -0,0 +1,133 @@
+"""
+Persistent model store for the dashboard's happiness model.
+
+Streamlit reruns the whole dashboard on every click, and retraining XGBoost on
+every rerun is a lot of fan noise for the same answer. Models are keyed on a
+hash of the training data, the feature list, the target and the hyperparameters,
+and saved to disk as XGBoost boosters next to a small JSON with their metadata
+(feature importances included). Same key -> load in milliseconds; anything
+changed -> a new key, so a stale model is never served.
+
+The dashboard wraps this in st.cache_resource so a loaded model is also shared
+by every session of the process; this module itself doesn't need Streamlit.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+DEFAULT_MODEL_DIR = ".cache/models"
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+def model_key(data, features, target, params):
+    """Stable hash of everything that determines the trained model."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data[list(features) + [target]], index=False).to_numpy().tobytes())
+    digest.update(json.dumps([list(features), target, params], sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:20]
+
+
+def split(data, features, target):
+    """The dashboard's train/test split – deterministic, so it's cheaper to redo than to store."""
+    return train_test_split(data[features], data[target], test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+@dataclass
+class TrainedModel:
+    """A fitted model plus what the dashboard shows alongside it."""
+
+    key: str
+    model: object
+    features: list
+    importances: pd.Series
+    X_train: pd.DataFrame
+    X_test: pd.DataFrame
+    y_train: pd.Series
+    y_test: pd.Series
+    trained: bool  # False when it came straight from disk.
+    seconds: float
+    path: str = None  # The booster file, for workers that load the model themselves (LIME).
+    metrics: dict = None  # Cross-validation results, for models published by train_model.py.
+    held_out: bool = True  # False when the model was fit on every row, X_test included.
+
+
+class ModelStore:
+    """XGBoost regressors on disk, one booster + metadata file per model key."""
+
+    def __init__(self, directory=DEFAULT_MODEL_DIR):
+        self.directory = directory
+
+    def paths(self, key):
+        """(booster path, metadata path) for a model key."""
+        base = os.path.join(self.directory, key)
+        return f"{base}.ubj", f"{base}.json"
+
+    def has(self, key):
+        return all(os.path.exists(path) for path in self.paths(key))
+
+    def save(self, key, model, features, params):
+        """Write the booster and its metadata atomically (metadata last, so it marks a complete entry)."""
+        os.makedirs(self.directory, exist_ok=True)
+        booster_path, meta_path = self.paths(key)
+        model.save_model(f"{booster_path}.tmp.ubj")
+        os.replace(f"{booster_path}.tmp.ubj", booster_path)
+        meta = {
+            "features": list(features),
+            "params": params,
+            "importances": [float(value) for value in model.feature_importances_],
+            "saved_at": time.time(),
+        }
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as handle:
+            json.dump(meta, handle, indent=2, default=str)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def load(self, key):
+        """Load a stored model: (model, metadata)."""
+        booster_path, meta_path = self.paths(key)
+        with open(meta_path, encoding="utf-8") as handle:
+            meta = json.load(handle)
+        model = XGBRegressor(**meta["params"])
+        model.load_model(booster_path)
+        return model, meta
+
+    def get_or_train(self, data, features, target, params, retrain=False):
+        """
+        The model for (data, features, target, params): from disk if we have it, trained (and stored) if not.
+
+        `retrain=True` fits it again even if a stored copy exists – the dashboard's "retrain" button.
+        """
+        start = time.perf_counter()
+        features = list(features)
+        key = model_key(data, features, target, params)
+        X_train, X_test, y_train, y_test = split(data, features, target)
+
+        if self.has(key) and not retrain:
+            model, meta = self.load(key)
+            importances, trained = np.asarray(meta["importances"]), False
+        else:
+            model = XGBRegressor(**params)
+            model.fit(X_train, y_train)
+            self.save(key, model, features, params)
+            importances, trained = model.feature_importances_, True
+
+        return TrainedModel(
+            key=key,
+            model=model,
+            features=features,
+            importances=pd.Series(importances, index=features, name="Importance"),
+            X_train=X_train,
+            X_test=X_test,
+            y_train=y_train,
+            y_test=y_test,
+            trained=trained,
+            seconds=time.perf_counter() - start,
+            path=self.paths(key)[0],
+        )
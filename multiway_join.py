@@ -0,0 +1,177 @@
+"""
+Single-pass multi-way join on (Country, Year).
+
+Chaining pd.merge ten times rehashes the keys and materializes a new
+intermediate frame at every step. Here every source's (Country, Year) pair is
+encoded once into a single int64 key, the key sets are combined source by
+source, and each source's columns are gathered exactly once at the end.
+
+Because the keys are dense (country code x year span), lookups go through a flat
+position table indexed by key – plain numpy indexing, no hashing at all – unless
+the key space is unreasonably large, in which case we fall back to pd.Index.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+JOIN_KINDS = ("inner", "left", "outer")
+
+# Above this many possible keys, a flat position table per source stops being a bargain.
+MAX_DENSE_KEYS = 50_000_000
+
+
+def _country_codes(country, countries):
+    """Map a Country column onto positions in the shared `countries` index."""
+    if isinstance(country.dtype, pd.CategoricalDtype):
+        # Only the (few) categories need hashing; the rows are remapped with a numpy take.
+        category_codes = countries.get_indexer(country.cat.categories)
+        codes = country.cat.codes.to_numpy()
+        return np.where(codes >= 0, category_codes[codes], -1)
+    return countries.get_indexer(country)
+
+
+def _take(values, positions, allow_fill):
+    """Gather rows of a column by position, keeping extension dtypes (category, str) intact."""
+    if isinstance(values.dtype, np.dtype):
+        return take(values.to_numpy(), positions, allow_fill=allow_fill)
+    return values.array.take(positions, allow_fill=allow_fill)
+
+
+def _unique_countries(country):
+    """The distinct values of a Country column, cheaply for categoricals."""
+    if isinstance(country.dtype, pd.CategoricalDtype):
+        return pd.Index(country.cat.categories)
+    return pd.Index(country.dropna().unique())
+
+
+def encode_keys(sources, on=("Country", "Year")):
+    """
+    Encode every source's (country, year) pair as one int64 key.
+
+    Returns (keys, countries, first_year, year_span), where `keys` maps each source
+    name to its key array and `countries` is the shared country index the codes point into.
+    """
+    country_col, year_col = on
+    dtypes = [df[country_col].dtype for df in sources.values()]
+    shared = isinstance(dtypes[0], pd.CategoricalDtype) and all(dtype == dtypes[0] for dtype in dtypes)
+    if shared:
+        # Everyone already speaks the country registry's codes – nothing to hash at all.
+        countries = dtypes[0].categories
+    else:
+        countries = pd.Index(np.concatenate(
+            [_unique_countries(df[country_col]).to_numpy(dtype=object) for df in sources.values()]
+        )).unique()
+
+    # Empty sources (e.g. a year filter that matched nothing) have no years to span.
+    years = [df[year_col] for df in sources.values() if len(df)]
+    if years:
+        first_year = min(int(year.min()) for year in years)
+        year_span = max(int(year.max()) for year in years) - first_year + 1
+    else:
+        first_year, year_span = 0, 1
+
+    keys = {}
+    for name, df in sources.items():
+        if shared:
+            codes = df[country_col].cat.codes.to_numpy().astype(np.int64)
+        else:
+            codes = _country_codes(df[country_col], countries).astype(np.int64)
+        years = df[year_col].to_numpy(dtype=np.int64) - first_year
+        keys[name] = codes * year_span + years
+    return keys, countries, first_year, year_span
+
+
+class _PositionLookup:
+    """Maps keys to row positions in one source (-1 when absent)."""
+
+    def __init__(self, name, keys, key_space):
+        self.dense = 0 < key_space <= MAX_DENSE_KEYS and (keys >= 0).all()
+        if self.dense:
+            self.table = np.full(key_space, -1, dtype=np.int64)
+            self.table[keys] = np.arange(len(keys))
+            duplicated = (self.table >= 0).sum() != len(keys)
+        else:
+            self.index = pd.Index(keys)
+            duplicated = self.index.has_duplicates
+        if duplicated:
+            raise ValueError(f"multiway_join needs unique keys, but source '{name}' has duplicates.")
+
+    def positions(self, keys):
+        if self.dense:
+            inside = (keys >= 0) & (keys < len(self.table))
+            return np.where(inside, self.table[np.where(inside, keys, 0)], -1)
+        return self.index.get_indexer(keys)
+
+
+def multiway_join(sources, on=("Country", "Year"), how="inner", report=None):
+    """
+    Join an ordered {name: DataFrame} of sources on `on` in a single pass.
+
+    `how` is either one of "inner", "left", "outer" for every source, or a dict of
+    {name: how} (missing names default to "inner"). Sources are folded in order,
+    starting from the first: "inner" keeps only keys it also has, "left" keeps the
+    key set as is, and "outer" adds its own missing keys at the end. With every source
+    inner-joined, the result matches chained pd.merge(..., how="inner") row for row.
+
+    Pass a dict as `report` to find out where rows went: it gets an entry per source
+    with the running result's size before and after folding it in (`before`, `after`,
+    `dropped`), its own row count, and how many of its rows didn't make the result (`unused`).
+    """
+    if not sources:
+        raise ValueError("multiway_join needs at least one source.")
+    hows = {name: how.get(name, "inner") if isinstance(how, dict) else how for name in sources}
+    for name, kind in hows.items():
+        if kind not in JOIN_KINDS:
+            raise ValueError(f"Unknown join kind '{kind}' for source '{name}'; expected one of {JOIN_KINDS}.")
+
+    country_col, year_col = on
+    seen = set()
+    for name, df in sources.items():
+        overlap = seen & (set(df.columns) - set(on))
+        if overlap:
+            raise ValueError(f"Source '{name}' repeats columns {sorted(overlap)} from an earlier source.")
+        seen |= set(df.columns) - set(on)
+
+    keys, countries, first_year, year_span = encode_keys(sources, on)
+    key_space = len(countries) * year_span
+    lookups = {name: _PositionLookup(name, source_keys, key_space) for name, source_keys in keys.items()}
+
+    # Fold the key sets. Only the result keys move around; no source columns are touched yet.
+    names = list(sources)
+    result = keys[names[0]]
+    sizes = {names[0]: (0, len(result))}
+    for name in names[1:]:
+        before = len(result)
+        if hows[name] == "inner":
+            result = result[lookups[name].positions(result) >= 0]
+        elif hows[name] == "outer":
+            missing = _PositionLookup("result", result, key_space).positions(keys[name]) < 0
+            result = np.concatenate([result, keys[name][missing]])
+        sizes[name] = (before, len(result))
+
+    # Gather every source's columns exactly once.
+    codes, years = np.divmod(result, year_span)
+    columns = {
+        country_col: pd.Categorical.from_codes(codes, categories=countries),
+        year_col: (years + first_year).astype(sources[names[0]][year_col].dtype),
+    }
+    for name in names:
+        df = sources[name]
+        positions = lookups[name].positions(result)
+        # allow_fill turns -1 (key missing from this source) into NaN, upcasting like pd.merge would.
+        allow_fill = bool((positions < 0).any())
+        if report is not None:
+            before, after = sizes[name]
+            report[name] = {"how": hows[name] if name != names[0] else "base", "rows": len(df),
+                            "before": before, "after": after, "dropped": max(before - after, 0),
+                            "unused": len(df) - int((positions >= 0).sum())}
+        for column in df.columns:
+            if column not in on:
+                columns[column] = _take(df[column], positions, allow_fill)
+
+    merged = pd.DataFrame(columns)
+
+    # Keep the key columns where pd.merge would put them: wherever the first source had them.
+    first_columns = list(sources[names[0]].columns)
+    ordered = first_columns + [c for c in merged.columns if c not in first_columns]
+    return merged[ordered]
@@ -0,0 +1,248 @@
+"""
+Dense country x year x indicator panel store.
+
+Long-format frames only meet each other through hash joins, so a year that one
+source happens to be missing silently drops the whole row from an inner join.
+A panel puts every source on the same grid instead: one contiguous NumPy array
+of shape (indicators, countries, years) plus a validity mask, where country i
+is the i-th country of the shared registry categories and year j is
+first_year + j.
+
+That buys us:
+  * O(1) cell lookups (three small dict lookups, then plain array indexing),
+  * forward fill, linear interpolation and nearest-year alignment along the year
+    axis as whole-array operations (an accumulate over the year axis, no groupby),
+  * a zero-copy export back to a long DataFrame: the (indicators, countries * years)
+    view of the array *is* the column block pandas needs.
+
+Text indicators (TEDI's regime type) are stored as their category codes and
+decoded again on export; they can be filled and aligned, but not interpolated.
+"""
+import numpy as np
+import pandas as pd
+
+
+class PanelStore:
+    """Indicators on a dense (country, year) grid, with a mask of which cells were actually observed."""
+
+    def __init__(self, values, mask, countries, first_year, indicators, categories=None):
+        if values.shape != mask.shape or values.shape[0] != len(indicators):
+            raise ValueError("PanelStore needs values and mask of shape (indicators, countries, years).")
+        self.values = values
+        self.mask = mask
+        self.countries = pd.Index(countries)
+        self.first_year = int(first_year)
+        self.indicators = list(indicators)
+        self.categories = dict(categories or {})  # Text indicator -> the categories its codes point into.
+        self._indicator_index = {name: i for i, name in enumerate(self.indicators)}
+        self._country_index = {name: i for i, name in enumerate(self.countries)}
+
+    @property
+    def years(self):
+        return np.arange(self.first_year, self.first_year + self.values.shape[2])
+
+    @property
+    def shape(self):
+        """(indicators, countries, years)."""
+        return self.values.shape
+
+    @classmethod
+    def from_frames(cls, frames, country="Country", year="Year", dtype=np.float32):
+        """
+        Load long-format (country, year, indicators...) frames – e.g. the process_* outputs – into one panel.
+
+        When every frame's country column shares one CategoricalDtype (the country
+        registry's), its codes index the country axis directly; otherwise the
+        distinct names are collected first. Raises ValueError if an indicator shows
+        up in two frames or a (country, year) pair repeats within a frame.
+        """
+        frames = list(frames.values()) if isinstance(frames, dict) else list(frames)
+        dtypes = [df[country].dtype for df in frames]
+        shared = isinstance(dtypes[0], pd.CategoricalDtype) and all(d == dtypes[0] for d in dtypes)
+        if shared:
+            countries = dtypes[0].categories
+        else:
+            countries = pd.Index(pd.unique(np.concatenate([df[country].astype(object).to_numpy() for df in frames])))
+            countries = countries.dropna()
+
+        years = [df[year] for df in frames if len(df)]  # Empty frames have no years to span.
+        first_year = min((int(y.min()) for y in years), default=0)
+        last_year = max((int(y.max()) for y in years), default=first_year - 1)
+        indicators = []
+        for df in frames:
+            for column in df.columns:
+                if column in (country, year):
+                    continue
+                if column in indicators:
+                    raise ValueError(f"Indicator '{column}' appears in more than one frame.")
+                indicators.append(column)
+
+        shape = (len(indicators), len(countries), last_year - first_year + 1)
+        values = np.full(shape, np.nan, dtype=dtype)
+        mask = np.zeros(shape, dtype=bool)
+        categories = {}
+        for df in frames:
+            if shared:
+                rows = df[country].cat.codes.to_numpy().astype(np.int64)
+            else:
+                rows = countries.get_indexer(df[country])
+            cols = df[year].to_numpy(dtype=np.int64) - first_year
+            keep = rows >= 0
+            rows, cols = rows[keep], cols[keep]
+            if len(np.unique(rows * shape[2] + cols)) != len(rows):
+                raise ValueError("PanelStore needs one row per (country, year) in each frame.")
+            for column in df.columns:
+                if column in (country, year):
+                    continue
+                series = df[column]
+                if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+                    column_values = series.to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+                else:
+                    codes, categories[column] = pd.factorize(series, sort=True)
+                    column_values = np.where(codes >= 0, codes, np.nan)[keep]
+                i = indicators.index(column)
+                values[i, rows, cols] = column_values
+                mask[i, rows, cols] = ~np.isnan(column_values)
+        return cls(values, mask, countries, first_year, indicators, categories)
+
+    def get(self, country, year, indicator):
+        """One cell, in O(1): NaN if it wasn't observed (or filled)."""
+        j = int(year) - self.first_year
+        i, c = self._indicator_index[indicator], self._country_index[country]
+        if not 0 <= j < self.values.shape[2] or not self.mask[i, c, j]:
+            return np.nan
+        if indicator in self.categories:
+            return self.categories[indicator][int(self.values[i, c, j])]
+        return self.values[i, c, j]
+
+    def indicator(self, name):
+        """The (countries x years) grid of one indicator, as a view."""
+        return self.values[self._indicator_index[name]]
+
+    def _with(self, values, mask):
+        return PanelStore(values, mask, self.countries, self.first_year, self.indicators, self.categories)
+
+    def _selected(self, indicators):
+        """Boolean per indicator: should this operation touch it?"""
+        if indicators is None:
+            return np.ones(len(self.indicators), dtype=bool)
+        wanted = set(indicators)
+        return np.array([name in wanted for name in self.indicators])
+
+    def _previous_valid(self):
+        """For every cell, the year index of the latest valid cell at or before it (-1 if none)."""
+        positions = np.where(self.mask, np.arange(self.values.shape[2]), -1)
+        return np.maximum.accumulate(positions, axis=2)
+
+    def _next_valid(self):
+        """For every cell, the year index of the earliest valid cell at or after it (n_years if none)."""
+        n_years = self.values.shape[2]
+        positions = np.where(self.mask, np.arange(n_years), n_years)
+        return np.minimum.accumulate(positions[:, :, ::-1], axis=2)[:, :, ::-1]
+
+    def _take_years(self, positions):
+        """values[i, c, positions[i, c, j]] for every cell, NaN where positions fall off the grid."""
+        n_years = self.values.shape[2]
+        inside = (positions >= 0) & (positions < n_years)
+        taken = np.take_along_axis(self.values, np.clip(positions, 0, n_years - 1), axis=2)
+        return np.where(inside, taken, np.nan).astype(self.values.dtype), inside
+
+    def ffill(self, limit=None, indicators=None):
+        """Forward-fill missing years from the last observed one (at most `limit` years back)."""
+        previous = self._previous_valid()
+        filled, found = self._take_years(previous)
+        if limit is not None:
+            found &= np.arange(self.values.shape[2]) - previous <= limit
+        return self._fill(filled, found, indicators)
+
+    def interpolate(self, limit=None, indicators=None):
+        """
+        Linearly interpolate missing years between two observed ones (gaps of at most `limit` years).
+
+        Text indicators are left alone – there's no halfway point between two regime types.
+        """
+        previous, following = self._previous_valid(), self._next_valid()
+        before, has_before = self._take_years(previous)
+        after, has_after = self._take_years(following)
+        found = has_before & has_after
+        span = np.maximum(following - previous, 1)  # Observed cells have previous == following; they keep their value anyway.
+        weight = (np.arange(self.values.shape[2]) - previous) / span
+        filled = (before + (after - before) * weight).astype(self.values.dtype)
+        if limit is not None:
+            found &= span - 1 <= limit
+        numeric = [name for name in (indicators or self.indicators) if name not in self.categories]
+        return self._fill(filled, found, numeric)
+
+    def align_nearest(self, tolerance, indicators=None):
+        """
+        Fill each missing year from the nearest observed year within `tolerance` years.
+
+        On a tie the earlier year wins, so we never prefer data from the future.
+        """
+        previous, following = self._previous_valid(), self._next_valid()
+        year_index = np.arange(self.values.shape[2])
+        back = np.where(previous >= 0, year_index - previous, np.iinfo(np.int64).max)
+        ahead = np.where(following < self.values.shape[2], following - year_index, np.iinfo(np.int64).max)
+        nearest = np.where(back <= ahead, previous, following)
+        filled, found = self._take_years(nearest)
+        found &= np.minimum(back, ahead) <= tolerance
+        return self._fill(filled, found, indicators)
+
+    def _fill(self, filled, found, indicators):
+        """Observed cells stay as they are; missing cells take `filled` wherever it `found` something."""
+        use = found & ~self.mask & self._selected(indicators)[:, None, None]
+        return self._with(np.where(use, filled, self.values), self.mask | use)
+
+    def to_frame(self, country="Country", year="Year", rows=None):
+        """
+        Export back to a long DataFrame: one row per (country, year), one column per indicator.
+
+        With `rows=None` every grid cell becomes a row and the indicator columns are
+        views of the panel's own array (no copy). `rows` may be "any" or "all" to keep
+        only the rows where any / all indicators are valid (which does copy), or a
+        boolean (countries x years) array of rows to keep.
+        """
+        n_indicators, n_countries, n_years = self.values.shape
+        block = self.values.reshape(n_indicators, n_countries * n_years).T
+        codes = np.repeat(np.arange(n_countries, dtype=np.int32), n_years)
+        years = np.tile(self.years.astype(np.int16), n_countries)
+        if rows is not None:
+            if isinstance(rows, str):
+                cells = self.mask.reshape(n_indicators, -1)
+                keep = cells.any(axis=0) if rows == "any" else cells.all(axis=0)
+            else:
+                keep = np.asarray(rows).reshape(-1)
+            block, codes, years = block[keep], codes[keep], years[keep]
+
+        frame = pd.DataFrame(block, columns=self.indicators, copy=False)
+        for name, labels in self.categories.items():
+            category_codes = frame[name].to_numpy()
+            frame[name] = pd.Categorical.from_codes(np.where(np.isnan(category_codes), -1, category_codes).astype(np.int32),
+                                                    categories=labels)
+        # insert() adds the key columns as blocks of their own, leaving the measure block untouched.
+        frame.insert(0, year, years)
+        frame.insert(0, country, pd.Categorical.from_codes(codes, categories=self.countries))
+        return frame
+
+
+def align_sources(frames, tolerance, country="Country", year="Year", dtype=np.float32):
+    """
+    Inner-join-like alignment of {name: long frame} with a nearest-year tolerance.
+
+    The first frame is the anchor and is never filled; every other source fills a
+    missing year from its nearest observed year within `tolerance`. A (country, year)
+    row is kept when each source has at least one value there (after filling), so
+    with tolerance=0 this keeps the rows an inner join of the non-empty rows would.
+    """
+    frames = dict(frames)
+    panel = PanelStore.from_frames(frames, country, year, dtype)
+    anchor = [column for column in next(iter(frames.values())).columns if column not in (country, year)]
+    others = [name for name in panel.indicators if name not in anchor]
+    if tolerance:
+        panel = panel.align_nearest(tolerance, indicators=others)
+
+    keep = np.ones(panel.shape[1:], dtype=bool)
+    for df in frames.values():
+        columns = [panel.indicators.index(c) for c in df.columns if c not in (country, year)]
+        keep &= panel.mask[columns].any(axis=0)
+    return panel.to_frame(country, year, rows=keep)
@@ -0,0 +1,245 @@
+"""
+A small dependency-graph runner for incremental rebuilds.
+
+The build is described as a DAG of nodes. File nodes are inputs on disk (raw
+sources, scripts, the country registry) fingerprinted by content. Task nodes
+compute something from their inputs and persist it as an artifact. A task's
+fingerprint is a hash of its own code fingerprint plus its inputs' fingerprints,
+so we can tell what is stale *before* running anything: refresh one upstream file
+and only the tasks downstream of it are recomputed, everything else is read back
+from its artifact (or not touched at all).
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from source_cache import file_digest
+from dataset_store import read_dataset, write_csv, write_dataset
+from stage_trace import UNTRACED
+
+DEFAULT_STATE_PATH = ".cache/pipeline/state.json"
+
+
+def fingerprint(*parts):
+    """Stable short hash of whatever strings we're given."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def write_artifact(df, path):
+    """Persist a task's DataFrame: Feather/CSV for the published outputs, Parquet for everything in between."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".feather"):
+        write_dataset(df, formats=("feather",), feather_path=path)
+        return
+    if path.endswith(".csv"):
+        write_csv(df, path)
+        return
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path):
+    """Read back what write_artifact wrote."""
+    if path.endswith(".feather"):
+        return read_dataset(path)
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_parquet(path)
+
+
+def _rows(value):
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+@dataclass
+class Node:
+    """
+    One step of the build.
+
+    A node with a `path` and no `run` is a file input. Otherwise `run(inputs)` gets a
+    dict of {input name: value} and returns a DataFrame that is stored at `artifact`
+    (or None if it wrote `artifact` itself). `code` fingerprints the node's own logic,
+    so editing a step invalidates it just like changing its inputs does.
+    """
+
+    name: str
+    inputs: tuple = ()
+    run: callable = None
+    artifact: str = None
+    path: str = None
+    code: str = ""
+    load: callable = None  # How downstream nodes get this node's value (default: read the artifact / the path).
+
+    @property
+    def is_file(self):
+        return self.run is None
+
+
+@dataclass
+class PlanStep:
+    """A node that will be recomputed, and why."""
+
+    node: str
+    reasons: list = field(default_factory=list)
+
+
+class Pipeline:
+    """Plans and runs incremental rebuilds over a list of nodes (in any order)."""
+
+    def __init__(self, nodes, state_path=DEFAULT_STATE_PATH):
+        self.nodes = {node.name: node for node in nodes}
+        self.state_path = state_path
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through '{name}'.")
+            if name not in self.nodes:
+                raise ValueError(f"Pipeline node '{name}' is used as an input but never defined.")
+            visiting.add(name)
+            for upstream in self.nodes[name].inputs:
+                visit(upstream)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def fingerprints(self):
+        """Current fingerprint of every node, computed without running any task."""
+        prints = {}
+        for name in self.order:
+            node = self.nodes[name]
+            if node.is_file:
+                prints[name] = file_digest(node.path)[:16] if os.path.exists(node.path) else "missing"
+            else:
+                prints[name] = fingerprint(node.code, [prints[upstream] for upstream in node.inputs])
+        return prints
+
+    def plan(self, targets=None, force=False):
+        """
+        Work out which tasks need recomputing and why.
+
+        `targets` limits the plan to the given nodes and their upstream tasks;
+        `force` rebuilds everything regardless of fingerprints.
+        """
+        state = self._load_state()
+        prints = self.fingerprints()
+        wanted = self._upstream_closure(targets) if targets else set(self.order)
+
+        steps, rebuilding = [], set()
+        for name in self.order:
+            node = self.nodes[name]
+            if node.is_file or name not in wanted:
+                continue
+            previous = state.get(name)
+            reasons = []
+            if force:
+                reasons.append("forced rebuild")
+            elif previous is None:
+                reasons.append("never built")
+            else:
+                if previous.get("code") != fingerprint(node.code):
+                    reasons.append("code changed")
+                for upstream in node.inputs:
+                    upstream_node = self.nodes[upstream]
+                    if upstream in rebuilding:
+                        reasons.append(f"input {upstream} is being rebuilt")
+                    elif previous.get("inputs", {}).get(upstream) != prints[upstream]:
+                        what = upstream_node.path if upstream_node.is_file else upstream
+                        reasons.append(f"{what} changed")
+                if not os.path.exists(node.artifact):
+                    reasons.append(f"artifact {node.artifact} is missing")
+            if reasons:
+                steps.append(PlanStep(name, reasons))
+                rebuilding.add(name)
+        return steps
+
+    def _upstream_closure(self, targets):
+        wanted, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in wanted:
+                wanted.add(name)
+                stack.extend(self.nodes[name].inputs)
+        return wanted
+
+    def print_plan(self, steps):
+        """Human-readable rebuild plan."""
+        tasks = [name for name in self.order if not self.nodes[name].is_file]
+        if not steps:
+            print(f"Everything is up to date ({len(tasks)} tasks).")
+            return
+        print(f"Rebuilding {len(steps)} of {len(tasks)} tasks:")
+        for step in steps:
+            print(f"  {step.node:<28} <- {'; '.join(step.reasons)}")
+
+    def _value(self, name, values, trace=UNTRACED):
+        """The value of a node for its downstream consumers, loading it from disk if needed."""
+        if name not in values:
+            node = self.nodes[name]
+            if node.is_file and node.load is None:
+                values[name] = node.path
+                return values[name]
+            with trace.stage(f"load:{name}", "load"):
+                values[name] = node.load(node) if node.load is not None else read_artifact(node.artifact)
+                trace.record(rows_out=_rows(values[name]))
+        return values[name]
+
+    def run(self, steps=None, verbose=True, trace=UNTRACED):
+        """
+        Execute a plan (by default, the full incremental plan) and record the new fingerprints.
+        A StageTrace as `trace` gets a stage per task, and one per input it had to load.
+        """
+        steps = self.plan() if steps is None else steps
+        if verbose:
+            self.print_plan(steps)
+        state = self._load_state()
+        prints = self.fingerprints()
+        values = {}
+
+        for step in steps:
+            node = self.nodes[step.node]
+            start = time.perf_counter()
+            with trace.stage(node.name, node.name.split(":")[0]):
+                inputs = {upstream: self._value(upstream, values, trace) for upstream in node.inputs}
+                result = node.run(inputs)
+                trace.record(rows_in=sum(_rows(value) or 0 for value in inputs.values()), rows_out=_rows(result))
+                if result is not None:
+                    write_artifact(result, node.artifact)
+                    values[node.name] = result
+            state[node.name] = {
+                "fingerprint": prints[node.name],
+                "code": fingerprint(node.code),
+                "inputs": {upstream: prints[upstream] for upstream in node.inputs},
+            }
+            # Save after every task, so an interrupted build keeps the work it already did.
+            self._save_state(state)
+            if verbose:
+                print(f"  built {node.name} in {time.perf_counter() - start:.2f}s")
+        return values
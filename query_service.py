@@ -0,0 +1,566 @@
+"""
+Query service: the consolidated dataset over HTTP, loaded once and indexed.
+
+Every consumer of the dataset used to parse the whole CSV (or open the dashboard)
+to look at a handful of rows. This is a small aiohttp server that reads the
+build's output once – the memory-mapped Feather file when there is one – and
+answers from indexes built on it:
+
+  * (country, year): the rows sorted by country with per-country offsets
+    (filter_index.IndexedPanel), so a country/year selection is a couple of
+    binary searches per country,
+  * per indicator: every numeric column's row numbers sorted by value, so a
+    value range (`where=Life Ladder:6:8`) is two binary searches too.
+
+Endpoints (GET unless noted; repeat `country` for several, any registry spelling works):
+
+  /status                        version, size, columns, countries, cache and batch counters
+  /rows?country=&years=2010-2020&columns=A,B&where=COL:LOW:HIGH&limit=&offset=
+  /aggregate?columns=A,B&by=Country|Year&stats=mean,max&country=&years=&where=
+  /correlation?columns=A,B&with=Life Ladder&country=&years=
+                                 the dashboard's correlations, from its sufficient-statistics cube
+  POST /predict                  {"rows": [{feature: value, ...}], "keys": [{"country": ..., "year": ...}]}
+                                 the dashboard's happiness model (published, or the quick one), one
+                                 prediction per row then per key (null for a key without a complete row)
+
+Responses are JSON, and each one is kept in an LRU cache under (dataset
+version, endpoint, query), so a repeated query is a dictionary lookup. Misses
+are computed on a thread pool, leaving the event loop free for hits. Predict
+requests that arrive within a couple of milliseconds of each other are batched
+into one model.predict call, however many requests and rows they hold.
+
+The service checks the dataset's version (stored in the Feather/Parquet
+metadata, see dataset_store.py) every few seconds. When a build writes a new
+one, the new snapshot is loaded and indexed in the background and swapped in
+whole; requests in flight finish on the old one.
+
+Usage:
+    python query_service.py [--path FILE] [--port 8765] [--cache-entries 2048] [--reload-interval 2]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from country_registry import load_registry
+from dataset_store import default_path, read_dataset, stored_version, widen_measures
+from filter_index import IndexedPanel, dataset_version
+from shared_data import release_shared, shared_dataset
+from subset_plan import parse_years
+
+DEFAULT_PORT = 8765
+TARGET = "Life Ladder"
+# The dashboard's quick model, used until train_model.py has published one for this data.
+MODEL_FEATURES = [
+    'Log GDP per capita', 'Social support', 'Healthy life expectancy at birth',
+    'Freedom to make life choices', 'Generosity', 'Perceptions of corruption',
+    'Positive affect', 'Negative affect', 'Democracy_Index', 'Total_Emissions',
+    'Human Development Index', 'Rule_of_Law_Index', 'Median Age', 'Urban Population (%)', 'Tax_Revenue'
+]
+MODEL_PARAMS = {"n_estimators": 100, "learning_rate": 0.1, "random_state": 42}
+STATS = ("count", "sum", "mean", "median", "min", "max", "std")
+MAX_ROWS = 100_000  # Per /rows response; page through bigger selections with offset.
+
+
+def current_version(path):
+    """The dataset version of `path`: the one stored in its metadata, or the file's size and mtime for a CSV."""
+    if path.endswith(".csv"):
+        return dataset_version(path)
+    return stored_version(path) or dataset_version(path)
+
+
+def _list(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+class ValueIndex:
+    """One column's row numbers sorted by value (missing values left out), for value-range lookups."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        present = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[present], kind="stable")
+        self.rows = present[order]
+        self.values = values[self.rows]
+
+    def between(self, low=None, high=None):
+        """Row numbers with low <= value <= high (open ends as None), in row order."""
+        start = 0 if low is None else np.searchsorted(self.values, low, side="left")
+        stop = len(self.values) if high is None else np.searchsorted(self.values, high, side="right")
+        return np.sort(self.rows[start:stop])
+
+
+class Snapshot:
+    """One version of the dataset with its indexes. Immutable once built, so every request can share it."""
+
+    def __init__(self, path, registry=None):
+        self.path = path
+        self.version = current_version(path)
+        self.loaded_at = time.time()
+        self.panel = IndexedPanel(read_dataset(path))
+        self.data = self.panel.data
+        self.registry = registry
+        self.numeric_columns = [column for column in self.data.select_dtypes("number").columns if column != "Year"]
+        self.value_indexes = {column: ValueIndex(self.data[column].to_numpy(dtype=np.float64, na_value=np.nan))
+                              for column in self.numeric_columns}
+        self._lock = threading.RLock()  # model() opens the shared dataset under it too.
+        self._shared = self._model = None
+
+    def countries(self, names):
+        """Dataset country names for requested spellings (aliases go through the registry)."""
+        if not names:
+            return None
+        resolved, unknown = [], []
+        for name in names:
+            if self.panel.country_rows(name) != (0, 0):
+                resolved.append(name)
+                continue
+            country_id = self.registry.find(name) if self.registry is not None else None
+            canonical = self.registry.name_of(country_id) if country_id is not None else None
+            if canonical is not None and self.panel.country_rows(canonical) != (0, 0):
+                resolved.append(canonical)
+            else:
+                unknown.append(name)
+        if unknown:
+            raise ValueError(f"Unknown countries: {', '.join(unknown)}")
+        return resolved
+
+    def columns(self, names, numeric=False):
+        known = self.numeric_columns if numeric else list(self.data.columns)
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown {'numeric ' if numeric else ''}columns: {', '.join(unknown)}")
+        return names
+
+    def where(self, conditions):
+        """["COL:LOW:HIGH", ...] -> [(column, low, high)], either bound may be empty."""
+        parsed = []
+        for condition in conditions:
+            column, _, bounds = condition.rpartition(":")
+            column, _, low = column.rpartition(":")
+            if not column:
+                raise ValueError(f"Can't read where={condition!r}: use COLUMN:LOW:HIGH (either bound may be empty)")
+            self.columns([column], numeric=True)
+            try:
+                parsed.append((column, float(low) if low else None, float(bounds) if bounds else None))
+            except ValueError:
+                raise ValueError(f"Can't read the bounds of where={condition!r}") from None
+        return parsed
+
+    def select(self, countries=None, years=None, where=()):
+        """Row numbers (in dataset order) for the countries, the (first, last) years and the value ranges."""
+        if countries is None and years is None:
+            rows = None
+        else:
+            names = countries if countries is not None else self.panel.countries
+            window = None if years is None else (years[0] if years[0] is not None else -1 << 31,
+                                                  years[1] if years[1] is not None else 1 << 31)
+            ranges = self.panel.slices(names, window)
+            rows = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.array([], int)
+        # Narrowest value range first, so the intersections stay small.
+        for column, low, high in sorted(where, key=lambda condition: len(self.value_indexes[condition[0]].between(
+                condition[1], condition[2]))):
+            matches = self.value_indexes[column].between(low, high)
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        return rows
+
+    def frame(self, query):
+        countries = self.countries(query.getall("country", []))
+        years = parse_years(query["years"]) if query.get("years") else None
+        rows = self.select(countries, years, self.where(query.getall("where", [])))
+        return self.data if rows is None else self.data.take(rows)
+
+    def rows(self, query):
+        columns = _list(query.get("columns"))
+        frame = self.frame(query)
+        if columns is not None:
+            frame = frame[["Country", "Year"] + [c for c in self.columns(columns) if c not in ("Country", "Year")]]
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", MAX_ROWS)), MAX_ROWS)
+        if offset < 0 or limit < 1:
+            raise ValueError("offset must be 0 or more and limit 1 or more")
+        page = frame.iloc[offset:offset + limit]
+        return {"total": len(frame), "offset": offset, "count": len(page)}, page
+
+    def aggregate(self, query):
+        columns = self.columns(_list(query.get("columns")) or self.numeric_columns, numeric=True)
+        stats = _list(query.get("stats")) or ["count", "mean", "min", "max"]
+        unknown = [stat for stat in stats if stat not in STATS]
+        if unknown:
+            raise ValueError(f"Unknown stats: {', '.join(unknown)} (from {', '.join(STATS)})")
+        by = query.get("by")
+        if by not in (None, "", "Country", "Year"):
+            raise ValueError("by must be Country or Year")
+        # Widened first, so min/max come out as the CSV's decimals and means are taken over them.
+        frame = widen_measures(self.frame(query)[([by] if by and by not in columns else []) + columns])
+        if by:
+            result = frame.groupby(by, observed=True, sort=True)[columns].agg(stats)
+            result.columns = [f"{stat}({column})" for column, stat in result.columns]
+            result = result.reset_index()
+        else:
+            result = frame[columns].agg(stats).T.stack().to_frame().T
+            result.columns = [f"{stat}({column})" for column, stat in result.columns]
+        return {"rows": len(frame), "groups": len(result)}, result
+
+    def shared(self):
+        """The dashboard's cleaned dataset (shared_data.py) for this version, opened on first use."""
+        with self._lock:
+            if self._shared is None:
+                self._shared = shared_dataset(self.path)
+            return self._shared
+
+    def release(self):
+        """Drop this version's dataset from the process-wide registry once a newer snapshot has replaced it."""
+        with self._lock:
+            if self._shared is not None:
+                release_shared(self.path, self._shared)
+
+    def correlation(self, query):
+        shared = self.shared()
+        numeric = list(shared.data.select_dtypes(include="number").columns)
+        columns = _list(query.get("columns")) or numeric
+        with_columns = _list(query.get("with")) or [TARGET]
+        unknown = [column for column in columns + with_columns if column not in numeric]
+        if unknown:
+            raise ValueError(f"Unknown numeric columns: {', '.join(unknown)}")
+        countries = self.countries(query.getall("country", []))
+        years = parse_years(query["years"]) if query.get("years") else None
+        if years is not None:
+            years = (years[0] if years[0] is not None else -1 << 31, years[1] if years[1] is not None else 1 << 31)
+        matrix = shared.cube(columns, with_columns).corr(countries, years)
+        return {"columns": columns, "with": with_columns}, matrix.reset_index(names="column")
+
+    def model(self):
+        """The dashboard's model for this version: the published one if it fits this data, else the quick one."""
+        with self._lock:
+            if self._model is None:
+                from train_model import load_published  # xgboost only once somebody asks for a prediction.
+
+                shared = self.shared()
+                self._model = (load_published(shared.data, MODEL_FEATURES, TARGET)
+                               or shared.model(MODEL_FEATURES, TARGET, MODEL_PARAMS))
+            return self._model
+
+    def model_inputs(self, body):
+        """
+        (feature frame, positions to answer with null) for a predict body: the explicit
+        feature rows first, then the dataset rows looked up by key. A key whose row the
+        dashboard's cleaning dropped (or never had) predicts null.
+        """
+        frames, missing = [], []
+        if body.get("rows"):
+            rows = [_feature_row(i, row) for i, row in enumerate(_items(body, "rows"))]
+            frames.append(pd.DataFrame(rows, columns=MODEL_FEATURES, dtype=np.float64))
+        if body.get("keys"):
+            panel = self.shared().panel
+            offset = sum(len(frame) for frame in frames)
+            positions = []
+            for i, key in enumerate(_items(body, "keys")):
+                country_name, year = _key(i, key)
+                try:
+                    country = self.countries([country_name])[0]
+                except ValueError as error:
+                    raise ValueError(f"keys[{i}]: {error}") from None
+                start, stop = panel.country_rows(country)
+                position = start + np.searchsorted(panel.years[start:stop], year)
+                if position < stop and panel.years[position] == year:
+                    positions.append(position)
+                else:
+                    positions.append(0)  # Any row will do; its prediction is replaced by null.
+                    missing.append(offset + i)
+            frames.append(panel.data[MODEL_FEATURES].take(positions).astype(np.float64))
+        if not frames:
+            raise ValueError('Nothing to predict: send {"rows": [...]} and/or {"keys": [...]}')
+        return pd.concat(frames, ignore_index=True), missing
+
+
+def _items(body, field):
+    """body[field], which has to be a list of JSON objects."""
+    items = body[field]
+    if not isinstance(items, list):
+        raise ValueError(f"{field} must be a list of objects")
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"{field}[{i}] must be an object, not {json.dumps(item)}")
+    return items
+
+
+def _feature_row(i, row):
+    """A predict row's feature values as floats (null = missing), checking names and types."""
+    values = {}
+    for feature, value in row.items():
+        if feature not in MODEL_FEATURES:
+            raise ValueError(f"rows[{i}]: unknown feature {feature!r} (the model uses {', '.join(MODEL_FEATURES)})")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"rows[{i}].{feature} must be a number or null, not {json.dumps(value)}")
+        values[feature] = np.nan if value is None else float(value)
+    return values
+
+
+def _key(i, key):
+    """(country name, year) of a predict key, checking both are there and the year is a whole number."""
+    for field in ("country", "year"):
+        if field not in key:
+            raise ValueError(f"keys[{i}] has no {field!r}: send {{\"country\": ..., \"year\": ...}}")
+    country, year = key["country"], key["year"]
+    if not isinstance(country, str):
+        raise ValueError(f"keys[{i}].country must be a country name, not {json.dumps(country)}")
+    try:
+        if isinstance(year, (bool, float)):
+            raise ValueError
+        return country, int(year)
+    except (TypeError, ValueError):
+        raise ValueError(f"keys[{i}].year must be a whole year, not {json.dumps(year)}") from None
+
+
+class ResponseCache:
+    """LRU cache of response bodies (bytes), keyed on (dataset version, endpoint, query)."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._bodies = OrderedDict()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def get(self, key):
+        body = self._bodies.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._bodies.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        self._bodies[key] = body
+        self._bodies.move_to_end(key)
+        while len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+
+    def clear(self):
+        self._bodies.clear()
+
+
+class PredictBatcher:
+    """
+    Coalesces concurrent predict requests: whatever arrives within `max_wait` seconds
+    (or until `max_rows` rows are waiting) goes through one model.predict call.
+    """
+
+    def __init__(self, executor, max_wait=0.002, max_rows=4096):
+        self.executor = executor
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.batches = self.requests = 0
+        self._pending = []  # (trained model, frame, future)
+        self._rows = 0
+        self._timer = None
+
+    async def predict(self, trained, frame):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((trained, frame, future))
+        self._rows += len(frame)
+        if self._rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._rows = self._pending, [], 0
+        by_model = {}
+        for trained, frame, future in pending:
+            by_model.setdefault(id(trained), (trained, []))[1].append((frame, future))
+        for trained, requests in by_model.values():  # One model per dataset version; mostly just the one.
+            asyncio.ensure_future(self._run(trained, requests))
+
+    async def _run(self, trained, requests):
+        self.batches += 1
+        self.requests += len(requests)
+        try:
+            inputs = pd.concat([frame for frame, _ in requests], ignore_index=True)
+            predictions = await asyncio.get_running_loop().run_in_executor(self.executor, trained.model.predict,
+                                                                           inputs)
+        except Exception as error:  # Every request of the batch gets the error, not just the first.
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        offset = 0
+        for frame, future in requests:
+            if not future.done():
+                future.set_result(predictions[offset:offset + len(frame)])
+            offset += len(frame)
+
+
+def _json_body(meta, frame):
+    """
+    {"version": ..., **meta, "data": [records]} – pandas writes the records (NaN -> null) straight to JSON,
+    float32 measures as the decimals the CSV has (7.650346, not 7.6503462791).
+    """
+    head = json.dumps(meta)[:-1]
+    return f'{head}, "data": {widen_measures(frame).to_json(orient="records", double_precision=10)}}}'.encode("utf-8")
+
+
+class QueryService:
+    """The dataset snapshot, the response cache, the predict batcher and the routes that use them."""
+
+    def __init__(self, path=None, cache_entries=2048, reload_interval=2.0, batch_wait=0.002, max_batch_rows=4096,
+                 workers=4):
+        self.path = path or default_path()
+        self.reload_interval = reload_interval
+        self.cache = ResponseCache(cache_entries)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.batcher = PredictBatcher(self.executor, batch_wait, max_batch_rows)
+        self.registry = load_registry()
+        self.snapshot = None
+        self.reloads = 0
+        self._watcher = None
+
+    async def start(self, app=None):
+        self.snapshot = await self._load()
+        if self.reload_interval:
+            self._watcher = asyncio.ensure_future(self._watch())
+
+    async def stop(self, app=None):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _load(self):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, Snapshot, self.path, self.registry)
+
+    async def _watch(self):
+        """Swap in a freshly indexed snapshot whenever the build writes a new dataset version."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                version = await loop.run_in_executor(self.executor, current_version, self.path)
+            except (OSError, ValueError):  # Mid-rewrite, or gone for a moment: look again next time.
+                continue
+            if version != self.snapshot.version:
+                try:
+                    snapshot = await self._load()
+                except (OSError, ValueError) as error:
+                    print(f"Reload of {self.path} failed, still serving {self.snapshot.version}: {error}")
+                    continue
+                self.snapshot, old = snapshot, self.snapshot
+                old.release()  # Requests still on the old snapshot keep its data until they finish.
+                self.cache.clear()  # Old entries could never be hit again (the version is in the key).
+                self.reloads += 1
+                print(f"Reloaded {self.path}: version {snapshot.version}, {len(snapshot.data):,} rows")
+
+    def app(self):
+        app = web.Application()
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        app.add_routes([
+            web.get("/status", self.status),
+            web.get("/rows", self.handler("rows", Snapshot.rows)),
+            web.get("/aggregate", self.handler("aggregate", Snapshot.aggregate)),
+            web.get("/correlation", self.handler("correlation", Snapshot.correlation)),
+            web.post("/predict", self.predict),
+        ])
+        return app
+
+    def _response(self, body, snapshot, cached):
+        return web.Response(body=body, content_type="application/json",
+                            headers={"X-Dataset-Version": snapshot.version, "X-Cache": "hit" if cached else "miss"})
+
+    def _error(self, error, status=400):
+        return web.json_response({"error": str(error)}, status=status)
+
+    def handler(self, endpoint, query_method):
+        """A GET handler answering from the cache, or from `query_method(snapshot, query)` on the thread pool."""
+        def compute(snapshot, query):
+            meta, frame = query_method(snapshot, query)
+            return _json_body(dict(version=snapshot.version, **meta), frame)
+
+        async def handle(request):
+            snapshot = self.snapshot
+            key = (snapshot.version, endpoint, tuple(sorted(request.query.items())))
+            body = self.cache.get(key)
+            if body is not None:
+                return self._response(body, snapshot, cached=True)
+            try:
+                body = await asyncio.get_running_loop().run_in_executor(self.executor, compute, snapshot,
+                                                                        request.query)
+            except (ValueError, KeyError) as error:
+                return self._error(error)
+            self.cache.put(key, body)
+            return self._response(body, snapshot, cached=False)
+        return handle
+
+    async def predict(self, request):
+        snapshot = self.snapshot
+        raw = await request.read()
+        key = (snapshot.version, "predict", raw)
+        body = self.cache.get(key)
+        if body is not None:
+            return self._response(body, snapshot, cached=True)
+        loop = asyncio.get_running_loop()
+        try:
+            payload = json.loads(raw or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError('The body must be a JSON object: {"rows": [...]} and/or {"keys": [...]}')
+            trained = await loop.run_in_executor(self.executor, snapshot.model)
+            inputs, missing = await loop.run_in_executor(self.executor, snapshot.model_inputs, payload)
+        except (ValueError, KeyError, TypeError) as error:
+            return self._error(error)
+        predictions = [float(value) for value in await self.batcher.predict(trained, inputs)]
+        for position in missing:
+            predictions[position] = None
+        body = json.dumps({"version": snapshot.version, "model": trained.key, "target": TARGET,
+                           "predictions": predictions}).encode("utf-8")
+        self.cache.put(key, body)
+        return self._response(body, snapshot, cached=False)
+
+    async def status(self, request):
+        snapshot = self.snapshot
+        return web.json_response({
+            "version": snapshot.version, "path": snapshot.path, "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads, "rows": len(snapshot.data), "columns": list(snapshot.data.columns),
+            "countries": list(map(str, snapshot.panel.countries)),
+            "years": [int(snapshot.panel.years.min()), int(snapshot.panel.years.max())] if len(snapshot.data) else None,
+            "cache": {"entries": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses},
+            "predict_batches": {"batches": self.batcher.batches, "requests": self.batcher.requests},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--path", default=None, help="Dataset to serve (default: the Feather output, then Parquet, then CSV).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-entries", type=int, default=2048, help="Responses kept in the LRU cache.")
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="Seconds between dataset version checks (0: never reload).")
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0,
+                        help="How long a predict request waits for others to batch with.")
+    parser.add_argument("--max-batch-rows", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=4, help="Threads computing cache misses and predictions.")
+    args = parser.parse_args()
+
+    service = QueryService(args.path, cache_entries=args.cache_entries, reload_interval=args.reload_interval,
+                           batch_wait=args.batch_wait_ms / 1000, max_batch_rows=args.max_batch_rows,
+                           workers=args.workers)
+    print(f"Serving {service.path} on http://{args.host}:{args.port}")
+    web.run_app(service.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+One read-only copy of the dashboard's data per machine, not per session.
+
+The cleaned dataset (features computed, invalid rows dropped, sorted by country
+and year) is written once per dataset version to an uncompressed Feather file
+under .cache/shared, and every dashboard process memory-maps that same file. The
+numeric columns are views of the mapping, so the operating system keeps a single
+copy in its page cache no matter how many server processes or sessions use it.
+
+Inside a process, SharedDataset holds that frame together with everything derived
+from it – the country/year filter index, the correlation cube and the trained
+models – and hands the same objects to every session. Sessions get views:
+pandas' copy-on-write means a session that modifies "its" frame only ever
+modifies a private copy.
+"""
+import inspect
+import os
+import threading
+
+import pandas as pd
+
+import feature_registry
+from dataset_store import default_path, read_dataset, write_dataset
+from feature_registry import compute_features
+from filter_index import IndexedPanel, dataset_version
+from pipeline_dag import fingerprint
+from stats_cube import StatsCube
+
+SHARED_DIR = ".cache/shared"
+
+# Columns we’ll trust to be numeric – because no one likes surprises here.
+NUMERICAL_COLUMNS = [
+    'Year', 'Life Ladder', 'Log GDP per capita', 'Social support',
+    'Healthy life expectancy at birth', 'Freedom to make life choices',
+    'Generosity', 'Perceptions of corruption', 'Positive affect',
+    'Negative affect', 'Democracy_Index', 'Total_Emissions',
+    'Human Development Index', 'Rule_of_Law_Index', 'Median Age',
+    'Urban Population (%)', 'Tax_Revenue'
+]
+
+
+def clean_dataset(data):
+    """The dashboard's cleaning: numeric coercion, engineered features, drop invalid rows, sort by (country, year)."""
+    # Convert to numbers where possible; force the weird stuff to NaN. Nobody has time for rogue strings.
+    # (Typed outputs are numeric already, so this only kicks in for a CSV with surprises in it.)
+    for col in NUMERICAL_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(data[col]):
+            data = data.assign(**{col: pd.to_numeric(data[col], errors='coerce')})
+
+    # The engineered features, computed in one pass (no second CSV to keep in sync).
+    # Before the dropna, so year-over-year features see the same neighbours the feature script does.
+    data = compute_features(data)
+
+    # Drop rows with invalid data – it’s not you, it’s your bad data.
+    data = data.dropna(subset=NUMERICAL_COLUMNS)
+    return data.sort_values(['Country', 'Year'], kind='stable').reset_index(drop=True)
+
+
+class SharedDataset:
+    """The memory-mapped cleaned dataset plus its index, correlation cubes and models, shared process-wide."""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self.data = read_dataset(path)  # Memory-mapped: numeric columns are views of the file.
+        self.panel = IndexedPanel(self.data)  # Already sorted, so the index adds offsets, not a copy.
+        self._lock = threading.Lock()
+        self._cubes = {}
+        self._models = {}
+
+    @classmethod
+    def open(cls, source_path=None, directory=SHARED_DIR):
+        """Open the shared copy for the current dataset version, building it first if no process has yet."""
+        source_path = source_path or default_path()
+        key = fingerprint(dataset_version(source_path), inspect.getsource(clean_dataset),
+                          inspect.getsource(feature_registry))
+        path = os.path.join(directory, f"clean-{key}.feather")
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            # Unique temp name, so two processes building at once don't trip over each other.
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            write_dataset(clean_dataset(read_dataset(source_path)), formats=("feather",), feather_path=tmp_path)
+            os.replace(tmp_path, path)
+        return cls(key, path)
+
+    def cube(self, columns, with_columns):
+        """The sufficient-statistics cube for these columns, built once and shared."""
+        cache_key = (tuple(columns), tuple(with_columns))
+        with self._lock:
+            if cache_key not in self._cubes:
+                self._cubes[cache_key] = StatsCube(self.data, list(columns), list(with_columns))
+            return self._cubes[cache_key]
+
+    def model(self, features, target, params, retrain=False):
+        """The trained model for (features, target, params) – loaded or trained once, then shared."""
+        from model_store import ModelStore  # xgboost and scikit-learn load here, not when the data is opened.
+
+        cache_key = (tuple(features), target, repr(sorted(params.items())))
+        with self._lock:
+            if retrain or cache_key not in self._models:
+                self._models[cache_key] = ModelStore().get_or_train(self.data, list(features), target, params,
+                                                                    retrain=retrain)
+            return self._models[cache_key]
+
+
+_SHARED = {}  # source path -> (dataset version, SharedDataset); only the latest version is kept
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_dataset(source_path=None, directory=SHARED_DIR):
+    """The process-wide SharedDataset for the current dataset version (opened on first use)."""
+    source_path = source_path or default_path()
+    version = dataset_version(source_path)
+    with _SHARED_LOCK:
+        cached = _SHARED.get(source_path)
+        if cached is None or cached[0] != version:
+            # A new version replaces the old one; sessions still holding the old frame keep it alive until they finish.
+            cached = _SHARED[source_path] = (version, SharedDataset.open(source_path, directory))
+        return cached[1]
+
+
+def release_shared(source_path, dataset):
+    """Forget `dataset` as the shared one for `source_path` (if it still is), so it goes once its last user does."""
+    source_path = source_path or default_path()
+    with _SHARED_LOCK:
+        cached = _SHARED.get(source_path)
+        if cached is not None and cached[1] is dataset:
+            del _SHARED[source_path]
@@ -0,0 +1,170 @@
+"""
+Content-addressed columnar cache for the parsed raw sources in data/.
+
+Every parsed source is stored as a Parquet file whose name is derived from the
+source path, its size, its mtime and a SHA-256 of its content. Touch, edit or
+replace a file in data/ and its key changes, so the stale entry is simply never
+hit again (and gets cleaned up on the next write of that source parsed the
+same way – a source cached both whole and streamed keeps both entries). Warm rebuilds read Parquet
+instead of going through the xlrd/openpyxl and CSV parsers.
+
+The cache is capped in size; least-recently-used entries are evicted first.
+"""
+import hashlib
+import json
+import os
+
+# pyarrow: The cache is a speed boost, not a requirement. No pyarrow, no cache, no drama.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_CACHE_DIR = ".cache/sources"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB is plenty for eleven spreadsheets.
+
+# Parquet only allows string column names, but the Democracy Index uses integer years as
+# headers. We stash the original labels in the file metadata and put them back on read.
+_COLUMNS_METADATA_KEY = b"cosgdd_columns"
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceCache:
+    """A size-capped, LRU-evicted Parquet cache keyed on (path, size, mtime, content hash)."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled and pq is not None
+
+    def _prefix(self, path, salt=""):
+        """Entries for the same source parsed the same way share a prefix, so stale versions are easy to find."""
+        abspath = os.path.abspath(path)
+        path_digest = hashlib.sha256(abspath.encode("utf-8")).hexdigest()[:8]
+        salt_digest = hashlib.sha256(salt.encode("utf-8")).hexdigest()[:8]
+        return f"{os.path.basename(path)}-{path_digest}-{salt_digest}-"
+
+    def key(self, path, salt=""):
+        """
+        Build the cache key for a source file from its path, size, mtime and content.
+
+        `salt` describes how the file was parsed (columns, dtypes), so changing the
+        read options misses the cache just like changing the file does.
+        """
+        stat = os.stat(path)
+        fingerprint = json.dumps(
+            [os.path.abspath(path), stat.st_size, stat.st_mtime_ns, file_digest(path), salt]
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def entry_path(self, path, key=None, salt=""):
+        """Where the cached Parquet file for `path` parsed as `salt` lives (or would live)."""
+        key = self.key(path, salt) if key is None else key
+        return os.path.join(self.cache_dir, f"{self._prefix(path, salt)}{key[:24]}.parquet")
+
+    def get(self, path, key=None, columns=None, rows=None, salt=""):
+        """
+        Return the cached DataFrame for `path`, or None on a miss.
+
+        `columns` (a predicate on column labels) is pushed into the Parquet reader, so
+        unwanted columns aren't even decoded. `rows` (a function of the Arrow table that
+        returns a boolean mask, or None for every row) drops rows before anything is
+        converted to pandas, which is where most of a read's time goes.
+        """
+        if not self.enabled:
+            return None
+        entry = self.entry_path(path, key, salt)
+        if not os.path.exists(entry):
+            return None
+
+        parquet_file = pq.ParquetFile(entry)  # One open for the schema and the data.
+        schema = parquet_file.schema_arrow
+        names, metadata = schema.names, schema.metadata or {}
+        labels = json.loads(metadata[_COLUMNS_METADATA_KEY]) if _COLUMNS_METADATA_KEY in metadata else names
+        label_of = dict(zip(names, labels))
+        if columns is not None:
+            names = [name for name in names if columns(label_of[name])]
+        table = parquet_file.read(columns=names)
+        keep = rows(table) if rows is not None else None
+        if keep is not None and not keep.all():
+            table = table.filter(pa.array(keep))
+        df = table.to_pandas()
+        df.columns = [label_of[name] for name in df.columns]
+
+        os.utime(entry)  # Bump the mtime – that's our "recently used" clock for LRU.
+        return df
+
+    def put(self, path, df, key=None, salt=""):
+        """Store `df` as the `salt` parse of `path`, replacing any stale versions of that parse."""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(path, key, salt)
+
+        table = pa.Table.from_pandas(df.rename(columns=str), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_COLUMNS_METADATA_KEY] = json.dumps(list(df.columns)).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+
+        # Write to a temp file and rename, so a crashed run never leaves half a Parquet file behind.
+        tmp_path = f"{entry}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, entry)
+
+        prefix = self._prefix(path, salt)
+        for name in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, name)
+            if name.startswith(prefix) and name.endswith(".parquet") and stale != entry:
+                os.remove(stale)
+
+    def load(self, path, reader, salt="", columns=None, rows=None):
+        """
+        Return (DataFrame, hit): the cached parse of `path`, or `reader(path)` stored for next time.
+        `columns`/`rows` narrow what's returned (see get); the whole parse is what gets cached.
+        """
+        if not self.enabled:
+            return reader(path), False
+        key = self.key(path, salt)
+        df = self.get(path, key, columns, rows, salt)
+        if df is not None:
+            return df, True
+        df = reader(path)
+        self.put(path, df, key, salt)
+        if columns is not None or rows is not None:
+            df = self.get(path, key, columns, rows, salt)
+        return df, False
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits in `max_bytes`."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".parquet"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        """Remove every cached entry."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".parquet", ".tmp")):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,219 @@
+"""
+Refresh the raw sources in data/ from upstream, downloading only what changed.
+
+All sources are fetched concurrently over one pooled aiohttp session, a few at
+a time. Each file's ETag, Last-Modified and content hash are kept in
+data/.sources.json, so the next refresh sends conditional GETs
+(If-None-Match / If-Modified-Since) and an unchanged file costs a single 304. A
+server that ignores those headers and sends the whole file again is caught by
+the content hash: same bytes, file left alone.
+
+Downloads go to `<file>.part` and are renamed over the real file only once
+complete, so data/ never holds half a file. If a transfer breaks off, the
+partial file is kept, together with the validator it was downloaded under, and
+the next attempt resumes it with a Range request (If-Range makes the server
+send the whole file instead if it changed in the meantime).
+
+refresh_sources() returns one FetchResult per source. The build only needs to
+redo what depends on the ones that came back `changed`.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import aiohttp
+
+STATE_PATH = "data/.sources.json"
+MAX_CONCURRENCY = 4
+CHUNK_SIZE = 1 << 16
+RETRIES = 2
+
+# Where the sources live upstream. Our World in Data serves each chart's data as a CSV next to the chart.
+# The World Happiness Report, the Economist Democracy Index and the food supply file have no stable
+# download link, so they're refreshed by hand (or from a mirror, via base_url).
+SOURCE_URLS = {
+    "energy": "https://raw.githubusercontent.com/owid/energy-data/master/owid-energy-data.csv",
+    "deaths": "https://ourworldindata.org/grapher/deaths-in-armed-conflicts-based-on-where-they-occurred.csv",
+    "air_pollution": "https://ourworldindata.org/grapher/long-run-air-pollution.csv",
+    "hdi": "https://ourworldindata.org/grapher/human-development-index.csv",
+    "rule_of_law": "https://ourworldindata.org/grapher/rule-of-law-index.csv",
+    "median_age": "https://ourworldindata.org/grapher/median-age.csv",
+    "urban_population": "https://ourworldindata.org/grapher/share-urban-and-rural-population.csv",
+    "tax_revenue": "https://ourworldindata.org/grapher/tax-revenues-as-a-share-of-gdp-unu-wider.csv",
+}
+
+
+class IncompleteDownload(Exception):
+    """The server closed the connection before sending everything it promised."""
+
+
+@dataclass
+class FetchResult:
+    """What happened to one source during a refresh."""
+
+    name: str
+    path: str
+    status: str  # "updated", "unchanged" or "failed"
+    downloaded: int = 0  # Bytes received in this refresh.
+    resumed_from: int = 0  # Bytes of a previous partial download that were kept.
+    seconds: float = 0.0
+    error: str = None
+
+    @property
+    def changed(self):
+        return self.status == "updated"
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def _hash_file(path, digest):
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+async def _download(session, name, url, path, entry):
+    """One conditional (and possibly resumed) GET. Returns (FetchResult, new state entry)."""
+    start = time.perf_counter()
+    part_path, resume_path = f"{path}.part", f"{path}.part.json"
+    headers = {}
+    if os.path.exists(path) and entry.get("url") == url:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    # A partial download from an earlier attempt: ask for the rest, but only if it's still the same file.
+    offset, partial = 0, {}
+    if os.path.exists(part_path) and os.path.exists(resume_path):
+        with open(resume_path, encoding="utf-8") as handle:
+            partial = json.load(handle)
+        validator = partial.get("etag") or partial.get("last_modified")
+        if partial.get("url") == url and validator and os.path.getsize(part_path) > 0:
+            offset = os.path.getsize(part_path)
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return FetchResult(name, path, "unchanged", seconds=time.perf_counter() - start), entry
+        if response.status == 416:  # Our partial file is no use any more; start over next attempt.
+            os.remove(part_path)
+            raise IncompleteDownload(f"{url}: range not satisfiable, restarting")
+        response.raise_for_status()
+
+        if response.status == 206 and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+            os.remove(part_path)
+            raise IncompleteDownload(f"{url}: server sent a different range than asked for, restarting")
+        if response.status != 206:
+            offset = 0  # Full body: the file changed upstream, or the server doesn't do ranges.
+        validators = {"url": url, "etag": response.headers.get("ETag"),
+                      "last_modified": response.headers.get("Last-Modified")}
+        _write_json(resume_path, validators)  # So a broken-off transfer can be resumed next time.
+
+        digest = _hash_file(part_path, hashlib.sha256()) if offset else hashlib.sha256()
+        expected = response.content_length
+        received = 0
+        with open(part_path, "ab" if offset else "wb") as handle:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                handle.write(chunk)
+                digest.update(chunk)
+                received += len(chunk)
+            handle.flush()
+            os.fsync(handle.fileno())
+        if expected is not None and received != expected:
+            raise IncompleteDownload(f"{url}: got {received:,} of {expected:,} bytes")
+
+    sha256, size = digest.hexdigest(), offset + received
+    new_entry = dict(validators, sha256=sha256, size=size)
+    os.remove(resume_path)
+    known = entry.get("sha256") or (_hash_file(path, hashlib.sha256()).hexdigest() if os.path.exists(path) else None)
+    if sha256 == known:
+        os.remove(part_path)  # Same bytes as we already have: leave the file (and its mtime) alone.
+        status = "unchanged"
+    else:
+        os.replace(part_path, path)
+        status = "updated"
+    return FetchResult(name, path, status, downloaded=received, resumed_from=offset,
+                       seconds=time.perf_counter() - start), new_entry
+
+
+async def _fetch(session, semaphore, name, url, path, entry, retries):
+    """Download one source under the concurrency limit, retrying (and resuming) on network errors."""
+    async with semaphore:
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                result, new_entry = await _download(session, name, url, path, entry)
+            except (aiohttp.ClientError, asyncio.TimeoutError, IncompleteDownload) as error:
+                if attempt == retries:
+                    return FetchResult(name, path, "failed", seconds=time.perf_counter() - start,
+                                       error=str(error) or type(error).__name__), entry
+                await asyncio.sleep(0.5 * 2 ** attempt)  # The next attempt picks up the partial file.
+                continue
+            result.seconds = time.perf_counter() - start
+            return result, new_entry
+
+
+async def refresh(paths, urls=None, base_url=None, state_path=STATE_PATH, max_concurrency=MAX_CONCURRENCY,
+                  retries=RETRIES, timeout=300):
+    """
+    Fetch every source that has a URL, concurrently. Returns a FetchResult per fetched source.
+
+    `paths` maps source names to files in data/. `urls` maps names to upstream
+    URLs (default: SOURCE_URLS); `base_url` instead fetches every file by name
+    from one place – a mirror, or a local stand-in server.
+    """
+    if base_url is not None:
+        urls = {name: f"{base_url.rstrip('/')}/{os.path.basename(path)}" for name, path in paths.items()}
+    urls = SOURCE_URLS if urls is None else urls
+    state = load_state(state_path)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    connector = aiohttp.TCPConnector(limit=max_concurrency)  # One connection pool for every request.
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        outcomes = await asyncio.gather(*(
+            _fetch(session, semaphore, name, url, paths[name], state.get(name, {}), retries)
+            for name, url in urls.items() if name in paths
+        ))
+    for result, entry in outcomes:
+        if entry:
+            state[result.name] = entry
+    _write_json(state_path, state)
+    return [result for result, _ in outcomes]
+
+
+def refresh_sources(paths, urls=None, base_url=None, state_path=STATE_PATH, max_concurrency=MAX_CONCURRENCY,
+                    retries=RETRIES, timeout=300):
+    """Blocking wrapper around refresh(), for scripts."""
+    return asyncio.run(refresh(paths, urls, base_url, state_path, max_concurrency, retries, timeout))
+
+
+def summarize(results):
+    """One line per source, plus a total – for the build's log."""
+    lines = []
+    for result in sorted(results, key=lambda result: result.name):
+        detail = f"{result.downloaded:,} bytes" if result.downloaded else ""
+        if result.resumed_from:
+            detail += f" (resumed at {result.resumed_from:,})"
+        if result.error:
+            detail = result.error
+        lines.append(f"  {result.name:<18} {result.status:<10} {result.seconds:>6.2f}s  {detail}")
+    counts = {status: sum(r.status == status for r in results) for status in ("updated", "unchanged", "failed")}
+    lines.append(f"{counts['updated']} updated, {counts['unchanged']} unchanged, {counts['failed']} failed.")
+    return "\n".join(lines)
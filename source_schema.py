@@ -0,0 +1,163 @@
+"""
+Declarative schema registry for the raw sources.
+
+For every source we declare which raw columns to read (and what to call them
+afterwards) and which compact dtypes they should land in. The readers push this
+straight into pandas as `usecols`/`dtype`, so columns we never use are never
+parsed and nothing sits around as float64/object when float32/category will do.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Compact dtypes: countries repeat a lot, years fit in 16 bits, and no indicator needs 15 significant digits.
+COUNTRY = "category"
+YEAR = "int16"
+MEASURE = "float32"
+MEASURE_DIGITS = 7  # Significant decimal digits a float32 measure holds.
+
+
+def measure_values(values):
+    """
+    float32 measures as float64 at the decimal they were read from (7.35, not 7.349999904632568).
+
+    One vectorized rounding to MEASURE_DIGITS significant digits: scaling by an exact
+    power of ten and rounding to an integer, then scaling back, lands on the float64
+    nearest to that decimal. NaN and infinities pass through.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exponent = np.floor(np.log10(np.abs(values)))
+    shift = MEASURE_DIGITS - 1 - np.where(np.isfinite(exponent), exponent, 0)
+    scale = 10.0 ** np.abs(shift)
+    return np.where(shift >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+
+
+@dataclass(frozen=True)
+class SourceSchema:
+    """What we read from a raw source, what we rename it to, and which dtypes it lands in."""
+
+    # Raw column -> pipeline column name. None means "read every column" (e.g. the wide TEDI sheet).
+    columns: dict = None
+    # Pipeline column -> dtype. Pushed into the reader for raw columns, applied afterwards for derived ones.
+    dtypes: dict = field(default_factory=dict)
+    # Columns the process_* step hands on to the join, in order. Empty means "whatever is left".
+    output: tuple = ()
+
+    @property
+    def renames(self):
+        """Raw -> pipeline names for the columns that actually change name."""
+        return {raw: name for raw, name in (self.columns or {}).items() if raw != name}
+
+    def read_options(self):
+        """Keyword arguments for pd.read_csv / pd.read_excel: column projection plus dtypes."""
+        if self.columns is None:
+            return {}
+        dtype = {raw: self.dtypes[name] for raw, name in self.columns.items() if name in self.dtypes}
+        return {"usecols": list(self.columns), "dtype": dtype}
+
+    def finalize(self, df, countries=None):
+        """
+        Project a processed frame onto `output` and cast any column not already in its target dtype.
+
+        With a CountryRegistry, the Country column is encoded to the shared country IDs as well,
+        and spellings that end up sharing a (Country, Year) are reported before they reach the join.
+        """
+        if self.output:
+            df = df[list(self.output)]
+        if countries is not None and "Country" in df.columns:
+            encoded = countries.encode(df["Country"])
+            if "Year" in df.columns:
+                countries.check_unique_keys(df["Country"], encoded, df["Year"])
+            df = df.assign(Country=encoded)
+        casts = {
+            column: dtype for column, dtype in self.dtypes.items()
+            if column in df.columns and str(df[column].dtype) != dtype
+        }
+        return df.astype(casts) if casts else df
+
+
+def _owid(value_column, name, dtype=MEASURE):
+    """Schema for the OWID-style Entity/Year/<value> files – most of our sources look exactly like this."""
+    return SourceSchema(
+        columns={"Entity": "Country", "Year": "Year", value_column: name},
+        dtypes={"Country": COUNTRY, "Year": YEAR, name: dtype},
+        output=("Country", "Year", name),
+    )
+
+
+WHR_MEASURES = [
+    "Life Ladder", "Log GDP per capita", "Social support", "Healthy life expectancy at birth",
+    "Freedom to make life choices", "Generosity", "Perceptions of corruption",
+    "Positive affect", "Negative affect",
+]
+
+# The energy columns that get summed into the renewable / non-renewable production totals.
+# (The consumption totals used to be computed too, then dropped without ever being used.)
+RENEWABLE_ELECTRICITY = [
+    "biofuel_electricity", "hydro_electricity", "solar_electricity",
+    "wind_electricity", "other_renewable_electricity",
+]
+NON_RENEWABLE_ELECTRICITY = ["coal_electricity", "gas_electricity", "oil_electricity", "nuclear_electricity"]
+
+# The raw energy columns that survive into the final dataset untouched.
+ENERGY_KEPT = [
+    "biofuel_elec_per_capita", "coal_elec_per_capita", "coal_production",
+    "gas_production", "low_carbon_electricity", "oil_production",
+]
+ENERGY_DERIVED = ["renewables_production", "non_renewables_production", "total_production"]
+
+AIR_POLLUTANTS = [
+    "Nitrogen oxide (NOx)",
+    "Sulphur dioxide (SO₂) emissions",
+    "Carbon monoxide (CO) emissions",
+    "Black carbon (BC) emissions",
+    "Ammonia (NH₃) emissions",
+    "Non-methane volatile organic compounds (NMVOC) emissions",
+]
+
+FOOD_MEASURES = [
+    "Food supply (kcal per capita per day)",
+    "Food supply (Protein g per capita per day)",
+    "Food supply (Fat g per capita per day)",
+]
+
+_ENERGY_INPUTS = RENEWABLE_ELECTRICITY + NON_RENEWABLE_ELECTRICITY
+
+# The registry itself. One entry per FILE_PATHS key.
+SOURCE_SCHEMAS = {
+    "whr": SourceSchema(
+        columns={"Country name": "Country", "year": "Year", **{m: m for m in WHR_MEASURES}},
+        dtypes={"Country": COUNTRY, "Year": YEAR, **{m: MEASURE for m in WHR_MEASURES}},
+    ),
+    # TEDI is wide (one column per year), so there is nothing to project at read time;
+    # the dtypes are applied after the melt instead.
+    "tedi": SourceSchema(
+        columns=None,
+        dtypes={"Country": COUNTRY, "Year": YEAR, "Democracy_Index": MEASURE},
+        output=("Country", "Regime type", "Year", "Democracy_Index"),
+    ),
+    "energy": SourceSchema(
+        columns={"country": "Country", "year": "Year", **{c: c for c in _ENERGY_INPUTS + ENERGY_KEPT}},
+        dtypes={"Country": COUNTRY, "Year": YEAR, **{c: MEASURE for c in _ENERGY_INPUTS + ENERGY_KEPT}},
+        output=tuple(ENERGY_KEPT + ENERGY_DERIVED + ["Country", "Year"]),
+    ),
+    "food": SourceSchema(
+        columns={"Country": "Country", "Year": "Year", **{m: m for m in FOOD_MEASURES}},
+        dtypes={"Country": COUNTRY, "Year": YEAR, **{m: MEASURE for m in FOOD_MEASURES}},
+        output=tuple(["Country", "Year"] + FOOD_MEASURES),
+    ),
+    # Deaths are a head count, not a measure – int32 keeps them whole.
+    "deaths": _owid("Deaths in ongoing conflicts in a country (best estimate) - Conflict type: all",
+                    "Deaths", dtype="int32"),
+    "air_pollution": SourceSchema(
+        columns={"Entity": "Country", "Year": "Year", **{p: p for p in AIR_POLLUTANTS}},
+        dtypes={"Country": COUNTRY, "Year": YEAR, "Total_Emissions": MEASURE, **{p: MEASURE for p in AIR_POLLUTANTS}},
+        output=("Country", "Year", "Total_Emissions"),
+    ),
+    "hdi": _owid("Human Development Index", "Human Development Index"),
+    "rule_of_law": _owid("Rule of Law index (best estimate, aggregate: average)", "Rule_of_Law_Index"),
+    "median_age": _owid("Median age - Sex: all - Age: all - Variant: estimates", "Median Age"),
+    "urban_population": _owid("Urban population (% of total population)", "Urban Population (%)"),
+    "tax_revenue": _owid("Taxes including social contributions (as a share of GDP)", "Tax_Revenue"),
+}
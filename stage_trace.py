@@ -0,0 +1,236 @@
+"""
+Stage tracing for the build: where the time, the memory and the rows went.
+
+Wrap a step in `with trace.stage("join"):` and a StageTrace records its wall
+time, the CPU time the process spent meanwhile, its tracemalloc peak (on top of
+what was allocated when it started), and whatever row counts the step reports
+through `trace.record(rows_in=..., rows_out=..., **details)` – the join, for
+one, reports how many rows each source lost. The result can be printed as a
+table, written as JSON, or written in Chrome's trace format (open it in
+chrome://tracing or https://ui.perfetto.dev).
+
+With a `profile_dir`, every stage also runs under cProfile and gets its own
+`.prof` file (a nested stage pauses its parent's profiler, so each file holds
+just that stage's own work). Open one with `python -m pstats` or snakeviz.
+
+Tracing is opt-in. Code that is handed UNTRACED (the default everywhere) gets a
+stage() that returns one shared do-nothing context manager and a record() that
+returns straight away, so the instrumentation costs a couple of attribute
+lookups per stage when it's off. Anything expensive to compute just for the
+trace (like the per-source join report) should check `trace.enabled` first.
+
+CPU time is the whole process's (time.process_time), so it includes the
+workers a stage fans out to on threads; memory is what tracemalloc sees, i.e.
+Python and numpy/pandas allocations, not what natively allocating libraries or
+process-pool workers use.
+"""
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+class Span:
+    """One traced stage."""
+
+    __slots__ = ("name", "category", "start", "wall", "cpu", "peak_bytes", "net_bytes",
+                 "rows_in", "rows_out", "details", "thread", "_cpu_start", "_memory_start", "_peak", "_profile")
+
+    def __init__(self, name, category, thread):
+        self.name, self.category, self.thread = name, category, thread
+        self.wall = self.cpu = self.peak_bytes = self.net_bytes = None
+        self.rows_in = self.rows_out = None
+        self.details = {}
+
+    def as_dict(self):
+        record = {"name": self.name, "category": self.category, "start": round(self.start, 6),
+                  "wall_seconds": round(self.wall, 6), "cpu_seconds": round(self.cpu, 6),
+                  "rows_in": self.rows_in, "rows_out": self.rows_out}
+        if self.peak_bytes is not None:
+            record.update(peak_mb=round(self.peak_bytes / MB, 3), net_mb=round(self.net_bytes / MB, 3))
+        if self.details:
+            record["details"] = self.details
+        return record
+
+
+class _Stage:
+    """Context manager returned by StageTrace.stage()."""
+
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace, span):
+        self.trace, self.span = trace, span
+
+    def __enter__(self):
+        self.trace._enter(self.span)
+        return self.span
+
+    def __exit__(self, *exc_info):
+        self.trace._exit(self.span)
+        return False
+
+
+class StageTrace:
+    """Records a Span per stage. Use it as a context manager (or start()/stop()) so tracemalloc is switched off again."""
+
+    enabled = True
+
+    def __init__(self, memory=True, profile_dir=None):
+        self.memory = memory
+        self.profile_dir = profile_dir
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+        self._threads = {}
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def stage(self, name, category="stage"):
+        """Context manager tracing `name`; yields the Span, which record() fills in."""
+        thread = self._threads.setdefault(threading.get_ident(), len(self._threads) + 1)
+        return _Stage(self, Span(name, category, thread))
+
+    def record(self, rows_in=None, rows_out=None, **details):
+        """Attach row counts and details to the innermost open stage (e.g. from deep inside a helper)."""
+        if not self._stack:
+            return
+        span = self._stack[-1]
+        if rows_in is not None:
+            span.rows_in = rows_in
+        if rows_out is not None:
+            span.rows_out = rows_out
+        span.details.update(details)
+
+    def _enter(self, span):
+        parent = self._stack[-1] if self._stack else None
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent._peak = max(parent._peak, peak)  # Before we reset the peak under it.
+            tracemalloc.reset_peak()
+            span._memory_start = span._peak = current
+        if self.profile_dir is not None:
+            if parent is not None:
+                parent._profile.disable()
+            span._profile = cProfile.Profile()
+        self._stack.append(span)
+        span.start = time.perf_counter() - self._origin
+        span._cpu_start = time.process_time()
+        if self.profile_dir is not None:
+            span._profile.enable()
+
+    def _exit(self, span):
+        if self.profile_dir is not None:
+            span._profile.disable()
+        span.cpu = time.process_time() - span._cpu_start
+        span.wall = time.perf_counter() - self._origin - span.start
+        self._stack.pop()
+        parent = self._stack[-1] if self._stack else None
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            span._peak = max(span._peak, peak)
+            span.peak_bytes = span._peak - span._memory_start
+            span.net_bytes = current - span._memory_start
+            if parent is not None:
+                parent._peak = max(parent._peak, span._peak)
+        if self.profile_dir is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            filename = f"{len(self.spans):03d}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', span.name)}.prof"
+            span._profile.dump_stats(os.path.join(self.profile_dir, filename))
+            span.details["profile"] = filename
+            span._profile = None
+            if parent is not None:
+                parent._profile.enable()
+        self.spans.append(span)
+
+    def as_dict(self):
+        return {"pid": os.getpid(), "memory": self.memory, "spans": [span.as_dict() for span in self.spans]}
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.as_dict(), handle, indent=2)
+
+    def write_chrome(self, path):
+        """Chrome trace-event format: one complete ("X") event per stage, times in microseconds."""
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = {key: value for key, value in span.as_dict().items()
+                    if key not in ("name", "category", "start", "wall_seconds") and value is not None}
+            events.append({"name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": span.thread,
+                           "ts": round(span.start * 1e6, 1), "dur": round(span.wall * 1e6, 1), "args": args})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle)
+
+    def report(self):
+        """A table of the stages in the order they started, plus any rows the joins dropped."""
+        lines = [f"  {'stage':<30} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'rows in':>10} {'rows out':>10}"]
+        for span in sorted(self.spans, key=lambda span: span.start):
+            depth = sum(1 for other in self.spans if other is not span and other.start <= span.start
+                        and span.start + span.wall <= other.start + other.wall)
+            peak = f"{span.peak_bytes / MB:8.1f}" if span.peak_bytes is not None else f"{'-':>8}"
+            rows_in = f"{span.rows_in:,}" if span.rows_in is not None else "-"
+            rows_out = f"{span.rows_out:,}" if span.rows_out is not None else "-"
+            name = "  " * depth + span.name
+            lines.append(f"  {name:<30} {span.wall:8.3f} {span.cpu:8.3f} {peak} {rows_in:>10} {rows_out:>10}")
+            for source, join in (span.details.get("joins") or {}).items():
+                change = f"{join['before']:,} -> {join['after']:,}" if join["how"] != "base" else f"{join['after']:,}"
+                lines.append(f"  {'':<30}   {source} ({join['how']}): {change} rows; "
+                             f"{join['unused']:,} of its {join['rows']:,} rows unused")
+        return "\n".join(lines)
+
+
+class _Untraced:
+    """The do-nothing tracer: what every traced function gets unless someone asks for a trace."""
+
+    enabled = False
+    spans = ()
+
+    class _NullStage:
+        __slots__ = ()
+
+        def __enter__(self):
+            return None
+
+        def __exit__(self, *exc_info):
+            return False
+
+    _null_stage = _NullStage()
+
+    def stage(self, name, category="stage"):
+        return self._null_stage
+
+    def record(self, rows_in=None, rows_out=None, **details):
+        pass
+
+
+UNTRACED = _Untraced()
+
+
+def total_rows(frames):
+    """Rows across a {name: DataFrame} dict – the rows_in of a step that takes several sources."""
+    return sum(len(frame) for frame in frames.values())
@@ -0,0 +1,100 @@
+"""
+Sufficient-statistics cube: correlations for any (countries, year range) filter without touching rows.
+
+A Pearson correlation only needs n, sum x, sum y, sum x^2, sum y^2 and sum xy.
+We precompute those per (country, year) cell for every pair of columns – over the
+rows where *both* columns are present, so missing values are handled pairwise
+exactly like DataFrame.corr() does. The cells are then accumulated along the year
+axis, which turns any year range into a difference of two slices, and a country
+selection into a sum over those countries. Query cost depends on the number of
+selected countries and columns, not on how many rows or years the panel has.
+
+Columns are shifted by their overall mean before accumulating (correlation doesn't
+care), so big indicators don't lose their variance to floating-point cancellation.
+"""
+import numpy as np
+import pandas as pd
+
+# n, sum x, sum y, sum x^2, sum y^2, sum xy
+N, SX, SY, SXX, SYY, SXY = range(6)
+
+# n*sum x^2 - (sum x)^2 below this fraction of n*sum x^2 is cancellation noise: a constant column.
+VARIANCE_RTOL = 1e-10
+
+
+class StatsCube:
+    """Pairwise sufficient statistics per (country, year), cumulated along years."""
+
+    def __init__(self, data, columns=None, with_columns=None, country="Country", year="Year"):
+        """
+        Build the cube from long-format `data`.
+
+        `columns` are correlated against `with_columns` (default: the same columns,
+        i.e. the full correlation matrix). Correlating many columns against one
+        target keeps the cube small: its size is countries x years x columns x with_columns.
+        """
+        if columns is None:
+            columns = list(data.select_dtypes("number").columns)
+        self.columns = list(columns)
+        self.with_columns = list(with_columns) if with_columns is not None else self.columns
+
+        self.countries = pd.Index(pd.unique(data[country].dropna())).sort_values()
+        first_year, last_year = int(data[year].min()), int(data[year].max())
+        self.first_year = first_year
+        n_years = last_year - first_year + 1
+
+        x = data[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = data[self.with_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        x = x - np.nanmean(x, axis=0)
+        y = y - np.nanmean(y, axis=0)
+        x_valid, y_valid = ~np.isnan(x), ~np.isnan(y)
+        x, y = np.where(x_valid, x, 0.0), np.where(y_valid, y, 0.0)
+
+        # Sort rows by cell so each cell's rows are one contiguous run for reduceat.
+        cell = self.countries.get_indexer(data[country]) * n_years + (data[year].to_numpy(dtype=np.int64) - first_year)
+        keep = cell >= 0
+        order = np.argsort(cell[keep], kind="stable")
+        rows = np.flatnonzero(keep)[order]
+        cells, starts = np.unique(cell[rows], return_index=True)
+
+        stats = np.zeros((len(self.countries) * n_years, 6, len(self.columns), len(self.with_columns)))
+        if len(rows):
+            both = x_valid[rows, :, None] & y_valid[rows, None, :]
+            xr, yr = x[rows, :, None], y[rows, None, :]
+            per_row = (both, xr * both, yr * both, xr * xr * both, yr * yr * both, xr * yr)
+            for i, values in enumerate(per_row):
+                stats[cells, i] = np.add.reduceat(values.astype(np.float64), starts, axis=0)
+
+        # Cumulate along years, with a leading zero year so [y0, y1] = cum[y1 + 1] - cum[y0].
+        stats = stats.reshape(len(self.countries), n_years, 6, len(self.columns), len(self.with_columns))
+        self.cumulative = np.concatenate([np.zeros_like(stats[:, :1]), np.cumsum(stats, axis=1)], axis=1)
+
+    @property
+    def years(self):
+        return np.arange(self.first_year, self.first_year + self.cumulative.shape[1] - 1)
+
+    def stats(self, countries=None, years=None):
+        """Summed sufficient statistics (6 x columns x with_columns) for a country subset and (first, last) years."""
+        if countries is None:
+            selected = self.cumulative
+        else:
+            positions = self.countries.get_indexer(list(countries))
+            selected = self.cumulative[positions[positions >= 0]]
+        n_years = self.cumulative.shape[1] - 1
+        if years is None:
+            start, stop = 0, n_years
+        else:
+            start = int(np.clip(years[0] - self.first_year, 0, n_years))
+            stop = int(np.clip(years[1] - self.first_year + 1, start, n_years))
+        return (selected[:, stop] - selected[:, start]).sum(axis=0)
+
+    def corr(self, countries=None, years=None):
+        """Pearson correlations (columns x with_columns), matching DataFrame.corr() on the filtered rows."""
+        s = self.stats(countries, years)
+        n = s[N]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = n * s[SXY] - s[SX] * s[SY]
+            var_x, var_y = n * s[SXX] - s[SX] ** 2, n * s[SYY] - s[SY] ** 2
+            varies = (var_x > VARIANCE_RTOL * n * s[SXX]) & (var_y > VARIANCE_RTOL * n * s[SYY])
+            result = np.where((n >= 2) & varies, covariance / np.sqrt(var_x * var_y), np.nan)
+        return pd.DataFrame(np.clip(result, -1.0, 1.0), index=self.columns, columns=self.with_columns)
@@ -0,0 +1,207 @@
+"""
+Subset builds: only some countries, a window of years and/or a few columns, pushed down to the readers.
+
+A Subset is turned into a SourcePlan per raw source before anything is read:
+
+  * columns: a source none of whose columns are wanted is still needed for its
+    keys (the inner join drops the rows it lacks), but only its country and year
+    columns are read; its process_* step is skipped for a plain key encode.
+  * years: the year column is filtered as soon as a source is read – on the Arrow
+    table, before conversion to pandas, when the parsed source is cached – and the
+    wide TEDI sheet only has its wanted year columns read at all, so nothing else
+    gets melted.
+  * countries: rows of other countries are dropped along with the years, by
+    mapping each distinct spelling (not each row) to its registry ID.
+
+A subset build returns the same frame as a full build with Subset.apply() run on
+it afterwards. Where pushing a filter down would change the answer, it is held
+back until the end: year-over-year features need the years before the window,
+and nearest-year alignment needs `year_tolerance` years either side of it (and
+every source's values, so nothing is read keys-only there).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+KEYS = ("Country", "Year")
+
+
+def parse_years(text):
+    """"2010-2020", "2015", "2010-" or "-1999" -> (first, last) with None for an open end."""
+    first, dash, last = str(text).partition("-")
+    if not dash:
+        last = first
+    try:
+        years = (int(first) if first.strip() else None, int(last) if last.strip() else None)
+    except ValueError:
+        raise ValueError(f"Can't read '{text}' as a year or a year range like 2010-2020.") from None
+    if None not in years and years[0] > years[1]:
+        raise ValueError(f"The year range '{text}' ends before it starts.")
+    return years
+
+
+def source_columns(schema):
+    """The dataset columns a source contributes (besides Country and Year)."""
+    names = schema.output or tuple((schema.columns or {}).values())
+    return [name for name in names if name not in KEYS]
+
+
+def raw_key_columns(schema):
+    """(raw country column, raw year column) of a source; the year is None for the wide TEDI sheet."""
+    raw = {name: column for column, name in (schema.columns or {}).items()}
+    return raw.get("Country", "Country"), raw.get("Year")
+
+
+def country_mask(countries, registry, ids):
+    """
+    Which rows of a raw country column (a pandas Series or an Arrow column) belong to one of `ids`.
+    Only the distinct spellings are looked up.
+    """
+    if hasattr(countries, "combine_chunks"):
+        encoded = countries.combine_chunks()
+        if not hasattr(encoded, "dictionary"):
+            encoded = encoded.dictionary_encode()
+        uniques, codes = encoded.dictionary.to_pylist(), encoded.indices.fill_null(-1).to_numpy()
+    elif hasattr(countries, "cat"):
+        uniques, codes = countries.cat.categories, countries.cat.codes.to_numpy()
+    else:
+        codes, uniques = countries.factorize()
+    wanted = np.array([registry.find(raw) in ids for raw in uniques] + [False])
+    return wanted[codes]  # Missing countries (code -1) pick up the trailing False.
+
+
+@dataclass
+class SourcePlan:
+    """How one raw source is read for a subset build."""
+
+    name: str
+    keys_only: bool  # None of its columns are wanted: read its keys, for the join, and nothing else.
+    country_column: str
+    year_column: str  # None for the wide TEDI sheet, whose years are columns.
+    countries: frozenset = None  # Registry IDs to keep.
+    years: tuple = None  # (first, last) to keep, open ends as None.
+
+    def wants_column(self, column):
+        """Column predicate for the reader: keys only, or (for TEDI) just the year columns in the window."""
+        if self.keys_only:
+            return column in (self.country_column, self.year_column)
+        if self.year_column is None and self.years is not None and column not in ("Country", "Regime type"):
+            return _in_window(int(column), self.years)
+        return True
+
+    @property
+    def projects(self):
+        """Whether wants_column() drops anything (otherwise the reader's own projection stands)."""
+        return self.keys_only or (self.year_column is None and self.years is not None)
+
+    def row_mask(self, frame, registry):
+        """The rows of a freshly read source (a DataFrame or an Arrow table) the subset wants; None for all."""
+        keep = None
+        if self.countries is not None:
+            keep = country_mask(frame[self.country_column], registry, self.countries)
+        if self.years is not None and self.year_column is not None:
+            in_window = _in_window(frame[self.year_column].to_numpy(), self.years)
+            keep = in_window if keep is None else keep & in_window
+        return keep
+
+    def filter_rows(self, df, registry):
+        """Drop the rows of a freshly read source that the subset doesn't want."""
+        keep = self.row_mask(df, registry)
+        return df if keep is None or keep.all() else df[keep].reset_index(drop=True)
+
+    def describe(self):
+        how = "keys only" if self.keys_only else "all columns"
+        if self.year_column is None and self.years is not None:
+            how += ", year columns in the window"
+        return f"{self.name:<18} {how}"
+
+
+def _in_window(years, window):
+    first, last = window
+    keep = np.ones(np.shape(years), dtype=bool) if np.ndim(years) else True
+    if first is not None:
+        keep = keep & (years >= first)
+    if last is not None:
+        keep = keep & (years <= last)
+    return keep
+
+
+@dataclass(frozen=True)
+class Subset:
+    """Which countries (registry IDs), years (first, last) and columns a build should produce. None = all."""
+
+    countries: frozenset = None
+    years: tuple = None
+    columns: tuple = None
+
+    @classmethod
+    def from_request(cls, registry, schemas, countries=None, years=None, columns=None):
+        """
+        Validate a request – country names in any known spelling, a (first, last) tuple
+        or a "2010-2020" string, dataset column names – and return a Subset (or None for
+        a full build).
+        """
+        if countries is None and years is None and columns is None:
+            return None
+        ids = None
+        if countries is not None:
+            if isinstance(countries, str):
+                countries = [countries]
+            unknown = [name for name in countries if registry.find(name) is None]
+            if unknown:
+                raise ValueError(f"Unknown countries: {', '.join(unknown)} (see data/country_registry.csv).")
+            ids = frozenset(registry.find(name) for name in countries)
+        if isinstance(years, (str, int)):
+            years = parse_years(years)
+        if columns is not None:
+            if isinstance(columns, str):
+                columns = [columns]
+            known = [column for schema in schemas.values() for column in source_columns(schema)]
+            unknown = [column for column in columns if column not in known and column not in KEYS]
+            if unknown:
+                raise ValueError(f"Unknown columns: {', '.join(unknown)}. Known: {', '.join(known)}")
+            columns = tuple(column for column in columns if column not in KEYS)
+        return cls(ids, tuple(years) if years is not None else None, columns)
+
+    def plan(self, schemas, needed=(), year_tolerance=None, push_years=True, keys_only=True):
+        """
+        A SourcePlan per source. `needed` are extra columns that must be read (what the
+        requested features are computed from); `push_years=False` keeps the year filter
+        for the end (features that look at earlier years). `keys_only=False` reads every
+        source whole: left and outer joins add keys in each source's processed row order,
+        which a keys-only read doesn't reproduce.
+        """
+        wanted = None if self.columns is None else set(self.columns) | set(needed)
+        years = self.years if push_years else None
+        if years is not None and year_tolerance:
+            first, last = years
+            years = (first - year_tolerance if first is not None else None,
+                     last + year_tolerance if last is not None else None)
+        plans = {}
+        for name, schema in schemas.items():
+            country_column, year_column = raw_key_columns(schema)
+            skip = (keys_only and wanted is not None and year_tolerance is None and year_column is not None
+                    and not wanted & set(source_columns(schema)))
+            plans[name] = SourcePlan(name, skip, country_column, year_column, self.countries, years)
+        return plans
+
+    def apply(self, dataset, keep=()):
+        """
+        The subset of a built dataset: its rows for the countries and years, its columns (plus `keep`).
+
+        Categorical columns other than Country (which keeps the registry's categories) only
+        list the categories the subset uses, as a subset build can't know the others.
+        """
+        rows = np.ones(len(dataset), dtype=bool)
+        if self.countries is not None:
+            rows &= np.isin(dataset["Country"].cat.codes.to_numpy(), list(self.countries))
+        if self.years is not None:
+            rows &= _in_window(dataset["Year"].to_numpy(), self.years)
+        if self.columns is not None:
+            wanted = set(self.columns) | set(keep)
+            dataset = dataset[[column for column in dataset.columns if column in KEYS or column in wanted]]
+        dataset = dataset[rows].reset_index(drop=True)
+        trimmed = {column: dataset[column].cat.remove_unused_categories() for column in dataset.columns
+                   if column != "Country" and isinstance(dataset[column].dtype, pd.CategoricalDtype)}
+        return dataset.assign(**trimmed) if trimmed else dataset
@@ -0,0 +1,164 @@
+"""
+Grouped time-series features (lags, diffs, rolling windows) over every indicator at once.
+
+The panel is sorted once by (Country, Year) and every (country, year) pair is
+encoded as one int64 key, so each country is a contiguous, year-ordered segment.
+"The value k years earlier" is then a single searchsorted over the keys – which
+is what makes year gaps behave: a lag or a window is measured in calendar years,
+never in rows, and never reaches into the neighbouring country's segment.
+
+All columns are stacked into one (rows x indicators) float64 matrix, so each
+kernel is a handful of whole-matrix NumPy operations instead of one
+groupby-rolling per column:
+
+    lag k        value at year - k (NaN if that year is missing)
+    diff k       value - lag k
+    mean w       mean of the values in years (year - w, year]
+    slope w      least-squares trend per year over that window
+    vol w        sample standard deviation over that window
+
+Windows accumulate their statistics around the window mean (two passes over the
+w year offsets), so large indicators like total emissions don't lose their
+precision to sum-of-squares cancellation.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_LAGS = (1,)
+DEFAULT_DIFFS = (1,)
+DEFAULT_WINDOWS = (3, 5, 10)
+
+
+def panel_keys(df, country="Country", year="Year", pad=0):
+    """
+    Encode (country, year) as int64 keys: country code x year span + year offset.
+
+    `pad` widens the year span so that looking up to `pad` years back from the
+    first year of a country can never land on the previous country's keys.
+    """
+    if isinstance(df[country].dtype, pd.CategoricalDtype):
+        codes = df[country].cat.codes.to_numpy().astype(np.int64)
+    else:
+        codes = pd.factorize(df[country])[0].astype(np.int64)
+    if (codes < 0).any():
+        raise ValueError(f"Column '{country}' has missing values; every row needs a country.")
+    years = df[year].to_numpy(dtype=np.int64)
+    first_year = years.min() if len(years) else 0
+    year_span = (years.max() - first_year + 1 if len(years) else 1) + pad
+    return codes * year_span + (years - first_year) + pad
+
+
+def sort_panel(df, country="Country", year="Year", pad=0):
+    """
+    Sort the panel once by (country, year).
+
+    Returns (order, keys): the row positions of `df` in sorted order and the
+    sorted keys. Raises ValueError if a (country, year) pair appears twice.
+    """
+    keys = panel_keys(df, country, year, pad)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    if len(keys) > 1 and (keys[1:] == keys[:-1]).any():
+        raise ValueError("temporal features need one row per (country, year), but some pairs are duplicated.")
+    return order, keys
+
+
+def lag_positions(keys, k):
+    """Row position of the same country k years earlier, or -1 when that year is missing."""
+    target = keys - k
+    positions = np.searchsorted(keys, target)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == target[found]
+    return np.where(found, positions, -1)
+
+
+def _gather(values, positions):
+    """values[positions] with NaN rows wherever positions == -1."""
+    gathered = values[np.where(positions >= 0, positions, 0)]
+    gathered[positions < 0] = np.nan
+    return gathered
+
+
+def window_stats(values, positions_by_offset, window, min_periods=1):
+    """
+    Rolling mean, slope and volatility over `window` calendar years for every column.
+
+    `positions_by_offset[j]` holds the lag-j positions (j = 0 is the row itself).
+    Mean needs `min_periods` observations in the window; slope and volatility need two.
+    """
+    shape = values.shape
+    count = np.zeros(shape)
+    sum_x = np.zeros(shape)
+    sum_t = np.zeros(shape)
+    for j in range(window):
+        x = _gather(values, positions_by_offset[j]) if j else values
+        valid = ~np.isnan(x)
+        count += valid
+        sum_x += np.where(valid, x, 0.0)
+        sum_t -= j * valid  # t = -j: years relative to the current one.
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = sum_x / count
+        mean_t = sum_t / count
+        ss_x = np.zeros(shape)
+        ss_t = np.zeros(shape)
+        ss_tx = np.zeros(shape)
+        for j in range(window):
+            x = _gather(values, positions_by_offset[j]) if j else values
+            valid = ~np.isnan(x)
+            dx = np.where(valid, x - mean_x, 0.0)
+            dt = np.where(valid, -j - mean_t, 0.0)
+            ss_x += dx * dx
+            ss_t += dt * dt
+            ss_tx += dt * dx
+
+        enough = count >= 2
+        mean = np.where(count >= max(min_periods, 1), mean_x, np.nan)
+        slope = np.where(enough & (ss_t > 0), ss_tx / ss_t, np.nan)
+        volatility = np.where(enough, np.sqrt(ss_x / (count - 1)), np.nan)
+    return mean, slope, volatility
+
+
+def temporal_features(df, columns=None, lags=DEFAULT_LAGS, diffs=DEFAULT_DIFFS, windows=DEFAULT_WINDOWS,
+                      min_periods=1, country="Country", year="Year"):
+    """
+    Lagged, differenced and rolling-window features for `columns` (default: every numeric indicator).
+
+    Returns a new DataFrame aligned with `df`'s index (in `df`'s row order, however
+    it was sorted), with columns named `<col>_lag<k>`, `<col>_diff<k>`,
+    `<col>_mean<w>y`, `<col>_slope<w>y` and `<col>_vol<w>y`.
+    """
+    if columns is None:
+        columns = [c for c in df.select_dtypes("number").columns if c != year]
+    columns = list(columns)
+    lags, diffs, windows = tuple(lags), tuple(diffs), tuple(windows)
+    reach = max(lags + diffs + tuple(w - 1 for w in windows) + (0,))
+
+    order, keys = sort_panel(df, country, year, pad=reach)
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+
+    # One searchsorted per distinct year offset, shared by every column and every feature kind.
+    offsets = set(lags + diffs).union(range(1, max(windows + (1,))))
+    positions = {k: lag_positions(keys, k) for k in offsets}
+
+    blocks, names = [], []
+
+    def add(block, suffix):
+        blocks.append(block)
+        names.extend(f"{column}_{suffix}" for column in columns)
+
+    for k in lags:
+        add(_gather(values, positions[k]), f"lag{k}")
+    for k in diffs:
+        add(values - _gather(values, positions[k]), f"diff{k}")
+    for w in windows:
+        mean, slope, volatility = window_stats(values, positions, w, min_periods)
+        add(mean, f"mean{w}y")
+        add(slope, f"slope{w}y")
+        add(volatility, f"vol{w}y")
+
+    # Scatter the sorted rows back to the caller's order with one inverse permutation.
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    matrix = np.hstack(blocks)[inverse] if blocks else np.empty((len(df), 0))
+    return pd.DataFrame(matrix, index=df.index, columns=names)
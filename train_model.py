@@ -0,0 +1,286 @@
+"""
+Offline training for the dashboard's happiness model: cross-validated search, then publish.
+
+The dashboard used to fit one fixed XGBRegressor on one random split, with no
+validation, inside a user request. This module does the training offline:
+
+  * reads the consolidated dataset and cleans it exactly like the dashboard does,
+  * runs a hyperparameter grid through k-fold CV, or grouped-by-country CV
+    (--group-by-country, so a country is never in both the training and the
+    validation folds – the honest test for "how about a country we haven't seen?"),
+  * fits every (parameters, fold) pair in a process pool, with the histogram
+    tree method, a few threads per fit and early stopping on an inner holdout
+    carved out of the training fold (the validation fold is only ever scored),
+  * refits the best parameters on all rows, with the number of trees the folds
+    stopped at, and publishes the model plus its metrics as a new version:
+    models/v0001/{model.ubj, metrics.json}, with models/LATEST pointing at it.
+
+Training runs at a lower priority (--nice), so a training run on the dashboard's
+machine doesn't slow down the people using it.
+
+Usage:
+    python train_model.py [--folds 5] [--group-by-country] [--workers N] [--threads-per-fit 1]
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import GroupKFold, KFold, train_test_split
+from xgboost import XGBRegressor
+
+from dataset_store import default_path, read_dataset
+from model_store import TrainedModel, model_key, split
+from shared_data import clean_dataset
+
+DEFAULT_ARTIFACT_DIR = "models"
+TARGET = "Life Ladder"
+FEATURES = [
+    'Log GDP per capita', 'Social support', 'Healthy life expectancy at birth',
+    'Freedom to make life choices', 'Generosity', 'Perceptions of corruption',
+    'Positive affect', 'Negative affect', 'Democracy_Index', 'Total_Emissions',
+    'Human Development Index', 'Rule_of_Law_Index', 'Median Age', 'Urban Population (%)', 'Tax_Revenue'
+]
+
+# The search space. Every fit gets the same generous tree budget and stops early, so n_estimators isn't searched.
+PARAM_GRID = {
+    "max_depth": [3, 5, 7],
+    "learning_rate": [0.03, 0.1],
+    "subsample": [0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+BASE_PARAMS = {"tree_method": "hist", "n_estimators": 2000, "random_state": 42}
+EARLY_STOPPING_ROUNDS = 50
+EARLY_STOPPING_FRACTION = 0.15  # Of each training fold, held out to decide when to stop.
+
+# Per-worker state, set up once by _init_worker.
+_X = _Y = None
+_THREADS = 1
+
+
+def param_grid(grid=None):
+    """Every combination of the grid's values, as a list of parameter dicts."""
+    grid = grid or PARAM_GRID
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def folds(data, n_folds, group_by=None, seed=42):
+    """(train rows, validation rows) per fold: shuffled k-fold, or whole groups per fold with `group_by`."""
+    if group_by is not None:
+        return list(GroupKFold(n_splits=n_folds).split(data, groups=data[group_by].astype(str)))
+    return list(KFold(n_splits=n_folds, shuffle=True, random_state=seed).split(data))
+
+
+def data_key(data, features, target):
+    """Hash of the training data alone – what a published model is checked against before it's served."""
+    return model_key(data, features, target, params=None)
+
+
+def _init_worker(X, y, threads):
+    global _X, _Y, _THREADS
+    _X, _Y, _THREADS = X, y, threads
+
+
+def _fit_fold(task):
+    """Fit one (parameters, fold) pair in a worker and score it on the fold's validation rows."""
+    params_index, fold_index, params, train_rows, validation_rows = task
+    start = time.perf_counter()
+    fit_rows, stop_rows = train_test_split(train_rows, test_size=EARLY_STOPPING_FRACTION, random_state=fold_index)
+    model = XGBRegressor(**BASE_PARAMS, **params, n_jobs=_THREADS, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    model.fit(_X[fit_rows], _Y[fit_rows], eval_set=[(_X[stop_rows], _Y[stop_rows])], verbose=False)
+    errors = model.predict(_X[validation_rows]) - _Y[validation_rows]
+    total = ((_Y[validation_rows] - _Y[validation_rows].mean()) ** 2).sum()
+    return {
+        "params_index": params_index,
+        "fold": fold_index,
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mae": float(np.mean(np.abs(errors))),
+        "r2": float(1 - (errors ** 2).sum() / total) if total > 0 else float("nan"),
+        "best_iteration": int(model.best_iteration),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def cross_validate(data, features=FEATURES, target=TARGET, grid=None, n_folds=5, group_by=None,
+                   workers=None, threads_per_fit=1):
+    """
+    Score every parameter combination of `grid` with `n_folds`-fold CV, fits spread over a process pool.
+
+    Returns one summary per combination (mean/std of RMSE, MAE and R², mean best
+    iteration), best first.
+    """
+    X = data[features].to_numpy(dtype=np.float32)
+    y = data[target].to_numpy(dtype=np.float32)
+    candidates = param_grid(grid)
+    splits = folds(data, n_folds, group_by)
+    tasks = [(p, f, params, train_rows, validation_rows)
+             for p, params in enumerate(candidates) for f, (train_rows, validation_rows) in enumerate(splits)]
+
+    # Cores are split between parallel fits and threads per fit; many small fits parallelize better than threads.
+    workers = workers or max((os.cpu_count() or 1) // threads_per_fit, 1)
+    init_args = (X, y, threads_per_fit)
+    if workers == 1:
+        _init_worker(*init_args)
+        results = [_fit_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                 initargs=init_args) as pool:
+            results = list(pool.map(_fit_fold, tasks, chunksize=max(len(tasks) // (workers * 4), 1)))
+
+    summaries = []
+    for p, params in enumerate(candidates):
+        scores = [r for r in results if r["params_index"] == p]
+        summary = {"params": params, "folds": scores}
+        for metric in ("rmse", "mae", "r2"):
+            values = np.array([r[metric] for r in scores])
+            summary[f"{metric}_mean"], summary[f"{metric}_std"] = float(values.mean()), float(values.std())
+        summary["best_iteration_mean"] = float(np.mean([r["best_iteration"] for r in scores]))
+        summaries.append(summary)
+    return sorted(summaries, key=lambda summary: summary["rmse_mean"])
+
+
+def fit_final(data, best, features=FEATURES, target=TARGET, threads=None):
+    """Refit the winning parameters on every row, with as many trees as the folds needed on average."""
+    params = dict(BASE_PARAMS, **best["params"], n_estimators=int(round(best["best_iteration_mean"])) + 1)
+    model = XGBRegressor(**params, n_jobs=threads or os.cpu_count())
+    model.fit(data[features], data[target])
+    return model, params
+
+
+def _version_name(number):
+    return f"v{number:04d}"
+
+
+def latest_version(directory=DEFAULT_ARTIFACT_DIR):
+    """The name of the latest published version (e.g. "v0003"), or None if nothing has been published."""
+    try:
+        with open(os.path.join(directory, "LATEST"), encoding="utf-8") as handle:
+            return handle.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(model, metrics, directory=DEFAULT_ARTIFACT_DIR):
+    """Write model + metrics as the next version, then point LATEST at it. Returns the version name."""
+    os.makedirs(directory, exist_ok=True)
+    existing = [int(name[1:]) for name in os.listdir(directory) if name.startswith("v") and name[1:].isdigit()]
+    number = max(existing, default=0) + 1
+    while True:
+        try:
+            os.mkdir(os.path.join(directory, _version_name(number)))  # Atomic claim, even with two trainers racing.
+            break
+        except FileExistsError:
+            number += 1
+    version = _version_name(number)
+    version_dir = os.path.join(directory, version)
+    model.save_model(os.path.join(version_dir, "model.ubj"))
+    with open(os.path.join(version_dir, "metrics.json"), "w", encoding="utf-8") as handle:
+        json.dump(dict(metrics, version=version), handle, indent=2, default=str)
+    # LATEST last: a version is only ever visible once it's complete.
+    with open(os.path.join(directory, "LATEST.tmp"), "w", encoding="utf-8") as handle:
+        handle.write(version)
+    os.replace(os.path.join(directory, "LATEST.tmp"), os.path.join(directory, "LATEST"))
+    return version
+
+
+def load_published(data, features=FEATURES, target=TARGET, version=None, directory=DEFAULT_ARTIFACT_DIR):
+    """
+    The published model (latest, or `version`) as a TrainedModel – or None if there is none for this data.
+
+    A model trained on other data or features isn't served: the dashboard falls
+    back to its own quick model until the next training run catches up. The winner
+    is refit on every row, so its X_train is all of them and its X_test (the
+    dashboard's usual split) is a sample of rows it has seen, not a held-out set.
+    """
+    version = version or latest_version(directory)
+    if version is None:
+        return None
+    start = time.perf_counter()
+    version_dir = os.path.join(directory, version)
+    with open(os.path.join(version_dir, "metrics.json"), encoding="utf-8") as handle:
+        metrics = json.load(handle)
+    if metrics["features"] != list(features) or metrics["data_key"] != data_key(data, features, target):
+        return None
+
+    booster_path = os.path.join(version_dir, "model.ubj")
+    model = XGBRegressor(**metrics["params"])
+    model.load_model(booster_path)
+    _, X_test, _, y_test = split(data, list(features), target)
+    return TrainedModel(
+        key=f"{version}-{metrics['data_key'][:8]}",
+        model=model,
+        features=list(features),
+        importances=pd.Series(metrics["importances"], index=metrics["features"], name="Importance"),
+        X_train=data[list(features)],
+        X_test=X_test,
+        y_train=data[target],
+        y_test=y_test,
+        trained=False,
+        seconds=time.perf_counter() - start,
+        path=booster_path,
+        metrics=metrics,
+        held_out=False,
+    )
+
+
+def train(source_path=None, features=FEATURES, target=TARGET, grid=None, n_folds=5, group_by_country=False,
+          workers=None, threads_per_fit=1, niceness=10, directory=DEFAULT_ARTIFACT_DIR, verbose=True):
+    """Clean the data, cross-validate the grid, refit the winner and publish it. Returns (version, metrics)."""
+    start = time.perf_counter()
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)  # The pool's workers inherit it.
+    source_path = source_path or default_path()
+    data = clean_dataset(read_dataset(source_path))
+    group_by = "Country" if group_by_country else None
+    summaries = cross_validate(data, features, target, grid, n_folds, group_by, workers, threads_per_fit)
+    best = summaries[0]
+    cv_seconds = time.perf_counter() - start
+    if verbose:
+        print(f"{len(summaries)} parameter sets x {n_folds} folds on {len(data):,} rows in {cv_seconds:.1f}s")
+        for summary in summaries[:5]:
+            print(f"  rmse {summary['rmse_mean']:.4f} ± {summary['rmse_std']:.4f}  r2 {summary['r2_mean']:.3f}  "
+                  f"trees {summary['best_iteration_mean']:.0f}  {summary['params']}")
+
+    model, params = fit_final(data, best, features, target)
+    metrics = {
+        "created_at": time.time(),
+        "source": source_path,
+        "rows": len(data),
+        "data_key": data_key(data, features, target),
+        "features": list(features),
+        "target": target,
+        "params": params,
+        "cv": {"folds": n_folds, "grouped_by": group_by, "candidates": len(summaries)},
+        "best": {key: value for key, value in best.items() if key != "folds"},
+        "best_folds": best["folds"],
+        "results": [{key: value for key, value in summary.items() if key != "folds"} for summary in summaries],
+        "importances": [float(value) for value in model.feature_importances_],
+        "seconds": time.perf_counter() - start,
+    }
+    version = publish(model, metrics, directory)
+    if verbose:
+        print(f"Published {version} to {directory}/ (cv rmse {best['rmse_mean']:.4f}, "
+              f"{params['n_estimators']} trees) in {metrics['seconds']:.1f}s")
+    return version, metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validate and publish the happiness model.")
+    parser.add_argument("--data", default=None, help="Dataset to train on (default: the best build output).")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--group-by-country", action="store_true",
+                        help="Keep each country's rows in a single fold (validate on unseen countries).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel fits (default: cores / threads per fit).")
+    parser.add_argument("--threads-per-fit", type=int, default=1)
+    parser.add_argument("--nice", type=int, default=10, help="Priority penalty for the training run (0 = none).")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_DIR, help="Where versions are published.")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    train(args.data, n_folds=args.folds, group_by_country=args.group_by_country, workers=args.workers,
+          threads_per_fit=args.threads_per_fit, niceness=args.nice, directory=args.output, verbose=not args.quiet)